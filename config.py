@@ -63,6 +63,22 @@ This figure below represents the parameter structure accepted by Icarus:
  |        |----- cache_policy arg 2
  |        |----- ..................
  |        |----- cache_policy arg N
+ |        |----- admission (optional)
+ |        |----- admission_args (optional)
+ |                    |----- admission arg 1
+ |                    |----- ..................
+ |                    |----- admission arg N
+ |
+ |--- warm_start (optional)
+ |        |----- method
+ |        |----- warm_start arg 1
+ |        |----- ..................
+ |        |----- warm_start arg N
+ |
+ |--- convergence (optional)
+ |        |----- convergence arg 1
+ |        |----- ..................
+ |        |----- convergence arg N
  |
 
 
@@ -106,6 +122,7 @@ Stationary Zipf workload
     * n_warmup: number of warmup requests
     * n_measured: number of measured requests
     * rate: requests rate
+    * batch_size: (optional) number of events generated at once with NumPy
 
 GlobeTraff workload
  * name: GLOBETRAFF
@@ -122,6 +139,14 @@ Trace-driven workload
     * n_warmup: number of warmup requests
     * n_measured: number of measured requests
 
+Binary trace-driven workload
+ * name: BINARY_TRACE_DRIVEN
+ * args:
+    * trace_dir: the path to a trace written by icarus.tools.convert_trace
+    * n_warmup: number of warmup requests
+    * n_measured: number of measured requests
+    * rate: (optional) requests rate, if the trace has no timestamps
+
 
 content_placement
 -----------------
@@ -176,9 +201,122 @@ cache_policy
     * NULL  -> No cache
     * RAND  -> Random eviction
     * FIFO  -> First In First Out
- * args:
+    * ODICT_LRU, ODICT_FIFO -> Same as LRU and FIFO but backed by an
+      OrderedDict
+    * ARRAY_LRU, ARRAY_SLRU, ARRAY_FIFO, ARRAY_CLIMB -> Same as LRU, SLRU,
+      FIFO and CLIMB but store integer content identifiers in arrays, using
+      much less memory
+ * admission (optional):
+    * K_HITS       -> Insert items only at their k-th request
+    * BLOOM_K_HITS -> Same as K_HITS but count requests with a counting Bloom
+                      filter of fixed size
+    * TINYLFU      -> Insert items only if requested more frequently than the
+                      item they replace, according to a frequency sketch
+    * RAND         -> Insert items randomly with a given probability
+ * args: arguments of the replacement policy
     * For SLRU:
        * segments: int, optional, default=2. Number of segments
+    * For PERFECT_LFU:
+       * counter: 'DICT' (default), 'ARRAY' or 'SKETCH'. How request counters
+         of all contents are stored. 'ARRAY' requires integer content
+         identifiers and uses much less memory with large catalogs. 'SKETCH'
+         approximates counters with a count-min sketch of fixed size
+       * n_contents: int. Largest content identifier, required by 'ARRAY'
+       * sketch_width: int, optional, default=2**20. Counters per sketch row
+       * sketch_depth: int, optional, default=4. Number of sketch rows
+    * For ARRAY_LRU, ARRAY_SLRU, ARRAY_FIFO and ARRAY_CLIMB:
+       * n_contents: int, optional. Largest content identifier. If given,
+         contents are located with an array indexed by content instead of
+         a hash table, which is faster
+ * admission_args (optional): dict of arguments of the admission policy.
+   Arguments not accepted by the replacement policy can also be given with
+   the arguments of the replacement policy, e.g. {'name': 'LRU',
+   'admission': 'K_HITS', 'k': 2}
+    * For K_HITS admission:
+       * k: int, optional, default=2. Number of requests before insertion
+       * memory: int, optional. Max number of items whose requests are
+         counted. If not given, requests of all items are counted
+    * For BLOOM_K_HITS admission:
+       * k: int, optional, default=2. Number of requests before insertion
+       * filter_size: int, optional. Number of counters of the filter.
+         Default: 8 times the cache size
+       * n_hashes: int, optional, default=4. Number of hash functions
+       * window: int, optional. Insertion attempts of items not in cache
+         (i.e. misses) after which counters are halved. Default: 10 times the
+         cache size
+    * For TINYLFU admission:
+       * sample_size: int, optional. Requests after which frequencies are
+         halved. Default: 10 times the cache size
+       * sketch_width: int, optional. Counters per row of the frequency
+         sketch. Default: the cache size
+       * sketch_depth: int, optional, default=4. Rows of the frequency sketch
+       * doorkeeper_size: int, optional. Bits of the doorkeeper Bloom filter.
+         Default: 4 times the sample size
+    * For RAND admission:
+       * p: float. Insertion probability
+       * seed: any hashable type, optional. Seed of the random generator
+
+
+netconf
+-------
+(optional) arguments of the network model
+ * path_store: 'DICT' (default) to store all shortest paths as lists or
+   'ARRAY' to store them as a predecessor matrix and reconstruct them on
+   demand, which uses much less memory on large topologies
+ * path_cache_size: number of reconstructed paths cached with 'ARRAY'
+
+
+topology_events
+---------------
+(optional) list of (time, event) tuples describing topology changes occurring
+during the experiment, e.g. failures and recoveries. Each event is a dict
+whose 'action' is one of remove_link, restore_link, rewire_link, remove_node
+or restore_node and whose other items are the arguments of the corresponding
+NetworkController method, e.g. (1000.0, {'action': 'remove_link', 'u': 1, 'v': 2})
+
+
+warm_start
+----------
+(optional) fill caches with their expected steady-state contents before the
+experiment starts, computed from the Zipf distribution of the workload, so
+that a shorter warmup is needed. Requests are assumed to follow the shortest
+path to the content source, so that each cache only receives the requests
+missed by the caches in front of it, as with on-path strategies such as LCE
+ * method: 'CHE' to sample the contents of an LRU cache in steady state,
+   whose items are in cache with the probability given by the Che's
+   approximation, 'TOP' to insert the most popular items, 'LFU' to sample the
+   contents of a PERFECT_LFU cache in steady state or 'AUTO' (default) to use
+   'LFU' for PERFECT_LFU caches and 'CHE' for the others
+ * n_warmup: int, optional. Number of warmup requests executed after the
+   warm start. The other warmup requests of the workload are discarded
+ * n_requests: int, optional. Number of past requests of all receivers used
+   to initialize the frequency counters of PERFECT_LFU caches. Default: the
+   number of warmup requests discarded if n_warmup is given, otherwise
+   counters are not initialized
+ * seed: int, optional. Seed of the random generator
+ * validate: bool, optional. If True, the experiment is also run without
+   warm start and all warmup requests and the results and their differences
+   are stored under WARM_START in the results of the experiment
+
+
+convergence
+-----------
+(optional) determine the lengths of the warmup and measured phases online
+instead of using the numbers of requests of the workload, which become upper
+bounds. The warmup phase ends when MSER-5, applied to the cache hit ratio and
+latency measured over windows of requests, finds that the initial transient
+is over. The experiment ends when the half-width of the batch means
+confidence interval of these metrics is small enough. The chosen numbers of
+warmup and measured requests are stored under CONVERGENCE in the results of
+the experiment
+ * metrics: list, optional. Metrics monitored among 'CACHE_HIT_RATIO' and
+   'LATENCY'. Default: both
+ * window: int, optional, default=100. Number of requests per window
+ * precision: float, optional, default=0.01. Maximum ratio between the
+   half-width of the confidence interval and the mean of each metric
+ * confidence: float, optional, default=0.95. Confidence level
+ * n_batches: int, optional, default=20. Number of batches of the batch
+   means method
 
 
 desc
@@ -215,6 +353,12 @@ PARALLEL_EXECUTION = True
 # This option is ignored if PARALLEL_EXECUTION = False
 N_PROCESSES = cpu_count()
 
+# If True, shortest paths of each topology are computed once before running
+# experiments and shared by all processes through memory-mapped files. Unless
+# their netconf sets path_store to 'DICT', experiments then use the 'ARRAY'
+# path store
+SHARED_PATH_TABLES = False
+
 # Format in which results are saved.
 # Result readers and writers are located in module ./icarus/results/readwrite.py
 # Currently only PICKLE is supported
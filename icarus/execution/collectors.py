@@ -8,12 +8,21 @@ latency, path stretch and link load.
 
 To create a new data collector, it is sufficient to create a new class
 inheriting from the `DataCollector` class and override all required methods.
+The collector can also list the events it needs in its `events` attribute, so
+that the network controller does not notify events that no collector needs.
+
+Requests and contents forwarded over a whole path are reported with a single
+`request_path` or `content_path` event to collectors subscribing to it, which
+receive a summary of the path including its overall delay and number of hops.
+Collectors subscribing only to hop events receive one event per link instead.
+Since strategies can also forward requests and contents one hop at a time,
+collectors subscribing to path events normally subscribe to hop events too.
 """
 from __future__ import division
 import collections
 
 from icarus.registry import register_data_collector
-from icarus.tools import cdf
+from icarus.tools import cdf, mser, batch_means_confidence_interval
 from icarus.util import Tree, inheritdoc
 
 
@@ -24,15 +33,40 @@ __all__ = [
     'LinkLoadCollector',
     'LatencyCollector',
     'PathStretchCollector',
+    'ConvergenceMonitor',
     'DummyCollector'
            ]
 
 
+# Names of the events notified to data collectors
+_EVENTS = ('start_session', 'end_session', 'cache_hit', 'cache_miss',
+           'server_hit', 'request_hop', 'content_hop', 'request_path',
+           'content_path')
+
+
+def _overrides(obj, name):
+    """Return whether the class of a collector overrides a method of
+    DataCollector"""
+    for cls in type(obj).__mro__:
+        if cls is DataCollector:
+            return False
+        if name in cls.__dict__:
+            return True
+    return False
+
+
 class DataCollector(object):
     """Object collecting notifications about simulation events and measuring
     relevant metrics.
+
+    Subclasses can set the *events* attribute to the set of names of the
+    events they need to be notified of, e.g. {'cache_hit', 'request_hop'}. If
+    *events* is None, the collector is notified of all events whose methods it
+    overrides.
     """
 
+    events = None
+
     def __init__(self, view, **params):
         """Constructor
 
@@ -45,6 +79,19 @@ class DataCollector(object):
         """
         self.view = view
 
+    def subscribed_events(self):
+        """Return the names of the events the collector needs to be notified
+        of.
+
+        Returns
+        -------
+        events : frozenset
+            The names of the events
+        """
+        if self.events is not None:
+            return frozenset(self.events)
+        return frozenset(e for e in _EVENTS if _overrides(self, e))
+
     def start_session(self, timestamp, receiver, content):
         """Notifies the collector that a new network session started.
 
@@ -128,6 +175,42 @@ class DataCollector(object):
         """
         pass
 
+    def request_path(self, path, main_path=True):
+        """Reports that a request has traversed a whole path.
+
+        By default, each link of the path is reported with *request_hop*.
+
+        Parameters
+        ----------
+        path : PathInfo
+            The path traversed. Its *nodes* and *links* attributes list the
+            nodes and links of the path while its *hops* and *delay*
+            attributes report its number of hops and its overall delay
+        main_path : bool, optional
+            If *True*, indicates that the path is on the main path that will
+            lead to hit a content. Default value is *True*
+        """
+        for u, v in path.links:
+            self.request_hop(u, v, main_path)
+
+    def content_path(self, path, main_path=True):
+        """Reports that a content has traversed a whole path.
+
+        By default, each link of the path is reported with *content_hop*.
+
+        Parameters
+        ----------
+        path : PathInfo
+            The path traversed. Its *nodes* and *links* attributes list the
+            nodes and links of the path while its *hops* and *delay*
+            attributes report its number of hops and its overall delay
+        main_path : bool, optional
+            If *True*, indicates that this path is being traversed by content
+            that will be delivered to the receiver. Default value is *True*
+        """
+        for u, v in path.links:
+            self.content_hop(u, v, main_path)
+
     def end_session(self, success=True):
         """Reports that the session is closed, i.e. the content has been
         successfully delivered to the receiver or a failure blocked the
@@ -163,8 +246,7 @@ class CollectorProxy(DataCollector):
     dispatching events of interests to concrete collectors.
     """
 
-    EVENTS = ('start_session', 'end_session', 'cache_hit', 'cache_miss', 'server_hit',
-              'request_hop', 'content_hop', 'results')
+    EVENTS = _EVENTS + ('results',)
 
     def __init__(self, view, collectors):
         """Constructor
@@ -177,8 +259,25 @@ class CollectorProxy(DataCollector):
             List of instances of DataCollector that will be notified of events
         """
         self.view = view
-        self.collectors = {e: [c for c in collectors if e in type(c).__dict__]
-                           for e in self.EVENTS}
+        self.collectors = {e: [c for c in collectors
+                               if e in c.subscribed_events()]
+                           for e in _EVENTS}
+        self.collectors['results'] = [c for c in collectors
+                                      if _overrides(c, 'results')]
+        # Collectors receiving hop events derived from path events because
+        # they did not subscribe to path events
+        self.derived_hop_collectors = {
+            hop: [c for c in self.collectors[hop]
+                  if c not in self.collectors[path]]
+            for hop, path in (('request_hop', 'request_path'),
+                              ('content_hop', 'content_path'))}
+        # Events to which at least a collector subscribed. Path events are
+        # needed also to derive hop events
+        self.events = frozenset(e for e in _EVENTS if self.collectors[e])
+        if self.derived_hop_collectors['request_hop']:
+            self.events |= {'request_path'}
+        if self.derived_hop_collectors['content_hop']:
+            self.events |= {'content_path'}
 
     @inheritdoc(DataCollector)
     def start_session(self, timestamp, receiver, content):
@@ -210,6 +309,26 @@ class CollectorProxy(DataCollector):
         for c in self.collectors['content_hop']:
             c.content_hop(u, v, main_path)
 
+    @inheritdoc(DataCollector)
+    def request_path(self, path, main_path=True):
+        for c in self.collectors['request_path']:
+            c.request_path(path, main_path)
+        if self.derived_hop_collectors['request_hop']:
+            links = path.links
+            for c in self.derived_hop_collectors['request_hop']:
+                for u, v in links:
+                    c.request_hop(u, v, main_path)
+
+    @inheritdoc(DataCollector)
+    def content_path(self, path, main_path=True):
+        for c in self.collectors['content_path']:
+            c.content_path(path, main_path)
+        if self.derived_hop_collectors['content_hop']:
+            links = path.links
+            for c in self.derived_hop_collectors['content_hop']:
+                for u, v in links:
+                    c.content_hop(u, v, main_path)
+
     @inheritdoc(DataCollector)
     def end_session(self, success=True):
         for c in self.collectors['end_session']:
@@ -225,6 +344,8 @@ class LinkLoadCollector(DataCollector):
     """Data collector measuring the link load
     """
 
+    events = {'start_session', 'request_hop', 'content_hop'}
+
     def __init__(self, view, req_size=150, content_size=1500):
         """Constructor
 
@@ -290,6 +411,9 @@ class LatencyCollector(DataCollector):
     content.
     """
 
+    events = {'start_session', 'request_hop', 'content_hop', 'request_path',
+              'content_path', 'end_session'}
+
     def __init__(self, view, cdf=False):
         """Constructor
 
@@ -323,6 +447,16 @@ class LatencyCollector(DataCollector):
         if main_path:
             self.sess_latency += self.view.link_delay(u, v)
 
+    @inheritdoc(DataCollector)
+    def request_path(self, path, main_path=True):
+        if main_path:
+            self.sess_latency += path.delay
+
+    @inheritdoc(DataCollector)
+    def content_path(self, path, main_path=True):
+        if main_path:
+            self.sess_latency += path.delay
+
     @inheritdoc(DataCollector)
     def end_session(self, success=True):
         if not success:
@@ -345,6 +479,8 @@ class CacheHitRatioCollector(DataCollector):
     requests served by a cache.
     """
 
+    events = {'start_session', 'cache_hit', 'server_hit'}
+
     def __init__(self, view, off_path_hits=False, per_node=True, content_hits=False):
         """Constructor
 
@@ -432,6 +568,9 @@ class PathStretchCollector(DataCollector):
     path length and the shortest path length.
     """
 
+    events = {'start_session', 'request_hop', 'content_hop', 'request_path',
+              'content_path', 'end_session'}
+
     def __init__(self, view, cdf=False):
         """Constructor
 
@@ -471,6 +610,14 @@ class PathStretchCollector(DataCollector):
     def content_hop(self, u, v, main_path=True):
         self.cont_path_len += 1
 
+    @inheritdoc(DataCollector)
+    def request_path(self, path, main_path=True):
+        self.req_path_len += path.hops
+
+    @inheritdoc(DataCollector)
+    def content_path(self, path, main_path=True):
+        self.cont_path_len += path.hops
+
     @inheritdoc(DataCollector)
     def end_session(self, success=True):
         if not success:
@@ -500,6 +647,187 @@ class PathStretchCollector(DataCollector):
         return results
 
 
+class ConvergenceMonitor(DataCollector):
+    """Collector monitoring the cache hit ratio and the latency of a
+    simulation to detect the end of the initial transient and when
+    measurements are precise enough.
+
+    Requests are grouped in windows of *window* requests and the mean of each
+    metric over each window is recorded. During the warmup phase, the initial
+    transient is considered over as soon as the truncation point computed by
+    MSER-5 on the sequence of window means of every metric lies in the first
+    half of the sequence. During the measured phase, measurements are
+    considered precise enough as soon as the half-width of the batch means
+    confidence interval of every metric is at most *precision* times its
+    mean.
+
+    This collector is not selected as the other collectors but through the
+    *convergence* parameter of :func:`exec_experiment`, which starts the
+    measured phase and stops the experiment accordingly.
+    """
+
+    name = 'CONVERGENCE'
+
+    # Minimum number of MSER-5 batches on which the end of the initial
+    # transient is detected
+    MIN_MSER_BATCHES = 10
+
+    def __init__(self, view, metrics=('CACHE_HIT_RATIO', 'LATENCY'),
+                 window=100, precision=0.01, confidence=0.95, n_batches=20):
+        """Constructor
+
+        Parameters
+        ----------
+        view : NetworkView
+            The network view instance
+        metrics : iterable, optional
+            The metrics monitored among 'CACHE_HIT_RATIO' and 'LATENCY'
+        window : int, optional
+            The number of requests of each window
+        precision : float, optional
+            The maximum ratio between the half-width of the confidence
+            interval of a metric and its mean
+        confidence : float, optional
+            The confidence level of confidence intervals
+        n_batches : int, optional
+            The number of batches used to compute confidence intervals
+        """
+        metrics = tuple(metrics)
+        if not metrics or \
+                any(m not in ('CACHE_HIT_RATIO', 'LATENCY') for m in metrics):
+            raise ValueError('metrics must be CACHE_HIT_RATIO or LATENCY')
+        if window < 1:
+            raise ValueError('window must be positive')
+        if precision <= 0:
+            raise ValueError('precision must be positive')
+        if confidence <= 0 or confidence >= 1:
+            raise ValueError('confidence must be greater than 0 and smaller '
+                             'than 1')
+        if n_batches < 2:
+            raise ValueError('n_batches must be at least 2')
+        self.view = view
+        self.metrics = metrics
+        self.window = window
+        self.precision = precision
+        self.confidence = confidence
+        self.n_batches = n_batches
+        self.events = {'start_session', 'cache_hit', 'end_session'}
+        if 'LATENCY' in metrics:
+            self.events |= {'request_hop', 'content_hop', 'request_path',
+                            'content_path'}
+        # Whether the monitor is in the warmup phase, whether the initial
+        # transient is over and whether measurements are precise enough
+        self.warmup = True
+        self.steady = False
+        self.converged = False
+        self.n_warmup = 0
+        self.n_measured = 0
+        # Truncation points of the initial transient, in requests
+        self.truncation = {}
+        # Window means of each metric in the current phase
+        self.series = {m: [] for m in metrics}
+        self._reset_window()
+
+    def _reset_window(self):
+        """Clear the counters of the current window"""
+        self.win_count = 0
+        self.win_hits = 0
+        self.win_success = 0
+        self.win_latency = 0.0
+
+    def start_measurement(self):
+        """Start the measured phase, discarding all measurements of the
+        warmup phase"""
+        self.warmup = False
+        self.series = {m: [] for m in self.metrics}
+        self._reset_window()
+
+    @inheritdoc(DataCollector)
+    def start_session(self, timestamp, receiver, content):
+        self.sess_hit = False
+        self.sess_latency = 0.0
+
+    @inheritdoc(DataCollector)
+    def cache_hit(self, node):
+        self.sess_hit = True
+
+    @inheritdoc(DataCollector)
+    def request_hop(self, u, v, main_path=True):
+        if main_path:
+            self.sess_latency += self.view.link_delay(u, v)
+
+    @inheritdoc(DataCollector)
+    def content_hop(self, u, v, main_path=True):
+        if main_path:
+            self.sess_latency += self.view.link_delay(u, v)
+
+    @inheritdoc(DataCollector)
+    def request_path(self, path, main_path=True):
+        if main_path:
+            self.sess_latency += path.delay
+
+    @inheritdoc(DataCollector)
+    def content_path(self, path, main_path=True):
+        if main_path:
+            self.sess_latency += path.delay
+
+    @inheritdoc(DataCollector)
+    def end_session(self, success=True):
+        if self.warmup:
+            self.n_warmup += 1
+        else:
+            self.n_measured += 1
+        self.win_count += 1
+        self.win_hits += self.sess_hit
+        if success:
+            self.win_success += 1
+            self.win_latency += self.sess_latency
+        if self.win_count == self.window:
+            self._end_window()
+
+    def _end_window(self):
+        """Record the means of the current window and check whether the
+        current phase can end"""
+        if 'CACHE_HIT_RATIO' in self.metrics:
+            self.series['CACHE_HIT_RATIO'].append(self.win_hits / self.win_count)
+        if 'LATENCY' in self.metrics and self.win_success > 0:
+            self.series['LATENCY'].append(self.win_latency / self.win_success)
+        self._reset_window()
+        lengths = [len(self.series[m]) for m in self.metrics]
+        if self.warmup:
+            if min(lengths) < 5 * self.MIN_MSER_BATCHES or \
+                    max(lengths) % 5 != 0:
+                return
+            truncation = {m: mser(self.series[m]) for m in self.metrics}
+            if all(2 * truncation[m] <= len(self.series[m])
+                   for m in self.metrics):
+                self.steady = True
+                self.truncation = {m: d * self.window
+                                   for m, d in truncation.items()}
+        elif min(lengths) >= self.n_batches and \
+                max(lengths) % self.n_batches == 0:
+            self.converged = all(err <= self.precision * abs(mean)
+                                 for mean, err in self._intervals().values())
+
+    def _intervals(self):
+        """Return the mean and the half-width of the confidence interval of
+        each metric over the measured phase"""
+        return {m: batch_means_confidence_interval(
+                        self.series[m], self.n_batches, self.confidence)
+                for m in self.metrics if len(self.series[m]) >= self.n_batches}
+
+    @inheritdoc(DataCollector)
+    def results(self):
+        results = Tree({'N_WARMUP': self.n_warmup,
+                        'N_MEASURED': self.n_measured,
+                        'STEADY_STATE': self.steady,
+                        'CONVERGED': self.converged,
+                        'TRUNCATION': self.truncation})
+        for m, (mean, err) in self._intervals().items():
+            results[m] = Tree({'MEAN': float(mean), 'HALF_WIDTH': float(err)})
+        return results
+
+
 @register_data_collector('DUMMY')
 class DummyCollector(DataCollector):
     """Dummy collector to be used for test cases only."""
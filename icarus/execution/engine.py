@@ -5,14 +5,26 @@ experiments needs to be run, instantiates all the required classes and executes
 the experiment by iterating through the event provided by an event generator
 and providing them to a strategy instance.
 """
-from icarus.execution import NetworkModel, NetworkView, NetworkController, CollectorProxy
+from operator import itemgetter
+import numbers
+
+from icarus.execution import NetworkModel, NetworkView, NetworkController, \
+                             CollectorProxy, ConvergenceMonitor
 from icarus.registry import DATA_COLLECTOR, STRATEGY
+from icarus.util import Tree
 
 
 __all__ = ['exec_experiment']
 
 
-def exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors):
+# Methods of NetworkController that can be invoked by topology events
+TOPOLOGY_EVENTS = ('remove_link', 'restore_link', 'rewire_link',
+                   'remove_node', 'restore_node')
+
+
+def exec_experiment(topology, workload, netconf, strategy, cache_policy,
+                    collectors, topology_events=None, warm_start=None,
+                    convergence=None):
     """Execute the simulation of a specific scenario.
 
     Parameters
@@ -23,8 +35,10 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
     workload : iterable
         An iterable object whose elements are (time, event) tuples, where time
         is a float type indicating the timestamp of the event to be executed
-        and event is a dictionary storing all the attributes of the event to
-        execute
+        and event stores all the attributes of the event to execute. The
+        event is either a tuple, e.g. an Event, whose elements are passed
+        positionally to the strategy or a dictionary whose items are passed
+        as keyword arguments
     netconf : dict
         Dictionary of attributes to inizialize the network model
     strategy : tree
@@ -37,18 +51,90 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
         The collectors to be used. It is a dictionary in which keys are the
         names of collectors to use and values are dictionaries of attributes
         for the collector they refer to.
+    topology_events : iterable, optional
+        The topology changes (e.g. failures and recoveries) occurring during
+        the experiment. It is an iterable of (time, event) tuples, where event
+        is a dictionary whose *action* attribute is the name of the
+        NetworkController method to invoke (remove_link, restore_link,
+        rewire_link, remove_node or restore_node) and the other attributes are
+        the arguments of the method. Each event is executed before the
+        workload events occurring at the same time or later. All topology
+        events executed between two workload events are applied to shortest
+        paths with a single update.
+    warm_start : dict, optional
+        If specified, caches are filled with their expected steady-state
+        contents before the experiment starts, so that fewer warmup requests
+        are needed. Its items are:
+         * method: warm start method passed to
+           :meth:`NetworkController.warm_start_caches`. Default: 'AUTO'
+         * n_requests, seed: arguments passed to
+           :meth:`NetworkController.warm_start_caches`. If *n_requests* is not
+           specified but *n_warmup* is, it defaults to the number of warmup
+           requests of the workload discarded
+         * pdf, contents: the popularity distribution of contents and the
+           contents it refers to. Default: the *zipf* distribution and the
+           *contents* of the workload
+         * n_warmup: if specified, only the first *n_warmup* warmup (i.e.
+           not logged) events of the workload are executed and the others are
+           discarded
+         * validate: if True, the experiment is also run without warm start
+           and with all warmup events, which requires the workload to be
+           iterable more than once. The results of this run are returned in
+           the *WARM_START.REFERENCE* branch and the differences between
+           numeric results of the two runs in the *WARM_START.DIFF* branch
+    convergence : dict, optional
+        If specified, the lengths of the warmup and measured phases are
+        determined by a :class:`ConvergenceMonitor`, initialized with the
+        items of this dictionary. The warmup phase ends as soon as the monitor
+        detects the end of the initial transient and the experiment ends as
+        soon as measurements are precise enough. Events are logged or not
+        according to these phases instead of their *log* attribute, except
+        that the measured phase starts at the first event logged by the
+        workload at the latest. Therefore, the workload determines the
+        maximum lengths of both phases. Events must be either `Event` tuples
+        or dictionaries. The lengths of both phases and whether they ended
+        because of convergence are returned in the *CONVERGENCE* branch of
+        the results
 
     Returns
     -------
     results : Tree
         A tree with the aggregated simulation results from all collectors
     """
+    if warm_start is not None:
+        warm_start = dict(warm_start)
+        if warm_start.pop('validate', False):
+            # Topology events alter the topology, so the reference run uses
+            # a copy of it
+            reference = exec_experiment(topology.copy(), workload, netconf,
+                                        strategy, cache_policy, collectors,
+                                        topology_events=topology_events,
+                                        convergence=convergence)
+            results = exec_experiment(topology, workload, netconf, strategy,
+                                      cache_policy, collectors,
+                                      topology_events=topology_events,
+                                      warm_start=warm_start,
+                                      convergence=convergence)
+            diff = Tree()
+            for path, val in results.paths().items():
+                ref = reference.getval(path)
+                if isinstance(val, numbers.Number) and \
+                        isinstance(ref, numbers.Number) and \
+                        not isinstance(val, bool):
+                    diff.setval(path, val - ref)
+            results['WARM_START']['REFERENCE'] = reference
+            results['WARM_START']['DIFF'] = diff
+            return results
+
     model = NetworkModel(topology, cache_policy, **netconf)
     view = NetworkView(model)
     controller = NetworkController(model)
 
     collectors_inst = [DATA_COLLECTOR[name](view, **params)
                        for name, params in collectors.items()]
+    if convergence is not None:
+        monitor = ConvergenceMonitor(view, **convergence)
+        collectors_inst.append(monitor)
     collector = CollectorProxy(view, collectors_inst)
     controller.attach_collector(collector)
 
@@ -56,6 +142,102 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
     strategy_args = {k: v for k, v in strategy.items() if k != 'name'}
     strategy_inst = STRATEGY[strategy_name](view, controller, **strategy_args)
 
+    # Caches are filled after the strategy is initialized since strategies
+    # may replace them
+    if warm_start is not None:
+        pdf = warm_start['pdf'] if 'pdf' in warm_start \
+              else getattr(getattr(workload, 'zipf', None), 'pdf', None)
+        if pdf is None:
+            raise ValueError('Warm start requires the popularity distribution '
+                             'of contents')
+        contents = warm_start.get('contents',
+                                  getattr(workload, 'contents', None))
+        n_requests = warm_start.get('n_requests')
+        if n_requests is None and warm_start.get('n_warmup') is not None \
+                and getattr(workload, 'n_warmup', None) is not None:
+            # Counters reflect the warmup requests replaced by the warm start
+            n_requests = max(workload.n_warmup - warm_start['n_warmup'], 0)
+        controller.warm_start_caches(pdf, contents,
+                                     warm_start.get('method', 'AUTO'),
+                                     n_requests=n_requests,
+                                     seed=warm_start.get('seed'))
+        if warm_start.get('n_warmup') is not None:
+            workload = _truncate_warmup(workload, warm_start['n_warmup'])
+    if convergence is not None:
+        workload = _monitor_convergence(workload, controller, collector,
+                                        monitor)
+
+    process_event = strategy_inst.process_event
+    if not topology_events:
+        for time, event in workload:
+            if isinstance(event, tuple):
+                process_event(time, *event)
+            else:
+                process_event(time, **event)
+        return _results(collector, warm_start)
+
+    topology_events = sorted(topology_events, key=itemgetter(0))
+    for _, event in topology_events:
+        if event['action'] not in TOPOLOGY_EVENTS:
+            raise ValueError('Unknown topology event action %s'
+                             % event['action'])
+    topology_events = iter(topology_events)
+    next_change = next(topology_events, None)
+    for time, event in workload:
+        if next_change is not None and next_change[0] <= time:
+            while next_change is not None and next_change[0] <= time:
+                change = next_change[1]
+                args = {k: v for k, v in change.items() if k != 'action'}
+                getattr(controller, change['action'])(recompute_paths=False,
+                                                      **args)
+                next_change = next(topology_events, None)
+            controller.update_shortest_paths()
+        if isinstance(event, tuple):
+            process_event(time, *event)
+        else:
+            process_event(time, **event)
+    return _results(collector, warm_start)
+
+
+def _results(collector, warm_start):
+    """Return the results of an experiment, recording the warm start
+    configuration if any"""
+    results = collector.results()
+    if warm_start is not None:
+        results['WARM_START'] = Tree(METHOD=warm_start.get('method', 'AUTO'),
+                                     N_WARMUP=warm_start.get('n_warmup'))
+    return results
+
+
+def _truncate_warmup(workload, n_warmup):
+    """Yield the events of a workload, discarding all warmup (i.e. not logged)
+    events after the first *n_warmup* ones"""
+    for time, event in workload:
+        if not event['log']:
+            if n_warmup <= 0:
+                continue
+            n_warmup -= 1
+        yield time, event
+
+
+def _monitor_convergence(workload, controller, collector, monitor):
+    """Yield the events of a workload, all logged, in the warmup phase until
+    the convergence monitor detects the end of the initial transient or an
+    event logged by the workload is found, and then in the measured phase
+    until measurements are precise enough.
+
+    During the warmup phase, only the monitor is attached to the controller,
+    while all collectors are attached during the measured phase.
+    """
+    controller.attach_collector(CollectorProxy(collector.view, [monitor]))
     for time, event in workload:
-        strategy_inst.process_event(time, **event)
-    return collector.results()
+        if monitor.warmup:
+            if monitor.steady or event['log']:
+                monitor.start_measurement()
+                controller.attach_collector(collector)
+        elif monitor.converged:
+            break
+        if not event['log']:
+            event = event._replace(log=True) if isinstance(event, tuple) \
+                    else dict(event, log=True)
+        yield time, event
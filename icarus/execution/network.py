@@ -13,14 +13,26 @@ The `NetworkController` is also responsible to notify a `DataCollectorProxy`
 of all relevant events.
 """
 import logging
-
+import collections
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
 import networkx as nx
 import fnss
 
-from icarus.registry import CACHE_POLICY
+from icarus.models.cache import build_cache, CacheWrapper, PerfectLfuCache
+from icarus.tools import che_characteristic_time_simplified
 from icarus.util import path_links, iround
 
 __all__ = [
+    'DynamicShortestPaths',
+    'ArrayPathStore',
+    'PathInfo',
     'NetworkModel',
     'NetworkView',
     'NetworkController'
@@ -54,6 +66,600 @@ def symmetrify_paths(shortest_paths):
     return shortest_paths
 
 
+class DynamicShortestPaths(object):
+    """All-pairs shortest paths kept updated as the topology changes.
+
+    Paths are computed with Dijkstra's algorithm and made symmetric as done by
+    :func:`symmetrify_paths`, i.e. the path between two nodes is the one of
+    the shortest path tree rooted at the node coming later in the node order
+    of the topology.
+
+    Topology changes must be recorded by calling the *remove_link*,
+    *add_link*, *remove_node* and *add_node* methods before the topology is
+    modified. Recorded changes are applied in one batch by calling *update*,
+    which recomputes only the shortest path trees affected by the changes.
+    These are the trees containing a removed link, the trees in which an
+    added link provides a path shorter than or as short as the current one
+    and the trees through which a restored node may transit. Removed nodes
+    that are leaves of a tree are pruned from it and restored nodes that are
+    not used for transit are attached to it as leaves. Unaffected trees are
+    identical to those that Dijkstra's algorithm would compute on the new
+    topology, so the resulting paths are the same as those of a full
+    recomputation.
+
+    Shortest path trees are built at the time of the first change, so that
+    no memory is used to store them if the topology never changes.
+
+    Parameters
+    ----------
+    topology : fnss.Topology
+        The topology. Links are weighted by their *weight* attribute, if any
+    shortest_path : dict of dict, optional
+        Precomputed all-pair shortest paths of the topology. If provided, they
+        are used until the first update, which recomputes all paths
+    """
+
+    def __init__(self, topology, shortest_path=None):
+        self.topology = topology
+        if shortest_path is None:
+            self.paths = symmetrify_paths(dict(nx.all_pairs_dijkstra_path(topology)))
+        else:
+            self.paths = dict(shortest_path)
+        # Whether the paths were computed from the shortest path trees
+        self._from_trees = shortest_path is None
+        # Distances and predecessors of each shortest path tree, keyed by root
+        self._dist = None
+        self._pred = None
+        # Position of each node in the node order of the topology
+        self._order = None
+        self._removed_links = []
+        self._added_links = []
+        self._changed = False
+
+    def _record_change(self):
+        if self._dist is None and self._from_trees:
+            # Trees must describe the topology before the change
+            self._build_trees()
+        self._changed = True
+
+    def remove_link(self, u, v):
+        """Record the removal of a link
+
+        Parameters
+        ----------
+        u, v : any hashable type
+            Endpoints of the link
+        """
+        self._record_change()
+        self._removed_links.append((u, v))
+
+    def add_link(self, u, v):
+        """Record the addition of a link
+
+        Parameters
+        ----------
+        u, v : any hashable type
+            Endpoints of the link
+        """
+        self._record_change()
+        self._added_links.append((u, v))
+
+    def remove_node(self, v):
+        """Record the removal of a node. The removal of links attached to
+        the node must be recorded separately.
+
+        Parameters
+        ----------
+        v : any hashable type
+            The node
+        """
+        self._record_change()
+
+    def add_node(self, v):
+        """Record the addition of a node. The addition of links attached to
+        the node must be recorded separately.
+
+        Parameters
+        ----------
+        v : any hashable type
+            The node
+        """
+        self._record_change()
+
+    @property
+    def pending(self):
+        """Whether there are recorded changes not applied yet"""
+        return self._changed
+
+    def _build_trees(self):
+        """Compute the shortest path trees rooted at all nodes
+
+        Returns
+        -------
+        paths : dict of dict
+            The paths of all trees keyed by root and destination
+        """
+        self._order = {v: i for i, v in enumerate(self.topology)}
+        self._dist = {}
+        self._pred = {}
+        paths = {}
+        for v in self.topology:
+            self._dist[v], paths[v] = nx.single_source_dijkstra(self.topology, v)
+            self._pred[v] = {t: path[-2] for t, path in paths[v].items()
+                             if len(path) > 1}
+        return paths
+
+    def _rebuild(self):
+        """Recompute all shortest paths"""
+        paths = symmetrify_paths(self._build_trees())
+        # Update in place so that references to the paths remain valid
+        self.paths.clear()
+        self.paths.update(paths)
+        self._from_trees = True
+
+    def update(self):
+        """Apply all recorded changes to the shortest paths
+
+        Returns
+        -------
+        roots : set
+            The roots of the shortest path trees recomputed
+        """
+        if not self._changed:
+            return set()
+        removed_links = self._removed_links
+        added_links = self._added_links
+        self._removed_links = []
+        self._added_links = []
+        self._changed = False
+        topology = self.topology
+        if self._dist is None or topology.is_directed():
+            self._rebuild()
+            return set(topology.nodes())
+        order = self._order
+        removed_nodes = set(v for v in order if v not in topology)
+        added_nodes = [v for v in topology if v not in order]
+        # Trees are rebuilt from scratch if the relative order of nodes
+        # changed (e.g. a node was removed and restored in the same batch)
+        # because paths are made symmetric according to node order
+        old_nodes = [v for v in topology if v in order]
+        if any(order[u] > order[v] for u, v in zip(old_nodes, old_nodes[1:])):
+            self._rebuild()
+            return set(topology.nodes())
+        # Split added links between links joining nodes already in the trees
+        # and links attaching an added node to them
+        new_links = []
+        attached = {v: {} for v in added_nodes}
+        for u, v in added_links:
+            if not topology.has_edge(u, v):
+                continue
+            w = topology.adj[u][v].get('weight', 1)
+            if u in attached and v in attached:
+                self._rebuild()
+                return set(topology.nodes())
+            elif u in attached:
+                attached[u][v] = w
+            elif v in attached:
+                attached[v][u] = w
+            else:
+                new_links.append((u, v, w))
+        affected = set(added_nodes)
+        for r in old_nodes:
+            dist = self._dist[r]
+            pred = self._pred[r]
+            if self._is_affected(dist, pred, removed_links, removed_nodes,
+                                 new_links):
+                affected.add(r)
+                continue
+            leaves = {}
+            for x, neighbors in attached.items():
+                dists = [(dist[a] + w, a) for a, w in neighbors.items()
+                         if a in dist]
+                if not dists:
+                    continue
+                d, a = min(dists)
+                # The tree is recomputed if the node may be reached through
+                # several neighbors or if it provides a path to a neighbor
+                # that is shorter than or as short as the current one
+                if len(dists) < len(neighbors) or \
+                        sum(1 for d_a, _ in dists if d_a == d) > 1 or \
+                        any(d + w <= dist[b] for b, w in neighbors.items()):
+                    affected.add(r)
+                    break
+                leaves[x] = d, a
+            else:
+                for x in removed_nodes:
+                    dist.pop(x, None)
+                    pred.pop(x, None)
+                for x, (d, a) in leaves.items():
+                    dist[x] = d
+                    pred[x] = a
+        for x in removed_nodes:
+            del self._dist[x]
+            del self._pred[x]
+            self.paths.pop(x, None)
+        if removed_nodes:
+            for row in self.paths.values():
+                for x in removed_nodes:
+                    row.pop(x, None)
+        self._order = order = {v: i for i, v in enumerate(topology)}
+        tree_paths = {}
+        for r in affected:
+            self._dist[r], tree_paths[r] = nx.single_source_dijkstra(topology, r)
+            self._pred[r] = {t: path[-2] for t, path in tree_paths[r].items()
+                             if len(path) > 1}
+        # The path between two nodes is taken from the tree of the node
+        # coming later in the node order
+        for r in affected:
+            old_row = self.paths.get(r, {})
+            row = {}
+            for s, path in tree_paths[r].items():
+                if order[s] <= order[r]:
+                    row[s] = path
+                    if s != r:
+                        self.paths.setdefault(s, {})[r] = list(reversed(path))
+                elif s in affected:
+                    row[s] = list(reversed(tree_paths[s][r]))
+                else:
+                    row[s] = old_row[s]
+            for s in old_row:
+                if s not in row and s in self.paths:
+                    self.paths[s].pop(r, None)
+            self.paths[r] = row
+        return affected
+
+    @staticmethod
+    def _is_affected(dist, pred, removed_links, removed_nodes, added_links):
+        """Return whether a shortest path tree needs to be recomputed after
+        removing and adding links"""
+        for u, v in removed_links:
+            if (pred.get(v) == u and v not in removed_nodes) or \
+                    (pred.get(u) == v and u not in removed_nodes):
+                return True
+        for u, v, w in added_links:
+            d_u = dist.get(u)
+            d_v = dist.get(v)
+            if d_u is not None and (d_v is None or d_u + w <= d_v):
+                return True
+            if d_v is not None and (d_u is None or d_v + w <= d_u):
+                return True
+        return False
+
+
+class ArrayPathStore(Mapping):
+    """All-pairs shortest paths stored as a predecessor matrix.
+
+    Instead of storing a list of nodes for each pair of nodes, this store
+    keeps the predecessor matrix of the shortest path trees rooted at all
+    nodes in a NumPy integer array, i.e. 4 bytes per node pair, and
+    reconstructs paths on demand. The most recently requested paths are kept
+    in an LRU cache.
+
+    The store is a read-only mapping with the same interface as the
+    dict-of-dicts of paths used by :class:`NetworkModel`, i.e. the path from
+    *s* to *t* is *store[s][t]*. As done by :func:`symmetrify_paths`, paths
+    are symmetric and the path between two nodes is the one of the tree
+    rooted at the node coming later in the node order of the topology.
+    Among shortest paths of equal length, the one selected may differ from the
+    one selected by NetworkX.
+
+    It has the same interface as :class:`DynamicShortestPaths` to record
+    topology changes, but *update* recomputes the whole predecessor matrix.
+
+    Parameters
+    ----------
+    topology : fnss.Topology
+        The topology. Links are weighted by their *weight* attribute, if any
+    cache_size : int, optional
+        The maximum number of paths kept in the LRU cache
+    predecessors : array, optional
+        A precomputed predecessor matrix of the topology, e.g. the
+        *predecessors* attribute of another store, possibly memory-mapped from
+        a file. Rows and columns are in the node order of the topology. It is
+        used until the first update
+    """
+
+    def __init__(self, topology, cache_size=4096, predecessors=None):
+        if cache_size < 0:
+            raise ValueError('cache_size must be non-negative')
+        self.topology = topology
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._changed = False
+        if predecessors is None:
+            self._compute()
+        else:
+            n = topology.number_of_nodes()
+            if predecessors.shape != (n, n):
+                raise ValueError('The predecessor matrix must have shape '
+                                 '(%d, %d)' % (n, n))
+            self._set_nodes()
+            self.predecessors = predecessors
+            self._rows = {}
+
+    def _set_nodes(self):
+        self.nodes = list(self.topology.nodes())
+        self.index = {v: i for i, v in enumerate(self.nodes)}
+
+    def _compute(self):
+        """Compute the predecessor matrix of the topology"""
+        topology = self.topology
+        self._set_nodes()
+        n = len(self.nodes)
+        u, v, w = [], [], []
+        for a, b, weight in topology.edges(data='weight', default=1):
+            u.append(self.index[a])
+            v.append(self.index[b])
+            w.append(weight)
+        graph = coo_matrix((w, (u, v)), shape=(n, n)).tocsr()
+        dtype = np.int32 if n < 2 ** 31 else np.int64
+        self.predecessors = np.empty((n, n), dtype=dtype)
+        # Trees are computed in blocks of roots to bound the memory used by
+        # the distance matrix returned by dijkstra
+        block = max(1, 2 ** 22 // max(n, 1))
+        for start in range(0, n, block):
+            roots = np.arange(start, min(start + block, n))
+            _, pred = dijkstra(graph, directed=topology.is_directed(),
+                               indices=roots, return_predecessors=True)
+            self.predecessors[start:start + len(roots)] = pred
+        self._rows = {}
+        self._cache.clear()
+
+    @property
+    def paths(self):
+        """The store itself, for interface compatibility with
+        :class:`DynamicShortestPaths`"""
+        return self
+
+    def path(self, s, t):
+        """Return the shortest path from *s* to *t*
+
+        Parameters
+        ----------
+        s : any hashable type
+            Origin node
+        t : any hashable type
+            Destination node
+
+        Returns
+        -------
+        path : list
+            List of nodes of the shortest path (origin and destination
+            included)
+
+        Raises
+        ------
+        KeyError
+            If either node is not in the topology or *t* is not reachable from
+            *s*
+        """
+        cache = self._cache
+        key = (s, t)
+        try:
+            path = cache.pop(key)
+        except KeyError:
+            pass
+        else:
+            cache[key] = path
+            return path
+        i = self.index[s]
+        j = self.index[t]
+        # Walking the tree rooted at the later node from the other node
+        # yields the path from the other node to the root
+        root, k = (j, i) if i < j else (i, j)
+        pred = self.predecessors[root].item
+        idx = [k]
+        while k != root:
+            k = pred(k)
+            if k < 0:
+                raise KeyError(t)
+            idx.append(k)
+        nodes = self.nodes
+        path = [nodes[k] for k in idx]
+        if root == i:
+            path.reverse()
+        if self.cache_size > 0:
+            if len(cache) >= self.cache_size:
+                cache.popitem(last=False)
+            cache[key] = path
+        return path
+
+    def reachable(self, s):
+        """Return the nodes reachable from *s*, in node order
+
+        Parameters
+        ----------
+        s : any hashable type
+            Origin node
+
+        Returns
+        -------
+        nodes : list
+            The nodes reachable from *s*, *s* included
+        """
+        i = self.index[s]
+        reachable = np.concatenate((self.predecessors[i, :i] >= 0, [True],
+                                    self.predecessors[i + 1:, i] >= 0))
+        return [self.nodes[j] for j in np.flatnonzero(reachable)]
+
+    def __getitem__(self, s):
+        row = self._rows.get(s)
+        if row is None:
+            if s not in self.index:
+                raise KeyError(s)
+            row = self._rows[s] = _PathStoreRow(self, s)
+        return row
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, s):
+        return s in self.index
+
+    def _record_change(self):
+        self._changed = True
+
+    def remove_link(self, u, v):
+        """Record the removal of a link"""
+        self._record_change()
+
+    def add_link(self, u, v):
+        """Record the addition of a link"""
+        self._record_change()
+
+    def remove_node(self, v):
+        """Record the removal of a node"""
+        self._record_change()
+
+    def add_node(self, v):
+        """Record the addition of a node"""
+        self._record_change()
+
+    @property
+    def pending(self):
+        """Whether there are recorded changes not applied yet"""
+        return self._changed
+
+    def update(self):
+        """Recompute the predecessor matrix if the topology changed
+
+        Returns
+        -------
+        roots : set
+            The roots of the shortest path trees recomputed
+        """
+        if not self._changed:
+            return set()
+        self._changed = False
+        self._compute()
+        return set(self.nodes)
+
+
+class _PathStoreRow(Mapping):
+    """Read-only mapping of the paths from a node of an ArrayPathStore"""
+
+    __slots__ = ('_store', '_source')
+
+    def __init__(self, store, source):
+        self._store = store
+        self._source = source
+
+    def __getitem__(self, t):
+        return self._store.path(self._source, t)
+
+    def __iter__(self):
+        return iter(self._store.reachable(self._source))
+
+    def __len__(self):
+        return len(self._store.reachable(self._source))
+
+    def __contains__(self, t):
+        try:
+            self._store.path(self._source, t)
+        except KeyError:
+            return False
+        return True
+
+
+class PathInfo(object):
+    """Immutable summary of a path.
+
+    It stores the nodes and links of a path and the positions of the caching
+    nodes on it, so that strategies and data collectors can walk a path
+    without building new lists at each request. The delay of the path is
+    computed on first access, so that data collectors interested in the
+    overall latency or length of a path do not need to process it one hop at
+    a time.
+
+    Instances for shortest paths are interned by the network model (see
+    :meth:`NetworkView.path_info`), which makes them usable as path
+    identifiers. They must not be modified.
+    """
+
+    __slots__ = ('nodes', 'hops', 'links', 'caches', '_link_delay',
+                 '_cache_nodes', '_delay', '_reverse')
+
+    def __init__(self, nodes, link_delay, cache_nodes=()):
+        """Constructor
+
+        Parameters
+        ----------
+        nodes : list
+            List of nodes of the path (origin and destination included)
+        link_delay : dict
+            Dictionary mapping links to their delay
+        cache_nodes : container, optional
+            The nodes having a cache
+        """
+        self.nodes = tuple(nodes)
+        self.hops = len(self.nodes) - 1
+        self.links = tuple(path_links(self.nodes))
+        self.caches = tuple(i for i, v in enumerate(self.nodes)
+                            if v in cache_nodes)
+        self._link_delay = link_delay
+        self._cache_nodes = cache_nodes
+        self._delay = None
+        self._reverse = None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __getitem__(self, i):
+        return self.nodes[i]
+
+    def __repr__(self):
+        return 'PathInfo(%r)' % (self.nodes,)
+
+    @property
+    def delay(self):
+        """Sum of the delays of all links of the path"""
+        if self._delay is None:
+            link_delay = self._link_delay
+            self._delay = sum(link_delay[link] for link in self.links)
+        return self._delay
+
+    @property
+    def reverse(self):
+        """The same path traversed in the opposite direction"""
+        if self._reverse is None:
+            self._reverse = PathInfo(self.nodes[::-1], self._link_delay,
+                                     self._cache_nodes)
+            self._reverse._reverse = self
+        return self._reverse
+
+    def cache_nodes(self):
+        """Return the caching nodes of the path in path order
+
+        Returns
+        -------
+        caches : list
+            List of the nodes of the path having a cache
+        """
+        nodes = self.nodes
+        return [nodes[i] for i in self.caches]
+
+
+def _interned_path_info(model, s, t):
+    """Return the summary of the shortest path from *s* to *t*, interned in
+    the network model"""
+    path_info = model.path_info
+    info = path_info.get((s, t))
+    if info is None:
+        if model.path_info_size is not None and \
+                len(path_info) >= model.path_info_size:
+            path_info.clear()
+        info = PathInfo(model.shortest_path[s][t], model.link_delay,
+                        model.cache)
+        path_info[(s, t)] = info
+    return info
+
+
 class NetworkView(object):
     """Network view
 
@@ -91,7 +697,12 @@ class NetworkView(object):
         nodes : set
             A set of all nodes currently storing the given content
         """
-        loc = set(v for v in self.model.cache if self.model.cache[v].has(k))
+        # The index may still list caches whose copy of the content expired
+        # without being evicted by a put (e.g. with TTL caches), so the
+        # content is looked up in each indexed cache before returning it
+        nodes = self.model.content_caches.get(k)
+        loc = set(v for v in nodes if self.model.cache[v].has(k)) \
+              if nodes else set()
         source = self.content_source(k)
         if source:
             loc.add(source)
@@ -131,6 +742,28 @@ class NetworkView(object):
         """
         return self.model.shortest_path[s][t]
 
+    def path_info(self, s, t):
+        """Return a summary of the shortest path from *s* to *t*
+
+        The returned object is interned, i.e. the same object is returned
+        for the same pair of nodes until shortest paths or the set of caching
+        nodes change, and must not be modified.
+
+        Parameters
+        ----------
+        s : any hashable type
+            Origin node
+        t : any hashable type
+            Destination node
+
+        Returns
+        -------
+        path_info : PathInfo
+            The nodes and links of the shortest path and the positions of
+            caching nodes on it
+        """
+        return _interned_path_info(self.model, s, t)
+
     def all_pairs_shortest_paths(self):
         """Return all pairs shortest paths
 
@@ -325,7 +958,9 @@ class NetworkModel(object):
     calls to the network controller.
     """
 
-    def __init__(self, topology, cache_policy, shortest_path=None):
+    def __init__(self, topology, cache_policy, shortest_path=None,
+                 path_store='DICT', path_cache_size=4096,
+                 path_predecessors=None):
         """Constructor
 
         Parameters
@@ -334,19 +969,53 @@ class NetworkModel(object):
             The topology object
         cache_policy : dict or Tree
             cache policy descriptor. It has the name attribute which identify
-            the cache policy name and keyworded arguments specific to the
-            policy
+            the cache policy name, keyworded arguments specific to the
+            policy and optional admission and admission_args attributes which
+            identify the admission policy wrapping it and its arguments
         shortest_path : dict of dict, optional
             The all-pair shortest paths of the network
+        path_store : str, optional
+            How shortest paths are stored. If 'DICT', all paths are stored as
+            lists in a dict of dicts. If 'ARRAY', paths are stored as a
+            predecessor matrix and reconstructed on demand (see
+            :class:`ArrayPathStore`), which uses much less memory on large
+            topologies
+        path_cache_size : int, optional
+            The number of reconstructed paths cached if *path_store* is
+            'ARRAY'
+        path_predecessors : array, optional
+            Precomputed predecessor matrix of the topology used if
+            *path_store* is 'ARRAY' (see :class:`ArrayPathStore`)
         """
         # Filter inputs
         if not isinstance(topology, fnss.Topology):
             raise ValueError('The topology argument must be an instance of '
                              'fnss.Topology or any of its subclasses.')
 
-        # Shortest paths of the network
-        self.shortest_path = dict(shortest_path) if shortest_path is not None \
-                             else symmetrify_paths(dict(nx.all_pairs_dijkstra_path(topology)))
+        # Shortest paths of the network, updated by the controller as the
+        # topology changes
+        if path_store != 'ARRAY' and path_predecessors is not None:
+            raise ValueError("A predecessor matrix can only be used with "
+                             "path_store 'ARRAY'")
+        if path_store == 'DICT':
+            self.shortest_path_engine = DynamicShortestPaths(topology,
+                                                             shortest_path)
+        elif path_store == 'ARRAY':
+            if shortest_path is not None:
+                raise ValueError("Precomputed shortest paths cannot be used "
+                                 "with path_store 'ARRAY'")
+            self.shortest_path_engine = ArrayPathStore(topology,
+                                                       path_cache_size,
+                                                       path_predecessors)
+        else:
+            raise ValueError('Unknown path store %s' % path_store)
+        self.shortest_path = self.shortest_path_engine.paths
+
+        # Summaries of the shortest paths used so far, keyed by (s, t). They
+        # are dropped when shortest paths or the caching nodes change
+        self.path_info = {}
+        self.path_info_size = path_cache_size if path_store == 'ARRAY' \
+                              else None
 
         # Network topology
         self.topology = topology
@@ -388,12 +1057,18 @@ class NetworkModel(object):
                 if cache_size[node] < 1:
                     cache_size[node] = 1
 
-        policy_name = cache_policy['name']
-        policy_args = {k: v for k, v in cache_policy.items() if k != 'name'}
+        # The cache policy descriptor, used to rebuild caches of other sizes
+        self.cache_policy = cache_policy
+
         # The actual cache objects storing the content
-        self.cache = {node: CACHE_POLICY[policy_name](cache_size[node], **policy_args)
+        self.cache = {node: build_cache(cache_size[node], cache_policy)
                           for node in cache_size}
 
+        # Dictionary mapping each content object to the set of nodes caching
+        # it. It is kept updated by the controller and only lists nodes whose
+        # cache is currently in self.cache
+        self.content_caches = {}
+
         # This is for a local un-coordinated cache (currently used only by
         # Hashrouting with edge cache)
         self.local_cache = {}
@@ -411,6 +1086,29 @@ class NetworkModel(object):
         self.removed_local_caches = {}
 
 
+class Session(object):
+    """State of the session (i.e. the retrieval of a content) being executed
+    by the network controller.
+
+    The controller reuses the same instance for all sessions. Attributes can
+    also be accessed by key, e.g. *session['content']*.
+    """
+
+    __slots__ = ('timestamp', 'receiver', 'content', 'log')
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key)
+
+
 class NetworkController(object):
     """Network controller
 
@@ -428,22 +1126,30 @@ class NetworkController(object):
             Instance of the network model
         """
         self.session = None
+        self._session = Session()
         self.model = model
         self.collector = None
+        # Events to which the attached collector subscribed
+        self._events = frozenset()
 
     def attach_collector(self, collector):
         """Attach a data collector to which all events will be reported.
 
+        Only events to which the collector subscribed, as returned by its
+        *subscribed_events* method, are reported.
+
         Parameters
         ----------
         collector : DataCollector
             The data collector
         """
         self.collector = collector
+        self._events = collector.subscribed_events()
 
     def detach_collector(self):
         """Detach the data collector."""
         self.collector = None
+        self._events = frozenset()
 
     def start_session(self, timestamp, receiver, content, log):
         """Instruct the controller to start a new session (i.e. the retrieval
@@ -461,11 +1167,13 @@ class NetworkController(object):
             *True* if this session needs to be reported to the collector,
             *False* otherwise
         """
-        self.session = dict(timestamp=timestamp,
-                            receiver=receiver,
-                            content=content,
-                            log=log)
-        if self.collector is not None and self.session['log']:
+        session = self._session
+        session.timestamp = timestamp
+        session.receiver = receiver
+        session.content = content
+        session.log = log
+        self.session = session
+        if log and 'start_session' in self._events:
             self.collector.start_session(timestamp, receiver, content)
 
     def forward_request_path(self, s, t, path=None, main_path=True):
@@ -477,17 +1185,21 @@ class NetworkController(object):
             Origin node
         t : any hashable type
             Destination node
-        path : list, optional
+        path : list or PathInfo, optional
             The path to use. If not provided, shortest path is used
         main_path : bool, optional
             If *True*, indicates that link path is on the main path that will
             lead to hit a content. It is normally used to calculate latency
             correctly in multicast cases. Default value is *True*
         """
-        if path is None:
-            path = self.model.shortest_path[s][t]
-        for u, v in path_links(path):
-            self.forward_request_hop(u, v, main_path)
+        if not self.session.log:
+            return
+        if 'request_path' in self._events:
+            self.collector.request_path(self._path_info(s, t, path), main_path)
+        elif 'request_hop' in self._events:
+            request_hop = self.collector.request_hop
+            for u, v in self._path_info(s, t, path).links:
+                request_hop(u, v, main_path)
 
     def forward_content_path(self, u, v, path=None, main_path=True):
         """Forward a content from node *s* to node *t* over the provided path.
@@ -498,7 +1210,7 @@ class NetworkController(object):
             Origin node
         t : any hashable type
             Destination node
-        path : list, optional
+        path : list or PathInfo, optional
             The path to use. If not provided, shortest path is used
         main_path : bool, optional
             If *True*, indicates that this path is being traversed by content
@@ -506,10 +1218,22 @@ class NetworkController(object):
             calculate latency correctly in multicast cases. Default value is
             *True*
         """
+        if not self.session.log:
+            return
+        if 'content_path' in self._events:
+            self.collector.content_path(self._path_info(u, v, path), main_path)
+        elif 'content_hop' in self._events:
+            content_hop = self.collector.content_hop
+            for u, v in self._path_info(u, v, path).links:
+                content_hop(u, v, main_path)
+
+    def _path_info(self, s, t, path=None):
+        """Return the summary of a path reported to collectors"""
         if path is None:
-            path = self.model.shortest_path[u][v]
-        for u, v in path_links(path):
-            self.forward_content_hop(u, v, main_path)
+            return _interned_path_info(self.model, s, t)
+        if isinstance(path, PathInfo):
+            return path
+        return PathInfo(path, self.model.link_delay, self.model.cache)
 
     def forward_request_hop(self, u, v, main_path=True):
         """Forward a request over link  u -> v.
@@ -525,7 +1249,7 @@ class NetworkController(object):
             lead to hit a content. It is normally used to calculate latency
             correctly in multicast cases. Default value is *True*
         """
-        if self.collector is not None and self.session['log']:
+        if self.session.log and 'request_hop' in self._events:
             self.collector.request_hop(u, v, main_path)
 
     def forward_content_hop(self, u, v, main_path=True):
@@ -543,7 +1267,7 @@ class NetworkController(object):
             calculate latency correctly in multicast cases. Default value is
             *True*
         """
-        if self.collector is not None and self.session['log']:
+        if self.session.log and 'content_hop' in self._events:
             self.collector.content_hop(u, v, main_path)
 
     def put_content(self, node):
@@ -565,7 +1289,32 @@ class NetworkController(object):
             The evicted object or *None* if no contents were evicted.
         """
         if node in self.model.cache:
-            return self.model.cache[node].put(self.session['content'])
+            cache = self.model.cache[node]
+            content = self.session.content
+            evicted = cache.put(content)
+            if evicted is not None:
+                self._unindex_content(evicted, node)
+            if cache.has(content):
+                self._index_content(content, node)
+            return evicted
+
+    def _index_content(self, content, node):
+        """Record in the content location index that a node caches a
+        content"""
+        nodes = self.model.content_caches.get(content)
+        if nodes is None:
+            self.model.content_caches[content] = set((node,))
+        else:
+            nodes.add(node)
+
+    def _unindex_content(self, content, node):
+        """Record in the content location index that a node no longer caches
+        a content"""
+        nodes = self.model.content_caches.get(content)
+        if nodes is not None:
+            nodes.discard(node)
+            if not nodes:
+                del self.model.content_caches[content]
 
     def get_content(self, node):
         """Get a content from a server or a cache.
@@ -581,17 +1330,17 @@ class NetworkController(object):
             True if the content is available, False otherwise
         """
         if node in self.model.cache:
-            cache_hit = self.model.cache[node].get(self.session['content'])
+            cache_hit = self.model.cache[node].get(self.session.content)
             if cache_hit:
-                if self.session['log']:
+                if self.session.log and 'cache_hit' in self._events:
                     self.collector.cache_hit(node)
             else:
-                if self.session['log']:
+                if self.session.log and 'cache_miss' in self._events:
                     self.collector.cache_miss(node)
             return cache_hit
         name, props = fnss.get_stack(self.model.topology, node)
-        if name == 'source' and self.session['content'] in props['contents']:
-            if self.collector is not None and self.session['log']:
+        if name == 'source' and self.session.content in props['contents']:
+            if self.session.log and 'server_hit' in self._events:
                 self.collector.server_hit(node)
             return True
         else:
@@ -611,7 +1360,8 @@ class NetworkController(object):
             *True* if the entry was in the cache, *False* if it was not.
         """
         if node in self.model.cache:
-            return self.model.cache[node].remove(self.session['content'])
+            self._unindex_content(self.session.content, node)
+            return self.model.cache[node].remove(self.session.content)
 
     def end_session(self, success=True):
         """Close a session
@@ -621,10 +1371,21 @@ class NetworkController(object):
         success : bool, optional
             *True* if the session was completed successfully, *False* otherwise
         """
-        if self.collector is not None and self.session['log']:
+        if self.session.log and 'end_session' in self._events:
             self.collector.end_session(success)
         self.session = None
 
+    def update_shortest_paths(self):
+        """Update shortest paths after topology changes
+
+        This method applies to shortest paths all changes made by calling
+        topology-changing methods with *recompute_paths=False*. It allows
+        applying several changes with a single recomputation, which only
+        involves the shortest path trees affected by the changes.
+        """
+        self.model.shortest_path_engine.update()
+        self.model.path_info.clear()
+
     def rewire_link(self, u, v, up, vp, recompute_paths=True):
         """Rewire an existing link to new endpoints
 
@@ -643,13 +1404,17 @@ class NetworkController(object):
             Endpoints of link before rewiring
         up, vp : any hashable type
             Endpoints of link after rewiring
+        recompute_paths: bool, optional
+            If True, update shortest paths. Otherwise, the change is applied
+            to shortest paths at the next call to *update_shortest_paths*
         """
         link = self.model.topology.adj[u][v]
+        self.model.shortest_path_engine.remove_link(u, v)
+        self.model.shortest_path_engine.add_link(up, vp)
         self.model.topology.remove_edge(u, v)
         self.model.topology.add_edge(up, vp, **link)
         if recompute_paths:
-            shortest_path = dict(nx.all_pairs_dijkstra_path(self.model.topology))
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self.update_shortest_paths()
 
     def remove_link(self, u, v, recompute_paths=True):
         """Remove a link from the topology and update the network model.
@@ -671,13 +1436,14 @@ class NetworkController(object):
         v : any hashable type
             Destination node
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, update shortest paths. Otherwise, the change is applied
+            to shortest paths at the next call to *update_shortest_paths*
         """
+        self.model.shortest_path_engine.remove_link(u, v)
         self.model.removed_links[(u, v)] = self.model.topology.adj[u][v]
         self.model.topology.remove_edge(u, v)
         if recompute_paths:
-            shortest_path = dict(nx.all_pairs_dijkstra_path(self.model.topology))
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self.update_shortest_paths()
 
     def restore_link(self, u, v, recompute_paths=True):
         """Restore a previously-removed link and update the network model
@@ -689,12 +1455,13 @@ class NetworkController(object):
         v : any hashable type
             Destination node
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, update shortest paths. Otherwise, the change is applied
+            to shortest paths at the next call to *update_shortest_paths*
         """
+        self.model.shortest_path_engine.add_link(u, v)
         self.model.topology.add_edge(u, v, **self.model.removed_links.pop((u, v)))
         if recompute_paths:
-            shortest_path = dict(nx.all_pairs_dijkstra_path(self.model.topology))
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self.update_shortest_paths()
 
     def remove_node(self, v, recompute_paths=True):
         """Remove a node from the topology and update the network model.
@@ -727,7 +1494,8 @@ class NetworkController(object):
         v : any hashable type
             Node to remove
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, update shortest paths. Otherwise, the change is applied
+            to shortest paths at the next call to *update_shortest_paths*
         """
         self.model.removed_nodes[v] = self.model.topology.node[v]
         # First need to remove all links the removed node as endpoint
@@ -735,18 +1503,21 @@ class NetworkController(object):
         self.model.disconnected_neighbors[v] = set(neighbors.keys())
         for u in self.model.disconnected_neighbors[v]:
             self.remove_link(v, u, recompute_paths=False)
+        self.model.shortest_path_engine.remove_node(v)
         self.model.topology.remove_node(v)
         if v in self.model.cache:
             self.model.removed_caches[v] = self.model.cache.pop(v)
+            self.model.path_info.clear()
+            for content in self.model.removed_caches[v].dump():
+                self._unindex_content(content, v)
         if v in self.model.local_cache:
             self.model.removed_local_caches[v] = self.model.local_cache.pop(v)
         if v in self.model.source_node:
             self.model.removed_sources[v] = self.model.source_node.pop(v)
             for content in self.model.removed_sources[v]:
-                self.model.countent_source.pop(content)
+                self.model.content_source.pop(content)
         if recompute_paths:
-            shortest_path = dict(nx.all_pairs_dijkstra_path(self.model.topology))
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self.update_shortest_paths()
 
     def restore_node(self, v, recompute_paths=True):
         """Restore a previously-removed node and update the network model.
@@ -756,8 +1527,10 @@ class NetworkController(object):
         v : any hashable type
             Node to restore
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, update shortest paths. Otherwise, the change is applied
+            to shortest paths at the next call to *update_shortest_paths*
         """
+        self.model.shortest_path_engine.add_node(v)
         self.model.topology.add_node(v, **self.model.removed_nodes.pop(v))
         for u in self.model.disconnected_neighbors[v]:
             if (v, u) in self.model.removed_links:
@@ -765,15 +1538,187 @@ class NetworkController(object):
         self.model.disconnected_neighbors.pop(v)
         if v in self.model.removed_caches:
             self.model.cache[v] = self.model.removed_caches.pop(v)
+            self.model.path_info.clear()
+            for content in self.model.cache[v].dump():
+                self._index_content(content, v)
         if v in self.model.removed_local_caches:
             self.model.local_cache[v] = self.model.removed_local_caches.pop(v)
         if v in self.model.removed_sources:
             self.model.source_node[v] = self.model.removed_sources.pop(v)
             for content in self.model.source_node[v]:
-                self.model.countent_source[content] = v
+                self.model.content_source[content] = v
         if recompute_paths:
-            shortest_path = dict(nx.all_pairs_dijkstra_path(self.model.topology))
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self.update_shortest_paths()
+
+    def warm_start_caches(self, pdf, contents=None, method='AUTO',
+                          n_requests=None, seed=None):
+        """Fill caches with their expected steady-state contents under an IRM
+        demand.
+
+        Receivers are assumed to issue requests at the same rate and requests
+        are assumed to be routed over the shortest path to the content source
+        and served by the first cache storing the content, as with on-path
+        caching strategies such as LCE, which insert missed contents in all
+        caches of the path. The requests reaching each cache are those missed
+        by the caches it is behind. Their rates are computed iteratively from
+        the steady-state cache hit ratio of each content given by the method
+        used for each cache. Only the state of the replacement policy is
+        initialized: admission policies start empty.
+
+        Parameters
+        ----------
+        pdf : array-like
+            The probability of each content being requested
+        contents : iterable, optional
+            The contents to which *pdf* refers, i.e. the i-th content is
+            requested with probability *pdf[i]*. Default: the integers from 1
+            to N
+        method : str, optional
+            How the contents of caches are determined:
+             * 'CHE': the contents of a cache are sampled from the steady
+               state of an LRU cache. The time elapsed since the last request
+               of each content is drawn and the most recently requested
+               contents are inserted in order of request time. Each content is
+               therefore in cache with the probability given by the Che's
+               approximation
+             * 'TOP': the most requested contents are inserted, in increasing
+               order of request rate
+             * 'LFU': the contents of a cache are sampled from the steady
+               state of a Perfect-LFU cache, whose counters are incremented
+               both when a content is requested and when it is inserted after
+               a miss. Contents requested much more than the others are always
+               in cache, while those at the boundary are in cache for a
+               fraction of the time such that their counters grow at the same
+               rate
+             * 'AUTO': 'LFU' for Perfect-LFU caches and 'CHE' for all other
+               caches
+        n_requests : int, optional
+            The number of past requests issued by all receivers, typically
+            the warmup requests replaced by the warm start. The frequency
+            counters of Perfect-LFU caches are initialized to their expected
+            value after these requests, given the steady-state hit ratio of
+            each content. If None, counters are only initialized by the
+            insertion of contents
+        seed : int, optional
+            The seed of the random generator
+        """
+        if method not in ('AUTO', 'CHE', 'LFU', 'TOP'):
+            raise ValueError('Unknown warm start method %s' % method)
+        pdf = np.asarray(pdf, dtype=float)
+        contents = list(range(1, len(pdf) + 1)) if contents is None \
+                   else list(contents)
+        if len(contents) != len(pdf):
+            raise ValueError('pdf and contents must have the same length')
+        rng = np.random.RandomState(seed)
+        # Replacement policies of the caches to fill and methods used
+        caches = {}
+        methods = {}
+        for v, cache in self.model.cache.items():
+            while isinstance(cache, CacheWrapper):
+                cache = cache.cache
+            if cache.maxlen > 0:
+                caches[v] = cache
+                methods[v] = method if method != 'AUTO' else \
+                             'LFU' if isinstance(cache, PerfectLfuCache) \
+                             else 'CHE'
+        # Caching nodes traversed by the requests of each receiver for the
+        # contents of each source, in path order
+        sources = collections.defaultdict(list)
+        for i, k in enumerate(contents):
+            if k in self.model.content_source:
+                sources[self.model.content_source[k]].append(i)
+        receivers = [v for v in self.model.topology
+                     if fnss.get_stack(self.model.topology, v)[0] == 'receiver']
+        paths = []
+        for r in receivers:
+            for s, idx in sources.items():
+                nodes = [v for v in self.model.shortest_path[r][s]
+                         if v in caches]
+                if nodes:
+                    paths.append((nodes, np.array(idx)))
+        # The rates of a cache only depend on those of the caches it is
+        # behind, so they are exact after as many iterations as the longest
+        # chain of caches
+        hit = {v: np.zeros(len(pdf)) for v in caches}
+        for _ in range(max([len(nodes) for nodes, _ in paths] or [0])):
+            rate = {v: np.zeros(len(pdf)) for v in caches}
+            for nodes, idx in paths:
+                r = pdf[idx] / len(receivers)
+                for v in nodes:
+                    rate[v][idx] += r
+                    r = r * (1 - hit[v][idx])
+            for v, cache in caches.items():
+                hit[v] = self._steady_state_hit_ratio(rate[v], cache.maxlen,
+                                                      methods[v])
+        for v, cache in caches.items():
+            requested = np.flatnonzero(rate[v]) if paths else []
+            size = min(cache.maxlen, len(requested))
+            if size == 0:
+                continue
+            q = rate[v][requested] / rate[v].sum()
+            if methods[v] == 'TOP':
+                items = np.argsort(-q, kind='stable')[size - 1::-1]
+            elif methods[v] == 'LFU':
+                # Systematic sampling in random order, so that exactly size
+                # contents are drawn, each with its steady-state hit ratio
+                p = hit[v][requested]
+                p *= size / p.sum()
+                order = rng.permutation(len(p))
+                points = rng.uniform() + np.arange(size)
+                items = order[np.minimum(np.searchsorted(np.cumsum(p[order]),
+                                                         points, 'right'),
+                                         len(p) - 1)]
+                items = items[np.argsort(q[items], kind='stable')]
+            else:
+                # Time elapsed since the last request of each content
+                age = rng.exponential(size=len(q)) / q
+                items = np.argpartition(age, size - 1)[:size]
+                items = items[np.argsort(-age[items], kind='stable')]
+            for i in items.tolist():
+                cache.put(contents[requested[i]])
+            if n_requests is not None and isinstance(cache, PerfectLfuCache):
+                # Counters are kept for all contents, not only those in cache,
+                # and are incremented twice on a miss
+                miss = 1 - hit[v][requested]
+                counts = np.rint(rate[v][requested] * n_requests *
+                                 (1 + miss)).astype(int)
+                counts[items] -= 1  # The insertion counts as a request
+                for i in np.flatnonzero(counts > 0).tolist():
+                    k = contents[requested[i]]
+                    for _ in range(counts[i]):
+                        cache.get(k)
+            for content in self.model.cache[v].dump():
+                self._index_content(content, v)
+
+    @staticmethod
+    def _steady_state_hit_ratio(rate, cache_size, method):
+        """Return the steady-state hit ratio of each content in a cache
+        receiving requests at the given rates"""
+        if np.count_nonzero(rate) <= cache_size:
+            return (rate > 0).astype(float)
+        if method == 'TOP':
+            hit = np.zeros(len(rate))
+            hit[np.argsort(-rate, kind='stable')[:cache_size]] = 1
+            return hit
+        if method == 'LFU':
+            # The counter of a content with hit ratio h grows at rate
+            # r * (2 - h). Those in cache part of the time grow at a common
+            # rate x, which is found by bisection so that the cache is full
+            requested = rate > 0
+            r = rate[requested]
+            lo, hi = r.min(), 2 * r.max()
+            for _ in range(100):
+                x = (lo + hi) / 2
+                if np.clip(2 - x / r, 0, 1).sum() > cache_size:
+                    lo = x
+                else:
+                    hi = x
+            hit = np.zeros(len(rate))
+            hit[requested] = np.clip(2 - hi / r, 0, 1)
+            return hit
+        q = rate / rate.sum()
+        t = che_characteristic_time_simplified(q, cache_size)
+        return 1 - np.exp(-q * t)
 
     def reserve_local_cache(self, ratio=0.1):
         """Reserve a fraction of cache as local.
@@ -793,10 +1738,14 @@ class NetworkController(object):
         """
         if ratio < 0 or ratio > 1:
             raise ValueError("ratio must be between 0 and 1")
+        # All coordinated caches are replaced by new empty caches
+        self.model.content_caches.clear()
+        self.model.path_info.clear()
         for v, c in list(self.model.cache.items()):
             maxlen = iround(c.maxlen * (1 - ratio))
             if maxlen > 0:
-                self.model.cache[v] = type(c)(maxlen)
+                self.model.cache[v] = build_cache(maxlen,
+                                                  self.model.cache_policy)
             else:
                 # If the coordinated cache size is zero, then remove cache
                 # from that location
@@ -804,7 +1753,8 @@ class NetworkController(object):
                     self.model.cache.pop(v)
             local_maxlen = iround(c.maxlen * (ratio))
             if local_maxlen > 0:
-                self.model.local_cache[v] = type(c)(local_maxlen)
+                self.model.local_cache[v] = build_cache(
+                                    local_maxlen, self.model.cache_policy)
 
     def get_content_local_cache(self, node):
         """Get content from local cache of node (if any)
@@ -819,12 +1769,12 @@ class NetworkController(object):
         """
         if node not in self.model.local_cache:
             return False
-        cache_hit = self.model.local_cache[node].get(self.session['content'])
+        cache_hit = self.model.local_cache[node].get(self.session.content)
         if cache_hit:
-            if self.session['log']:
+            if self.session.log and 'cache_hit' in self._events:
                 self.collector.cache_hit(node)
         else:
-            if self.session['log']:
+            if self.session.log and 'cache_miss' in self._events:
                 self.collector.cache_miss(node)
         return cache_hit
 
@@ -840,4 +1790,4 @@ class NetworkController(object):
             The node to query
         """
         if node in self.model.local_cache:
-            return self.model.local_cache[node].put(self.session['content'])
+            return self.model.local_cache[node].put(self.session.content)
@@ -1,7 +1,10 @@
 from __future__ import division
 import unittest
+import random
+import math
 
 import icarus.execution as collectors
+from icarus.execution.network import PathInfo
 
 
 class TestLinkLoadCollector(unittest.TestCase):
@@ -236,3 +239,135 @@ class TestCacheHitRatioCollector(unittest.TestCase):
 
         res = c.results()
         self.assertEqual({1: 0.5, 2: 0.25}, res['PER_CONTENT'])
+
+
+class TestConvergenceMonitor(unittest.TestCase):
+
+    def request(self, c, hit):
+        c.start_session(0.0, 1, 1)
+        if hit:
+            c.cache_hit(2)
+        c.end_session()
+
+    def test_transient(self):
+        rng = random.Random(0)
+        c = collectors.ConvergenceMonitor(None, metrics=['CACHE_HIT_RATIO'],
+                                          window=10, precision=0.05)
+        self.assertEqual({'start_session', 'cache_hit', 'end_session'},
+                         c.subscribed_events())
+        # The hit ratio grows exponentially from 0 to 0.5
+        i = 0
+        while not c.steady:
+            self.request(c, rng.random() < 0.5 * (1 - math.exp(-i / 300)))
+            i += 1
+        # The transient is detected and the measured phase starts at least
+        # at twice the truncation point
+        self.assertGreater(c.truncation['CACHE_HIT_RATIO'], 0)
+        self.assertGreaterEqual(c.n_warmup,
+                                2 * c.truncation['CACHE_HIT_RATIO'])
+        self.assertEqual(0, c.n_warmup % 50)
+        c.start_measurement()
+        while not c.converged:
+            self.request(c, rng.random() < 0.5)
+        res = c.results()
+        self.assertTrue(res['STEADY_STATE'])
+        self.assertTrue(res['CONVERGED'])
+        self.assertEqual(c.n_warmup, res['N_WARMUP'])
+        self.assertEqual(0, res['N_MEASURED'] % 200)
+        mean = res['CACHE_HIT_RATIO']['MEAN']
+        err = res['CACHE_HIT_RATIO']['HALF_WIDTH']
+        self.assertLessEqual(err, 0.05 * mean)
+        self.assertLess(abs(mean - 0.5), 0.05)
+
+    def test_latency(self):
+        view = type('MockNetworkView', (), {'link_delay': lambda s, u, v: 2})()
+        c = collectors.ConvergenceMonitor(view, metrics=['LATENCY'], window=2,
+                                          n_batches=2)
+        c.start_measurement()
+        for latency in (1, 3, 2, 6):
+            c.start_session(0.0, 1, 1)
+            c.request_hop(1, 2)
+            c.request_path(PathInfo.__new__(PathInfo), main_path=False)
+            c.content_hop(2, 1, main_path=False)
+            c.sess_latency += latency - 2
+            c.end_session()
+        res = c.results()
+        self.assertEqual(3, res['LATENCY']['MEAN'])
+        self.assertFalse(res['CONVERGED'])
+        self.assertNotIn('CACHE_HIT_RATIO', res)
+
+    def test_invalid_params(self):
+        self.assertRaises(ValueError, collectors.ConvergenceMonitor, None,
+                          metrics=['PATH_STRETCH'])
+        self.assertRaises(ValueError, collectors.ConvergenceMonitor, None,
+                          window=0)
+        self.assertRaises(ValueError, collectors.ConvergenceMonitor, None,
+                          precision=0)
+
+
+class TestSubscribedEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.view = type('MockNetworkView', (), {})()
+
+    def test_declared_events(self):
+        c = collectors.CacheHitRatioCollector(self.view)
+        self.assertEqual({'start_session', 'cache_hit', 'server_hit'},
+                         c.subscribed_events())
+
+    def test_overridden_events(self):
+        class HopCounter(collectors.DataCollector):
+            def request_hop(self, u, v, main_path=True):
+                pass
+        class ContentHopCounter(HopCounter):
+            def content_hop(self, u, v, main_path=True):
+                pass
+        self.assertEqual({'request_hop', 'content_hop'},
+                         ContentHopCounter(self.view).subscribed_events())
+        self.assertEqual({'start_session', 'end_session', 'cache_hit',
+                          'cache_miss', 'server_hit', 'request_hop',
+                          'content_hop'},
+                         collectors.DummyCollector(self.view).subscribed_events())
+
+    def test_proxy(self):
+        hit_ratio = collectors.CacheHitRatioCollector(self.view)
+        latency = collectors.LatencyCollector(self.view)
+        proxy = collectors.CollectorProxy(self.view, [hit_ratio, latency])
+        self.assertEqual({'start_session', 'cache_hit', 'server_hit',
+                          'request_hop', 'content_hop', 'request_path',
+                          'content_path', 'end_session'},
+                         proxy.subscribed_events())
+        self.assertEqual([hit_ratio, latency], proxy.collectors['start_session'])
+        self.assertEqual([hit_ratio], proxy.collectors['cache_hit'])
+        self.assertEqual([latency], proxy.collectors['request_hop'])
+        self.assertEqual([], proxy.collectors['cache_miss'])
+        self.assertEqual([hit_ratio, latency], proxy.collectors['results'])
+
+    def test_proxy_derived_hops(self):
+        link_load = collectors.LinkLoadCollector(self.view)
+        latency = collectors.LatencyCollector(self.view)
+        proxy = collectors.CollectorProxy(self.view, [link_load, latency])
+        self.assertIn('request_path', proxy.subscribed_events())
+        self.assertEqual([link_load],
+                         proxy.derived_hop_collectors['request_hop'])
+        link_delay = {(1, 2): 2, (2, 3): 3, (3, 2): 3, (2, 1): 2}
+        proxy.start_session(3.0, 1, 'CONTENT')
+        proxy.request_path(PathInfo([1, 2, 3], link_delay))
+        proxy.content_path(PathInfo([3, 2, 1], link_delay))
+        proxy.content_path(PathInfo([2, 3], link_delay), main_path=False)
+        proxy.end_session()
+        self.assertEqual(10, latency.results()['MEAN'])
+        self.assertEqual({(1, 2): 1, (2, 3): 1}, dict(link_load.req_count))
+        self.assertEqual({(3, 2): 1, (2, 1): 1, (2, 3): 1},
+                         dict(link_load.cont_count))
+
+    def test_path_events_without_proxy(self):
+        class HopCounter(collectors.DataCollector):
+            def __init__(self, view):
+                self.hops = []
+            def request_hop(self, u, v, main_path=True):
+                self.hops.append((u, v))
+        c = HopCounter(self.view)
+        self.assertEqual({'request_hop'}, c.subscribed_events())
+        c.request_path(PathInfo([1, 2, 3], {}))
+        self.assertEqual([(1, 2), (2, 3)], c.hops)
@@ -0,0 +1,176 @@
+from __future__ import division
+import unittest
+
+import networkx as nx
+import fnss
+
+from icarus.scenarios import IcnTopology, Event, StationaryWorkload, \
+                             topology_tree, uniform_cache_placement, \
+                             uniform_content_placement
+from icarus.execution import exec_experiment
+
+
+class TestExecExperiment(unittest.TestCase):
+
+    def setUp(self):
+        # Topology sketch
+        #
+        # 0 ---- 1 ---- 2 ---- 3 ---- 4
+        #        |             |
+        #        |             |
+        #        5 -- 6 - 7 -- 8
+        #
+        topology = IcnTopology()
+        nx.add_path(topology, [0, 1, 2, 3, 4])
+        nx.add_path(topology, [1, 5, 6, 7, 8, 3])
+        fnss.add_stack(topology, 4, 'source', {'contents': [1, 2, 3]})
+        fnss.add_stack(topology, 0, 'receiver', {})
+        for v in (1, 2, 3, 5, 6, 7, 8):
+            fnss.add_stack(topology, v, 'router', {'cache_size': 1})
+        fnss.set_delays_constant(topology, 1, 'ms')
+        self.topology = topology
+        self.workload = [(t, {'receiver': 0, 'content': 1, 'log': True})
+                         for t in (1.0, 2.0, 3.0)]
+
+    def run_experiment(self, topology_events=None):
+        results = exec_experiment(self.topology, self.workload, {},
+                                  {'name': 'NO_CACHE'}, {'name': 'LRU'},
+                                  {'LATENCY': {}},
+                                  topology_events=topology_events)
+        return results['LATENCY']['MEAN']
+
+    def test_no_topology_events(self):
+        self.assertEqual(8, self.run_experiment())
+
+    def test_tuple_events(self):
+        self.workload = [(t, Event(0, 1, True)) for t in (1.0, 2.0, 3.0)]
+        self.assertEqual(8, self.run_experiment())
+        self.workload = [(1.0, Event(0, 1, True)),
+                         (2.0, {'receiver': 0, 'content': 1, 'log': True})]
+        self.assertEqual(8, self.run_experiment(
+                        [(1.5, {'action': 'remove_link', 'u': 6, 'v': 7})]))
+
+    def test_topology_events(self):
+        # While link 2-3 is down, requests take the 7-hop path
+        latency = self.run_experiment([
+                        (2.5, {'action': 'restore_link', 'u': 2, 'v': 3}),
+                        (1.5, {'action': 'remove_link', 'u': 2, 'v': 3})])
+        self.assertAlmostEqual((8 + 14 + 8) / 3, latency)
+
+    def test_topology_events_same_time(self):
+        latency = self.run_experiment([
+                        (1.5, {'action': 'remove_node', 'v': 2}),
+                        (1.5, {'action': 'remove_link', 'u': 6, 'v': 7}),
+                        (1.5, {'action': 'restore_link', 'u': 6, 'v': 7})])
+        self.assertAlmostEqual((8 + 14 + 14) / 3, latency)
+
+    def test_unknown_topology_event(self):
+        self.assertRaises(ValueError, self.run_experiment,
+                          [(1.5, {'action': 'remove_cache', 'v': 2})])
+
+    def test_warm_start(self):
+        warm_start = {'method': 'TOP', 'pdf': [0.8, 0.1, 0.1]}
+        results = exec_experiment(self.topology, self.workload, {},
+                                  {'name': 'LCE'}, {'name': 'LRU'},
+                                  {'LATENCY': {}}, warm_start=warm_start)
+        # Content 1 is in the cache of node 1 from the start
+        self.assertEqual(2, results['LATENCY']['MEAN'])
+        self.assertEqual('TOP', results['WARM_START']['METHOD'])
+        self.assertIsNone(results['WARM_START']['N_WARMUP'])
+
+    def test_warm_start_validate(self):
+        warm_start = {'method': 'TOP', 'pdf': [0.8, 0.1, 0.1],
+                      'validate': True}
+        results = exec_experiment(self.topology, self.workload, {},
+                                  {'name': 'LCE'}, {'name': 'LRU'},
+                                  {'LATENCY': {}}, warm_start=warm_start)
+        reference = results['WARM_START']['REFERENCE']
+        self.assertAlmostEqual((8 + 2 + 2) / 3, reference['LATENCY']['MEAN'])
+        self.assertAlmostEqual(2 - (8 + 2 + 2) / 3,
+                               results['WARM_START']['DIFF']['LATENCY']['MEAN'])
+
+    def test_warm_start_validate_same_events(self):
+        workload = StationaryWorkload(self.topology, 3, 0.8, n_warmup=0,
+                                      n_measured=100, seed=1)
+        events = list(workload)
+        warm_start = {'method': 'TOP', 'pdf': workload.zipf.pdf}
+        expected = [exec_experiment(self.topology.copy(), events, {},
+                                    {'name': 'LCE'}, {'name': 'LRU'},
+                                    {'CACHE_HIT_RATIO': {}},
+                                    warm_start=ws)['CACHE_HIT_RATIO']['MEAN']
+                    for ws in (None, warm_start)]
+        results = exec_experiment(self.topology, workload, {},
+                                  {'name': 'LCE'}, {'name': 'LRU'},
+                                  {'CACHE_HIT_RATIO': {}},
+                                  warm_start=dict(warm_start, validate=True))
+        reference = results['WARM_START']['REFERENCE']
+        self.assertEqual(expected, [reference['CACHE_HIT_RATIO']['MEAN'],
+                                    results['CACHE_HIT_RATIO']['MEAN']])
+
+    def test_warm_start_n_warmup(self):
+        self.workload = [(1.0, Event(0, 2, False)),
+                         (2.0, Event(0, 3, False)),
+                         (3.0, Event(0, 1, True))]
+        warm_start = {'method': 'TOP', 'pdf': [0.1, 0.8, 0.1], 'n_warmup': 1}
+        results = exec_experiment(self.topology, self.workload, {},
+                                  {'name': 'LCE'}, {'name': 'LRU'},
+                                  {'CACHE_HIT_RATIO': {}},
+                                  warm_start=warm_start)
+        # Content 1 is cached at node 2. If the second warmup event was not
+        # discarded, content 3 would evict it
+        self.assertEqual(1, results['CACHE_HIT_RATIO']['MEAN'])
+        self.assertEqual(1, results['WARM_START']['N_WARMUP'])
+
+    def test_warm_start_lfu(self):
+        # The warm start replaces a long warmup of Perfect-LFU caches
+        topology = topology_tree(2, 3)
+        uniform_cache_placement(topology, 30)
+        uniform_content_placement(topology, range(1, 101), seed=0)
+        workload = StationaryWorkload(topology, 100, 0.8, n_warmup=20000,
+                                      n_measured=10000, seed=1)
+        results = exec_experiment(topology, workload, {}, {'name': 'LCE'},
+                                  {'name': 'PERFECT_LFU'},
+                                  {'CACHE_HIT_RATIO': {}},
+                                  warm_start={'n_warmup': 0, 'seed': 1,
+                                              'validate': True})
+        diff = results['WARM_START']['DIFF']['CACHE_HIT_RATIO']['MEAN']
+        self.assertLess(abs(diff), 0.01)
+
+    def test_warm_start_no_pdf(self):
+        self.assertRaises(ValueError, exec_experiment, self.topology,
+                          self.workload, {}, {'name': 'LCE'}, {'name': 'LRU'},
+                          {'LATENCY': {}}, warm_start={})
+
+    def test_convergence(self):
+        # Content 1 is always in the cache of node 1 after the first request
+        self.workload = [(t, Event(0, 1, False)) for t in range(10000)]
+        convergence = {'metrics': ['CACHE_HIT_RATIO', 'LATENCY'],
+                       'window': 10, 'n_batches': 5}
+        results = exec_experiment(self.topology, self.workload, {},
+                                  {'name': 'LCE'}, {'name': 'LRU'},
+                                  {'LATENCY': {}, 'CACHE_HIT_RATIO': {}},
+                                  convergence=convergence)
+        res = results['CONVERGENCE']
+        self.assertTrue(res['STEADY_STATE'])
+        self.assertTrue(res['CONVERGED'])
+        self.assertEqual(500, res['N_WARMUP'])
+        self.assertEqual(50, res['N_MEASURED'])
+        self.assertEqual(2, res['LATENCY']['MEAN'])
+        self.assertEqual(0, res['LATENCY']['HALF_WIDTH'])
+        self.assertEqual(1, results['CACHE_HIT_RATIO']['MEAN'])
+        self.assertEqual(2, results['LATENCY']['MEAN'])
+
+    def test_convergence_logged_events(self):
+        # The measured phase starts at the first logged event at the latest
+        # and ends with the workload
+        self.workload = [(t, {'receiver': 0, 'content': 1, 'log': t >= 3})
+                         for t in range(6)]
+        results = exec_experiment(self.topology, self.workload, {},
+                                  {'name': 'LCE'}, {'name': 'LRU'},
+                                  {'CACHE_HIT_RATIO': {}}, convergence={})
+        res = results['CONVERGENCE']
+        self.assertFalse(res['STEADY_STATE'])
+        self.assertFalse(res['CONVERGED'])
+        self.assertEqual(3, res['N_WARMUP'])
+        self.assertEqual(3, res['N_MEASURED'])
+        self.assertEqual(1, results['CACHE_HIT_RATIO']['MEAN'])
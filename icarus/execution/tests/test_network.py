@@ -1,11 +1,17 @@
 from __future__ import division
 import unittest
+import random
 
+import numpy as np
 import networkx as nx
 import fnss
 
 from icarus.scenarios import IcnTopology
-from icarus.execution.collectors import DummyCollector
+from icarus.models import InsertAfterKHitsCache, SegmentedLruCache
+from icarus.tools import TruncatedZipfDist, \
+    che_per_content_cache_hit_ratio_simplified
+from icarus.execution.collectors import DummyCollector, CollectorProxy, \
+    LatencyCollector, LinkLoadCollector
 
 import icarus.execution.network as network
 
@@ -73,6 +79,46 @@ class TestNetworkMVC(unittest.TestCase):
         self.collector = DummyCollector(self.view)
         self.controller.attach_collector(self.collector)
 
+    def test_session(self):
+        self.controller.start_session(3, 0, 2, True)
+        session = self.controller.session
+        self.assertEqual(2, session.content)
+        self.assertEqual(0, session['receiver'])
+        self.assertRaises(KeyError, session.__getitem__, 'size')
+        self.controller.end_session()
+        self.assertIsNone(self.controller.session)
+        self.controller.start_session(4, 0, 3, False)
+        self.assertIs(session, self.controller.session)
+        self.assertEqual(3, session['content'])
+        self.assertFalse(session['log'])
+
+    def test_path_info(self):
+        path = self.view.path_info(0, 4)
+        self.assertIs(path, self.view.path_info(0, 4))
+        self.assertEqual((0, 1, 2, 3, 4), path.nodes)
+        self.assertEqual(4, path.hops)
+        self.assertEqual(((0, 1), (1, 2), (2, 3), (3, 4)), path.links)
+        self.assertEqual((1, 2, 3), path.caches)
+        self.assertEqual([1, 2, 3], path.cache_nodes())
+        reverse = path.reverse
+        self.assertEqual((4, 3, 2, 1, 0), reverse.nodes)
+        self.assertEqual(((4, 3), (3, 2), (2, 1), (1, 0)), reverse.links)
+        self.assertEqual((1, 2, 3), reverse.caches)
+        self.assertIs(path, reverse.reverse)
+        self.assertEqual((0,), self.view.path_info(0, 0).nodes)
+        self.assertEqual((), self.view.path_info(0, 0).links)
+
+    def test_path_info_invalidation(self):
+        path = self.view.path_info(0, 4)
+        self.controller.remove_node(2)
+        path = self.view.path_info(0, 4)
+        self.assertEqual((0, 1, 5, 6, 7, 8, 3, 4), path.nodes)
+        self.assertEqual((1, 2, 3, 4, 5, 6), path.caches)
+        self.controller.restore_node(2)
+        self.assertEqual((1, 2, 3), self.view.path_info(0, 4).caches)
+        self.controller.reserve_local_cache(0.5)
+        self.assertEqual((), self.view.path_info(0, 4).caches)
+
     def test_remove_restore_link(self):
         self.assertEqual([0, 1, 2, 3, 4], self.view.shortest_path(0, 4))
         self.assertEqual(1, self.topology.adj[2][3]['a'])
@@ -114,3 +160,442 @@ class TestNetworkMVC(unittest.TestCase):
         self.controller.rewire_link(1, 3, 1, 5, recompute_paths=True)
         self.assertEqual([0, 1, 2, 3, 4], self.view.shortest_path(0, 4))
         self.assertEqual(1, self.topology.adj[2][3]['a'])
+
+    def test_content_locations_put_evict(self):
+        self.assertEqual({4}, self.view.content_locations(1))
+        self.controller.start_session(0, 0, 1, False)
+        self.controller.put_content(2)
+        self.controller.put_content(3)
+        self.controller.end_session()
+        self.assertEqual({2, 3, 4}, self.view.content_locations(1))
+        # Caches have size 1, so inserting content 2 evicts content 1
+        self.controller.start_session(1, 0, 2, False)
+        self.assertEqual(1, self.controller.put_content(2))
+        self.controller.end_session()
+        self.assertEqual({3, 4}, self.view.content_locations(1))
+        self.assertEqual({2, 4}, self.view.content_locations(2))
+
+    def test_content_locations_remove_content(self):
+        self.controller.start_session(0, 0, 1, False)
+        self.controller.put_content(2)
+        self.controller.put_content(3)
+        self.assertTrue(self.controller.remove_content(2))
+        self.controller.end_session()
+        self.assertEqual({3, 4}, self.view.content_locations(1))
+
+    def test_content_locations_remove_restore_node(self):
+        self.controller.start_session(0, 0, 1, False)
+        self.controller.put_content(2)
+        self.controller.put_content(5)
+        self.controller.end_session()
+        self.controller.remove_node(2)
+        self.assertEqual({4, 5}, self.view.content_locations(1))
+        self.controller.restore_node(2)
+        self.assertEqual({2, 4, 5}, self.view.content_locations(1))
+
+    def test_content_locations_remove_restore_source(self):
+        self.controller.remove_node(4)
+        self.assertEqual(set(), self.view.content_locations(1))
+        self.controller.restore_node(4)
+        self.assertEqual({4}, self.view.content_locations(1))
+
+    def test_content_locations_reserve_local_cache(self):
+        self.controller.start_session(0, 0, 1, False)
+        self.controller.put_content(2)
+        self.controller.end_session()
+        self.controller.reserve_local_cache(0.5)
+        self.assertEqual({4}, self.view.content_locations(1))
+
+    def test_reserve_local_cache_policy(self):
+        for v in (1, 2, 3, 5, 6, 7, 8):
+            self.topology.node[v]['stack'][1]['cache_size'] = 4
+        for policy, cls in [({'name': 'LRU', 'admission': 'K_HITS',
+                              'admission_args': {'k': 3}},
+                             InsertAfterKHitsCache),
+                            ({'name': 'SLRU', 'segments': 2},
+                             SegmentedLruCache)]:
+            model = network.NetworkModel(self.topology, cache_policy=policy)
+            controller = network.NetworkController(model)
+            controller.reserve_local_cache(0.5)
+            for caches in (model.cache, model.local_cache):
+                self.assertIsInstance(caches[1], cls)
+                self.assertEqual(2, caches[1].maxlen)
+        # Items are inserted only after k requests in both caches
+        model = network.NetworkModel(self.topology, cache_policy={
+                        'name': 'LRU', 'admission': 'K_HITS',
+                        'admission_args': {'k': 3}})
+        network.NetworkController(model).reserve_local_cache(0.5)
+        for cache in (model.cache[1], model.local_cache[1]):
+            cache.put(10)
+            cache.put(10)
+            self.assertFalse(cache.has(10))
+            cache.put(10)
+            self.assertTrue(cache.has(10))
+
+    def test_content_locations_cache_scan(self):
+        # Compare the index against a scan of all caches over a random
+        # sequence of insertions and removals
+        model = network.NetworkModel(self.topology,
+                                     cache_policy={'name': 'LRU'})
+        for v in model.cache:
+            model.cache[v] = type(model.cache[v])(3)
+        view = network.NetworkView(model)
+        controller = network.NetworkController(model)
+        rng = random.Random(0)
+        for i in range(500):
+            controller.start_session(i, 0, rng.randint(1, 10), False)
+            node = rng.choice([1, 2, 3, 5, 6, 7, 8])
+            if rng.random() < 0.8:
+                controller.put_content(node)
+            else:
+                controller.remove_content(node)
+            controller.end_session()
+            for k in range(1, 11):
+                expected = set(v for v in model.cache if model.cache[v].has(k))
+                if k in model.content_source:
+                    expected.add(model.content_source[k])
+                self.assertEqual(expected, view.content_locations(k))
+
+    def test_batch_topology_changes(self):
+        self.controller.remove_link(2, 3, recompute_paths=False)
+        self.controller.remove_node(6, recompute_paths=False)
+        self.assertEqual([0, 1, 2, 3, 4], self.view.shortest_path(0, 4))
+        self.controller.update_shortest_paths()
+        self.assertNotIn(4, self.view.all_pairs_shortest_paths()[0])
+        self.controller.restore_link(2, 3, recompute_paths=False)
+        self.controller.restore_node(6, recompute_paths=False)
+        self.controller.update_shortest_paths()
+        self.assertEqual([0, 1, 2, 3, 4], self.view.shortest_path(0, 4))
+        self.assertEqual([6, 5, 1], self.view.shortest_path(6, 1))
+
+
+class TestWarmStartCaches(unittest.TestCase):
+
+    def setUp(self):
+        # Receiver 0, caches 1 and 2, source 3
+        self.topology = IcnTopology()
+        nx.add_path(self.topology, [0, 1, 2, 3])
+        fnss.add_stack(self.topology, 0, 'receiver', {})
+        fnss.add_stack(self.topology, 3, 'source',
+                       {'contents': list(range(1, 21))})
+        for v in (1, 2):
+            fnss.add_stack(self.topology, v, 'router', {'cache_size': 3})
+        self.pdf = TruncatedZipfDist(0.8, 20).pdf
+
+    def build(self, cache_policy):
+        model = network.NetworkModel(self.topology, cache_policy)
+        return model, network.NetworkView(model), \
+               network.NetworkController(model)
+
+    def test_top(self):
+        model, view, controller = self.build({'name': 'PERFECT_LFU'})
+        controller.warm_start_caches(self.pdf, method='TOP', n_requests=1000)
+        self.assertEqual([1, 2, 3], model.cache[1].dump())
+        # The second cache receives the misses of the first one
+        self.assertEqual([4, 5, 6], model.cache[2].dump())
+        self.assertEqual({1, 3}, view.content_locations(1))
+        self.assertEqual({2, 3}, view.content_locations(5))
+        # Frequency counters are initialized, so an unpopular content is not
+        # inserted
+        controller.start_session(0, 0, 20, False)
+        self.assertFalse(controller.get_content(1))
+        self.assertEqual(20, controller.put_content(1))
+
+    def test_che(self):
+        model, view, controller = self.build({'name': 'LRU',
+                                              'admission': 'TINYLFU'})
+        controller.warm_start_caches(self.pdf, contents=range(1, 21),
+                                     method='CHE', seed=1)
+        for v in (1, 2):
+            self.assertEqual(3, len(model.cache[v]))
+            for k in model.cache[v].dump():
+                self.assertIn(v, view.content_locations(k))
+        dump = model.cache[1].dump()
+        model, _, controller = self.build({'name': 'LRU'})
+        controller.warm_start_caches(self.pdf, method='AUTO', seed=1)
+        self.assertEqual(dump, model.cache[1].dump())
+
+    def test_che_hit_ratio(self):
+        # Contents are in the first cache with the probability given by the
+        # Che's approximation
+        hits = np.zeros(20)
+        n = 400
+        for seed in range(n):
+            model, _, controller = self.build({'name': 'LRU'})
+            controller.warm_start_caches(self.pdf, method='CHE', seed=seed)
+            for k in model.cache[1].dump():
+                hits[k - 1] += 1
+        expected = che_per_content_cache_hit_ratio_simplified(self.pdf, 3)
+        np.testing.assert_allclose(expected, hits / n, atol=0.1)
+
+    def test_lfu_hit_ratio(self):
+        hits = np.zeros(20)
+        n = 400
+        for seed in range(n):
+            model, _, controller = self.build({'name': 'PERFECT_LFU'})
+            controller.warm_start_caches(self.pdf, seed=seed)
+            self.assertEqual(3, len(model.cache[1]))
+            for k in model.cache[1].dump():
+                hits[k - 1] += 1
+        expected = network.NetworkController._steady_state_hit_ratio(
+                        self.pdf, 3, 'LFU')
+        self.assertAlmostEqual(3, expected.sum())
+        # The most popular content is always in cache, while the counters of
+        # those at the boundary grow at the same rate
+        self.assertEqual(1, expected[0])
+        boundary = (expected > 0) & (expected < 1)
+        growth = self.pdf[boundary] * (2 - expected[boundary])
+        self.assertGreater(len(growth), 1)
+        np.testing.assert_allclose(growth[0], growth)
+        np.testing.assert_allclose(expected, hits / n, atol=0.1)
+
+    def test_invalid_params(self):
+        _, _, controller = self.build({'name': 'LRU'})
+        self.assertRaises(ValueError, controller.warm_start_caches, self.pdf,
+                          method='LRU')
+        self.assertRaises(ValueError, controller.warm_start_caches, self.pdf,
+                          contents=[1, 2])
+
+
+class TestDynamicShortestPaths(unittest.TestCase):
+
+    @staticmethod
+    def all_pairs_shortest_paths(topology):
+        return network.symmetrify_paths(dict(nx.all_pairs_dijkstra_path(topology)))
+
+    def test_remove_restore_link(self):
+        topology = nx.cycle_graph(9)
+        paths = network.DynamicShortestPaths(topology)
+        paths.remove_link(0, 1)
+        topology.remove_edge(0, 1)
+        self.assertTrue(paths.pending)
+        roots = paths.update()
+        self.assertFalse(paths.pending)
+        # Trees not using the link are not recomputed
+        self.assertLess(len(roots), topology.number_of_nodes())
+        self.assertEqual(self.all_pairs_shortest_paths(topology), paths.paths)
+        paths.add_link(0, 1)
+        topology.add_edge(0, 1)
+        paths.update()
+        self.assertEqual(self.all_pairs_shortest_paths(topology), paths.paths)
+
+    def test_no_changes(self):
+        topology = nx.path_graph(4)
+        paths = network.DynamicShortestPaths(topology)
+        self.assertEqual(set(), paths.update())
+
+    def test_precomputed_paths(self):
+        topology = nx.path_graph(4)
+        shortest_path = {u: {v: [u, v]} for u, v in topology.edges()}
+        paths = network.DynamicShortestPaths(topology, shortest_path)
+        self.assertEqual(shortest_path, paths.paths)
+        paths.remove_link(2, 3)
+        topology.remove_edge(2, 3)
+        paths.update()
+        self.assertEqual(self.all_pairs_shortest_paths(topology), paths.paths)
+
+    def test_random_changes(self):
+        # Compare incremental updates against a full recomputation over
+        # random batches of link and node removals and restorations
+        rng = random.Random(0)
+        topology = nx.gnm_random_graph(20, 35, seed=0)
+        for u, v in topology.edges():
+            topology.adj[u][v]['weight'] = rng.choice([1, 2, 3])
+        paths = network.DynamicShortestPaths(topology)
+        removed_links = {}
+        removed_nodes = {}
+        for _ in range(50):
+            for _ in range(rng.randint(1, 3)):
+                p = rng.random()
+                if p < 0.35 and topology.number_of_edges() > 0:
+                    u, v = rng.choice(list(topology.edges()))
+                    paths.remove_link(u, v)
+                    removed_links[(u, v)] = topology.adj[u][v]
+                    topology.remove_edge(u, v)
+                elif p < 0.6 and removed_links:
+                    u, v = rng.choice(list(removed_links))
+                    if u in topology and v in topology:
+                        paths.add_link(u, v)
+                        topology.add_edge(u, v, **removed_links.pop((u, v)))
+                elif p < 0.8:
+                    x = rng.choice(list(topology.nodes()))
+                    neighbors = dict(topology.adj[x])
+                    for u in neighbors:
+                        paths.remove_link(x, u)
+                    paths.remove_node(x)
+                    topology.remove_node(x)
+                    removed_nodes[x] = neighbors
+                elif removed_nodes:
+                    x = rng.choice(list(removed_nodes))
+                    neighbors = removed_nodes.pop(x)
+                    paths.add_node(x)
+                    topology.add_node(x)
+                    for u, attr in neighbors.items():
+                        if u in topology:
+                            paths.add_link(x, u)
+                            topology.add_edge(x, u, **attr)
+            paths.update()
+            self.assertEqual(self.all_pairs_shortest_paths(topology),
+                             paths.paths)
+
+
+class TestArrayPathStore(unittest.TestCase):
+
+    @staticmethod
+    def path_weight(topology, path):
+        return sum(topology.adj[u][v].get('weight', 1)
+                   for u, v in zip(path[:-1], path[1:]))
+
+    def test_paths(self):
+        topology = nx.gnm_random_graph(30, 60, seed=1)
+        rng = random.Random(1)
+        for u, v in topology.edges():
+            topology.adj[u][v]['weight'] = rng.choice([1, 2, 3])
+        store = network.ArrayPathStore(topology, cache_size=10)
+        expected = dict(nx.all_pairs_dijkstra_path_length(topology))
+        self.assertEqual(set(topology.nodes()), set(store))
+        for s in topology.nodes():
+            self.assertEqual(set(expected[s]), set(store[s]))
+            for t in expected[s]:
+                path = store[s][t]
+                self.assertEqual(s, path[0])
+                self.assertEqual(t, path[-1])
+                self.assertTrue(all(topology.has_edge(u, v)
+                                    for u, v in zip(path[:-1], path[1:])))
+                self.assertEqual(expected[s][t],
+                                 self.path_weight(topology, path))
+                self.assertEqual(list(reversed(path)), store[t][s])
+        self.assertLessEqual(len(store._cache), 10)
+
+    def test_unreachable(self):
+        topology = nx.Graph()
+        nx.add_path(topology, [1, 2, 3])
+        nx.add_path(topology, [4, 5])
+        store = network.ArrayPathStore(topology)
+        self.assertEqual([1, 2, 3], store[1][3])
+        self.assertEqual([3, 2, 1], store[3][1])
+        self.assertEqual([4], store[4][4])
+        self.assertNotIn(4, store[1])
+        self.assertRaises(KeyError, lambda: store[1][4])
+        self.assertRaises(KeyError, lambda: store[6])
+        self.assertEqual([4, 5], list(store[5]))
+
+    def test_update(self):
+        topology = nx.cycle_graph(5)
+        store = network.ArrayPathStore(topology)
+        self.assertEqual([0, 1, 2], store[0][2])
+        store.remove_link(0, 1)
+        topology.remove_edge(0, 1)
+        self.assertTrue(store.pending)
+        store.update()
+        self.assertFalse(store.pending)
+        self.assertEqual([0, 4, 3, 2], store[0][2])
+
+    def test_network_model(self):
+        topology = TestNetworkMVC.build_topology()
+        model = network.NetworkModel(topology, cache_policy={'name': 'FIFO'},
+                                     path_store='ARRAY')
+        view = network.NetworkView(model)
+        controller = network.NetworkController(model)
+        self.assertEqual([0, 1, 2, 3, 4], view.shortest_path(0, 4))
+        controller.remove_link(2, 3)
+        self.assertEqual([0, 1, 5, 6, 7, 8, 3, 4], view.shortest_path(0, 4))
+        controller.restore_link(2, 3)
+        self.assertEqual([0, 1, 2, 3, 4], view.shortest_path(0, 4))
+
+    def test_unknown_path_store(self):
+        topology = TestNetworkMVC.build_topology()
+        self.assertRaises(ValueError, network.NetworkModel, topology,
+                          {'name': 'FIFO'}, path_store='LIST')
+
+    def test_predecessors(self):
+        topology = TestNetworkMVC.build_topology()
+        predecessors = network.ArrayPathStore(topology).predecessors
+        model = network.NetworkModel(topology, cache_policy={'name': 'FIFO'},
+                                     path_store='ARRAY',
+                                     path_predecessors=predecessors)
+        self.assertIs(predecessors, model.shortest_path.predecessors)
+        self.assertEqual([0, 1, 2, 3, 4], model.shortest_path[0][4])
+        self.assertRaises(ValueError, network.ArrayPathStore, topology,
+                          predecessors=predecessors[1:])
+        self.assertRaises(ValueError, network.NetworkModel, topology,
+                          {'name': 'FIFO'}, path_predecessors=predecessors)
+
+
+class TestCollectorEvents(unittest.TestCase):
+
+    class HitCollector(DummyCollector):
+        events = {'start_session', 'cache_hit', 'server_hit'}
+
+    def setUp(self):
+        topology = TestNetworkMVC.build_topology()
+        model = network.NetworkModel(topology, cache_policy={'name': 'FIFO'})
+        self.view = network.NetworkView(model)
+        self.controller = network.NetworkController(model)
+
+    def test_unsubscribed_events(self):
+        collector = self.HitCollector(self.view)
+        self.controller.attach_collector(collector)
+        self.controller.start_session(0, 0, 1, True)
+        self.controller.forward_request_path(0, 4)
+        self.controller.forward_request_hop(4, 3)
+        self.controller.get_content(1)
+        self.controller.get_content(4)
+        self.controller.forward_content_path(4, 0)
+        self.controller.end_session()
+        summary = collector.session_summary()
+        self.assertEqual(4, summary['serving_node'])
+        self.assertEqual([], summary['request_hops'])
+        self.assertEqual([], summary['content_hops'])
+        self.assertEqual([], summary['cache_misses'])
+        self.assertNotIn('success', summary)
+
+    def test_subscribed_events(self):
+        collector = DummyCollector(self.view)
+        self.controller.attach_collector(collector)
+        self.controller.start_session(0, 0, 1, True)
+        self.controller.forward_request_path(0, 2)
+        self.controller.get_content(1)
+        self.controller.forward_content_path(2, 0)
+        self.controller.end_session()
+        summary = collector.session_summary()
+        self.assertEqual([(0, 1), (1, 2)], summary['request_hops'])
+        self.assertEqual([(2, 1), (1, 0)], summary['content_hops'])
+        self.assertEqual([1], summary['cache_misses'])
+        self.assertTrue(summary['success'])
+
+    def test_path_events(self):
+        fnss.set_delays_constant(self.view.model.topology, 2, 'ms')
+        model = network.NetworkModel(self.view.model.topology,
+                                     cache_policy={'name': 'FIFO'})
+        view = network.NetworkView(model)
+        controller = network.NetworkController(model)
+        latency = LatencyCollector(view)
+        link_load = LinkLoadCollector(view)
+        controller.attach_collector(CollectorProxy(view, [latency, link_load]))
+        for _ in range(2):
+            controller.start_session(0, 0, 1, True)
+            controller.forward_request_path(0, 4)
+            controller.get_content(4)
+            controller.forward_content_path(4, 2)
+            controller.forward_content_hop(2, 1)
+            controller.forward_content_hop(1, 0)
+            controller.end_session()
+        self.assertEqual(16, latency.results()['MEAN'])
+        self.assertEqual(2, link_load.req_count[(3, 4)])
+        self.assertEqual(2, link_load.cont_count[(1, 0)])
+        # Summaries of shortest paths are interned until paths change
+        info = model.path_info[(0, 4)]
+        self.assertEqual((0, 1, 2, 3, 4), info.nodes)
+        self.assertEqual(4, info.hops)
+        self.assertEqual(8, info.delay)
+        self.assertIs(info, controller._path_info(0, 4))
+        controller.remove_link(1, 2)
+        self.assertEqual({}, model.path_info)
+        self.assertEqual(14, controller._path_info(0, 4).delay)
+
+    def test_no_collector(self):
+        self.controller.start_session(0, 0, 1, True)
+        self.controller.forward_request_path(0, 4)
+        self.assertFalse(self.controller.get_content(1))
+        self.controller.end_session()
@@ -4,19 +4,27 @@ This module contains the implementations of all the cache replacement policies
 provided by Icarus.
 """
 from __future__ import division
-from collections import deque, defaultdict
+from collections import deque, OrderedDict
 import random
+import array
+import numbers
+import zlib
+import heapq
+import itertools
 import abc
 import copy
+import inspect
 
 import numpy as np
 
 from icarus.util import inheritdoc, apportionment
-from icarus.registry import register_cache_policy
+from icarus.registry import CACHE_POLICY, CACHE_ADMISSION, \
+                            register_cache_policy, register_cache_admission
 
 
 __all__ = [
         'LinkedSet',
+        'CountMinSketch',
         'Cache',
         'NullCache',
         'BeladyMinCache',
@@ -27,10 +35,26 @@ __all__ = [
         'FifoCache',
         'ClimbCache',
         'RandEvictionCache',
+        'OrderedDictLruCache',
+        'OrderedDictFifoCache',
+        'ArrayLruCache',
+        'ArrayFifoCache',
+        'ArraySegmentedLruCache',
+        'ArrayClimbCache',
+        'CacheWrapper',
+        'InsertAfterKHitsCache',
+        'RandInsertCache',
+        'BloomKHitsCache',
+        'TinyLfuCache',
+        'KeyValCache',
+        'TtlCache',
+        'TtlKeyValCache',
+        'build_cache',
         'insert_after_k_hits_cache',
         'rand_insert_cache',
         'keyval_cache',
         'ttl_cache',
+        'ttl_keyval_cache',
            ]
 
 
@@ -48,6 +72,8 @@ class LinkedSet(object):
     class _Node(object):
         """Class implementing a node of the linked list"""
 
+        __slots__ = ('val', 'up', 'down')
+
         def __init__(self, val, up=None, down=None):
             """Constructor
 
@@ -83,6 +109,13 @@ class LinkedSet(object):
             for i in iterable:
                 self.append_bottom(i)
 
+    def _node(self, k):
+        """Return the node storing an item, raising KeyError if missing"""
+        try:
+            return self._map[k]
+        except KeyError:
+            raise KeyError('Item %s not in the set' % str(k))
+
     def __len__(self):
         """Return the number of elements in the linked set
 
@@ -102,7 +135,7 @@ class LinkedSet(object):
             An iterator over the set
         """
         cur = self._top
-        while cur:
+        while cur is not None:
             yield cur.val
             cur = cur.down
 
@@ -115,7 +148,7 @@ class LinkedSet(object):
             A reverse iterator over the set
         """
         cur = self._bottom
-        while cur:
+        while cur is not None:
             yield cur.val
             cur = cur.up
 
@@ -174,16 +207,17 @@ class LinkedSet(object):
         top : any hashable type
             The item at the top or *None* if the set is empty
         """
-        if self._top == None:  # No elements to pop
+        n = self._top
+        if n is None:  # No elements to pop
             return None
-        k = self._top.val
-        if self._top == self._bottom:  # One single element
-            self._bottom = self._top = None
+        down = n.down
+        if down is None:  # One single element
+            self._bottom = None
         else:
-            self._top.down.up = None
-            self._top = self._top.down
-        self._map.pop(k)
-        return k
+            down.up = None
+        self._top = down
+        del self._map[n.val]
+        return n.val
 
     def pop_bottom(self):
         """Pop the item at the bottom of the set
@@ -193,16 +227,17 @@ class LinkedSet(object):
         bottom : any hashable type
             The item at the bottom or *None* if the set is empty
         """
-        if self._bottom == None:  # No elements to pop
+        n = self._bottom
+        if n is None:  # No elements to pop
             return None
-        k = self._bottom.val
-        if self._bottom == self._top:  # One single element
-            self._top = self._bottom = None
+        up = n.up
+        if up is None:  # One single element
+            self._top = None
         else:
-            self._bottom.up.down = None
-            self._bottom = self._bottom.up
-        self._map.pop(k)
-        return k
+            up.down = None
+        self._bottom = up
+        del self._map[n.val]
+        return n.val
 
     def append_top(self, k):
         """Append an item at the top of the set
@@ -214,11 +249,12 @@ class LinkedSet(object):
         """
         if k in self._map:
             raise KeyError('The item %s is already in the set' % str(k))
-        n = self._Node(val=k, up=None, down=self._top)
-        if self._top == self._bottom == None:
+        top = self._top
+        n = self._Node(k, None, top)
+        if top is None:
             self._bottom = n
         else:
-            self._top.up = n
+            top.up = n
         self._top = n
         self._map[k] = n
 
@@ -232,11 +268,12 @@ class LinkedSet(object):
         """
         if k in self._map:
             raise KeyError('The item %s is already in the set' % str(k))
-        n = self._Node(val=k, up=self._bottom, down=None)
-        if self._top == self._bottom == None:
+        bottom = self._bottom
+        n = self._Node(k, bottom, None)
+        if bottom is None:
             self._top = n
         else:
-            self._bottom.down = n
+            bottom.down = n
         self._bottom = n
         self._map[k] = n
 
@@ -248,22 +285,21 @@ class LinkedSet(object):
         k : any hashable type
             The item to move up
         """
-        if k not in self._map:
-            raise KeyError('Item %s not in the set' % str(k))
-        n = self._map[k]
-        if n.up == None:  # already on top or there is only one element
-            return
-        if n.down == None:  # bottom but not top: there are at least two elements
-            self._bottom = n.up
-        else:
-            n.down.up = n.up
-        n.up.down = n.down
-        new_up = n.up.up
+        n = self._node(k)
         new_down = n.up
-        if new_up:
-            new_up.down = n
+        if new_down is None:  # already on top or there is only one element
+            return
+        down = n.down
+        if down is None:  # bottom but not top: there are at least two elements
+            self._bottom = new_down
         else:
+            down.up = new_down
+        new_down.down = down
+        new_up = new_down.up
+        if new_up is None:
             self._top = n
+        else:
+            new_up.down = n
         new_down.up = n
         n.up = new_up
         n.down = new_down
@@ -276,23 +312,22 @@ class LinkedSet(object):
         k : any hashable type
             The item to move down
         """
-        if k not in self._map:
-            raise KeyError('Item %s not in the set' % str(k))
-        n = self._map[k]
-        if n.down == None:  # already at the bottom or there is only one element
+        n = self._node(k)
+        new_up = n.down
+        if new_up is None:  # already at the bottom or there is only one element
             return
-        if n.up == None:
-            self._top = n.down
+        up = n.up
+        if up is None:
+            self._top = new_up
         else:
-            n.up.down = n.down
-        n.down.up = n.up
-        new_down = n.down.down
-        new_up = n.down
+            up.down = new_up
+        new_up.up = up
+        new_down = new_up.down
         new_up.down = n
-        if new_down != None:
-            new_down.up = n
-        else:
+        if new_down is None:
             self._bottom = n
+        else:
+            new_down.up = n
         n.up = new_up
         n.down = new_down
 
@@ -304,20 +339,21 @@ class LinkedSet(object):
         k : any hashable type
             The item to move to the top
         """
-        if k not in self._map:
-            raise KeyError('Item %s not in the set' % str(k))
-        n = self._map[k]
-        if n.up == None:  # already on top or there is only one element
+        n = self._node(k)
+        up = n.up
+        if up is None:  # already on top or there is only one element
             return
-        if n.down == None:  # at the bottom, there are at least two elements
-            self._bottom = n.up
+        down = n.down
+        if down is None:  # at the bottom, there are at least two elements
+            self._bottom = up
         else:
-            n.down.up = n.up
-        n.up.down = n.down
+            down.up = up
+        up.down = down
         # Move to top
+        top = self._top
         n.up = None
-        n.down = self._top
-        self._top.up = n
+        n.down = top
+        top.up = n
         self._top = n
 
     def move_to_bottom(self, k):
@@ -328,20 +364,21 @@ class LinkedSet(object):
         k : any hashable type
             The item to move to the bottom
         """
-        if k not in self._map:
-            raise KeyError('Item %s not in the set' % str(k))
-        n = self._map[k]
-        if n.down == None:  # already at bottom or there is only one element
+        n = self._node(k)
+        down = n.down
+        if down is None:  # already at bottom or there is only one element
             return
-        if n.up == None:  # at the top, there are at least two elements
-            self._top = n.down
+        up = n.up
+        if up is None:  # at the top, there are at least two elements
+            self._top = down
         else:
-            n.up.down = n.down
-        n.down.up = n.up
-        # Move to top
+            up.down = down
+        down.up = up
+        # Move to bottom
+        bottom = self._bottom
         n.down = None
-        n.up = self._bottom
-        self._bottom.down = n
+        n.up = bottom
+        bottom.down = n
         self._bottom = n
 
     def insert_above(self, i, k):
@@ -359,7 +396,7 @@ class LinkedSet(object):
         if i not in self._map:
             raise KeyError('Item %s not in the set' % str(i))
         n = self._map[i]
-        if n.up == None:  # Insert on top
+        if n.up is None:  # Insert on top
             return self.append_top(k)
         # Now I know I am inserting between two actual elements
         m = self._Node(k, up=n.up, down=n)
@@ -382,7 +419,7 @@ class LinkedSet(object):
         if i not in self._map:
             raise KeyError('Item %s not in the set' % str(i))
         n = self._map[i]
-        if n.down == None:  # Insert on top
+        if n.down is None:  # Insert at the bottom
             return self.append_bottom(k)
         # Now I know I am inserting between two actual elements
         m = self._Node(k, up=n, down=n.down)
@@ -410,7 +447,7 @@ class LinkedSet(object):
             raise KeyError('The item %s is not in the set' % str(k))
         index = 0
         curr = self._top
-        while curr:
+        while curr is not None:
             if curr.val == k:
                 return index
             curr = curr.down
@@ -429,18 +466,18 @@ class LinkedSet(object):
         k : any hashable type
             The item to remove
         """
-        if k not in self._map:
-            raise KeyError('Item %s not in the set' % str(k))
-        n = self._map[k]
-        if self._bottom == n:  # I am trying to remove the last node
-            self._bottom = n.up
+        n = self._node(k)
+        up = n.up
+        down = n.down
+        if down is None:  # I am trying to remove the last node
+            self._bottom = up
         else:
-            n.down.up = n.up
-        if self._top == n:  # I am trying to remove the top node
-            self._top = n.down
+            down.up = up
+        if up is None:  # I am trying to remove the top node
+            self._top = down
         else:
-            n.up.down = n.down
-        self._map.pop(k)
+            up.down = down
+        del self._map[k]
 
     def clear(self):
         """Empty the set"""
@@ -449,9 +486,155 @@ class LinkedSet(object):
         self._map.clear()
 
 
+def _stable_hash(k):
+    """Return a hash of an item which, unlike the built-in *hash* of strings,
+    is the same in all processes"""
+    if isinstance(k, numbers.Integral):
+        return int(k)
+    return zlib.crc32(repr(k).encode())
+
+
+class CountMinSketch(object):
+    """Count-min sketch, i.e. a fixed-size table of counters estimating how
+    many times each item was added.
+
+    Each item is mapped to one counter in each row of the table by a
+    different hash function and its count is estimated as the minimum of its
+    counters. Estimates are never lower than the actual counts and exceed
+    them only because of hash collisions, whose impact decreases as the width
+    of the table increases.
+
+    Counters can optionally saturate at *max_count*, so that they take a
+    single byte, and be aged, i.e. halved, every *window* additions, so that
+    estimates approximate frequencies over a sliding window, as in TinyLFU.
+    Each row can also be seen as a partition of a counting Bloom filter whose
+    hash functions map items to distinct partitions.
+
+    Integer items are hashed by value and all other items by their *repr*, so
+    that the counters of an item do not depend on the hash randomization of
+    the process.
+    """
+
+    # Mersenne prime used by the universal hash functions
+    _PRIME = 2**31 - 1
+
+    def __init__(self, width, depth=4, max_count=None, window=None,
+                 seed=None):
+        """Constructor
+
+        Parameters
+        ----------
+        width : int
+            The number of counters per row
+        depth : int, optional
+            The number of rows, i.e. of hash functions
+        max_count : int, optional
+            The value at which counters saturate. It must be lower than 256.
+            If None, counters do not saturate and take 4 bytes
+        window : int, optional
+            The number of additions after which all counters are halved. If
+            None, counters are only halved by calling *age*
+        seed : any hashable type, optional
+            The seed used to select the hash functions
+        """
+        self.width = int(width)
+        self.depth = int(depth)
+        if self.width <= 0 or self.depth <= 0:
+            raise ValueError('width and depth must be positive')
+        if max_count is not None and not 0 < max_count < 256:
+            raise ValueError('max_count must be between 1 and 255')
+        if window is not None and window <= 0:
+            raise ValueError('window must be positive')
+        self.max_count = max_count
+        self.window = window
+        self._n_added = 0
+        rng = random.Random(seed)
+        self._hashes = [(rng.randint(1, self._PRIME - 1),
+                         rng.randint(0, self._PRIME - 1))
+                        for _ in range(self.depth)]
+        # Rows are stored as arrays of counters, which are faster than NumPy
+        # arrays to access one element at a time
+        self._typecode = 'I' if max_count is None else 'B'
+        self._table = [self._zeros() for _ in range(self.depth)]
+
+    def _zeros(self):
+        """Return a row of counters set to zero"""
+        return array.array(self._typecode,
+                           bytes(array.array(self._typecode).itemsize
+                                 * self.width))
+
+    def _indices(self, k):
+        """Return the column of the counter of an item in each row"""
+        h = _stable_hash(k) % self._PRIME
+        p = self._PRIME
+        w = self.width
+        return [(a * h + b) % p % w for a, b in self._hashes]
+
+    def add(self, k):
+        """Increment the count of an item
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item
+
+        Returns
+        -------
+        count : int
+            The estimated count of the item after the increment
+        """
+        max_count = self.max_count
+        count = None
+        for row, col in zip(self._table, self._indices(k)):
+            c = row[col]
+            if max_count is None or c < max_count:
+                c += 1
+                row[col] = c
+            if count is None or c < count:
+                count = c
+        if self.window is not None:
+            self._n_added += 1
+            if self._n_added >= self.window:
+                self.age()
+        return count
+
+    def estimate(self, k):
+        """Return the estimated count of an item
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item
+
+        Returns
+        -------
+        count : int
+            The estimated count of the item
+        """
+        return min(row[col] for row, col in zip(self._table, self._indices(k)))
+
+    def __contains__(self, k):
+        return self.estimate(k) > 0
+
+    def age(self):
+        """Halve all counters"""
+        for row in self._table:
+            counters = np.frombuffer(row, dtype=self._typecode)
+            counters >>= 1
+        self._n_added = 0
+
+    def clear(self):
+        """Reset all counters"""
+        for row in self._table:
+            row[:] = self._zeros()
+        self._n_added = 0
+
+
 class Cache(object):
     """Base implementation of a cache object"""
 
+    __slots__ = ()
+
     @abc.abstractmethod
     def __init__(self, maxlen, *args, **kwargs):
         """Constructor
@@ -529,6 +712,38 @@ class Cache(object):
                 }[op](k, *args, **kwargs)
         return res if res is not None else False
 
+    def process_batch(self, keys):
+        """Process a batch of requests.
+
+        Each request is served as a *get* of the requested item followed, if
+        the item is not in the cache, by a *put*. Subclasses may override
+        this method with faster implementations having the same effect.
+
+        Parameters
+        ----------
+        keys : iterable
+            The items requested, in order of request
+
+        Returns
+        -------
+        hits : array of bool
+            Array whose i-th element is *True* if the i-th request was a hit
+            or *False* otherwise
+        """
+        if isinstance(keys, np.ndarray):
+            keys = keys.tolist()
+        get = self.get
+        put = self.put
+        hits = []
+        append = hits.append
+        for k in keys:
+            if get(k):
+                append(True)
+            else:
+                put(k)
+                append(False)
+        return np.array(hits, dtype=bool)
+
     @abc.abstractmethod
     def has(self, k, *args, **kwargs):
         """Check if an item is in the cache without changing the internal
@@ -587,6 +802,24 @@ class Cache(object):
         """
         raise NotImplementedError('This method is not implemented')
 
+    def victim(self, k, *args, **kwargs):
+        """Return the item that inserting an item would evict, without
+        changing the internal state of the caching object.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to be inserted
+
+        Returns
+        -------
+        victim : any hashable type
+            The item that *put(k)* would evict, *k* itself if it would not be
+            stored or *None* if no item would be evicted, e.g. because *k* is
+            already in the cache or the cache is not full.
+        """
+        raise NotImplementedError('This method is not implemented')
+
     @abc.abstractmethod
     def remove(self, k, *args, **kwargs):
         """Remove an item from the cache, if present.
@@ -714,6 +947,10 @@ class NullCache(Cache):
         """
         return None
 
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        return k
+
     def remove(self, k, *args, **kwargs):
         """Remove a specified item from the cache.
 
@@ -747,9 +984,13 @@ class BeladyMinCache(Cache):
     This policy is not implementable in practice because it requires knowledge
     of future requests, however it is very useful as a theoretical performance
     upper bound.
+
+    The position of the next request of each request of the trace is computed
+    upfront and stored in an array, which takes 4 bytes per request for
+    traces shorter than 2**31 requests. Items in cache are kept in a heap
+    ordered by next request, so that each operation takes O(log n) time.
     """
 
-    @inheritdoc(Cache)
     def __init__(self, maxlen, trace, **kwargs):
         """Constructor
 
@@ -763,12 +1004,49 @@ class BeladyMinCache(Cache):
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
             raise ValueError('maxlen must be positive')
-        self._next = defaultdict(deque)
-        for i, k in enumerate(trace):
-            self._next[k].append(i)
-        for k in self._next.values():
-            k.append(np.infty)
+        if not isinstance(trace, np.ndarray):
+            trace = list(trace)
+        items, codes = self._encode(trace)
+        n = len(codes)
+        # Requests of each item sorted by position
+        order = np.argsort(codes, kind='stable')
+        same = codes[order[:-1]] == codes[order[1:]]
+        # Position of the next request of the item requested at each position
+        # or n if it is not requested again
+        self._next = np.full(n, n, dtype=np.int32 if n < 2**31 - 1 else np.int64)
+        self._next[order[:-1][same]] = order[1:][same]
+        first = np.ones(n, dtype=bool)
+        first[1:] = ~same
+        # Position of the next request of each item
+        self._pos = dict(zip(items, order[first].tolist()))
+        # Dict mapping items in cache to the position of their next request
+        # and their insertion sequence number, which breaks ties in favor of
+        # evicting the item inserted first
         self._cache = {}
+        # Heap of (-position of next request, sequence number, item). Entries
+        # differing from the ones in self._cache are stale
+        self._heap = []
+        self._seq = itertools.count()
+
+    @staticmethod
+    def _encode(trace):
+        """Map the items of a trace to integer codes
+
+        Returns
+        -------
+        items : list
+            The distinct items of the trace, sorted by code
+        codes : array
+            The code of the item of each request
+        """
+        if isinstance(trace, np.ndarray) and trace.ndim == 1 \
+                and trace.dtype.kind in 'iub':
+            items, codes = np.unique(trace, return_inverse=True)
+            return items.tolist(), codes.ravel()
+        index = {}
+        codes = np.fromiter((index.setdefault(k, len(index)) for k in trace),
+                            dtype=np.int64, count=len(trace))
+        return list(index), codes
 
     @inheritdoc(Cache)
     def __len__(self):
@@ -789,20 +1067,40 @@ class BeladyMinCache(Cache):
 
     @inheritdoc(Cache)
     def get(self, k, *args, **kwargs):
-        self._next[k].popleft()
-        return k in self._cache
+        next_pos = self._next.item(self._pos[k])
+        self._pos[k] = next_pos
+        if k in self._cache:
+            self._push(k, next_pos, self._cache[k][1])
+            return True
+        return False
 
+    @inheritdoc(Cache)
     def put(self, k, *args, **kwargs):
-        if len(self) < self.maxlen:
-            self._cache[k] = self._next[k]
+        if k in self._cache:
             return None
-        next_cache = max(self._cache, key=lambda k: self._cache[k][0])
-        if self._next[k][0] < self._next[next_cache][0]:
-            self._cache.pop(next_cache)
-            self._cache[k] = self._next[k]
-            return next_cache
-        else:
+        next_pos = self._pos[k]
+        if len(self._cache) < self._maxlen:
+            self._push(k, next_pos, next(self._seq))
+            return None
+        heap = self._heap
+        while self._cache.get(heap[0][2]) != (-heap[0][0], heap[0][1]):
+            heapq.heappop(heap)
+        evicted = heap[0][2]
+        if next_pos < -heap[0][0]:
+            heapq.heappop(heap)
+            del self._cache[evicted]
+            self._push(k, next_pos, next(self._seq))
+            return evicted
+        return None
+
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        if k in self._cache or len(self._cache) < self._maxlen:
             return None
+        heap = self._heap
+        while self._cache.get(heap[0][2]) != (-heap[0][0], heap[0][1]):
+            heapq.heappop(heap)
+        return heap[0][2] if self._pos[k] < -heap[0][0] else k
 
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
@@ -814,6 +1112,16 @@ class BeladyMinCache(Cache):
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
+        self._heap = []
+
+    def _push(self, k, next_pos, seq):
+        """Insert or update an item in cache"""
+        self._cache[k] = (next_pos, seq)
+        heapq.heappush(self._heap, (-next_pos, seq, k))
+        if len(self._heap) > 2 * len(self._cache) + 16:
+            self._heap = [e for e in self._heap
+                          if self._cache.get(e[2]) == (-e[0], e[1])]
+            heapq.heapify(self._heap)
 
 
 @register_cache_policy('LRU')
@@ -881,9 +1189,25 @@ class LruCache(Cache):
     def get(self, k, *args, **kwargs):
         # search content over the list
         # if it has it push on top, otherwise return false
-        if k not in self._cache:
+        # This is the hottest path of most simulations, so the move to top of
+        # the linked set is inlined
+        cache = self._cache
+        n = cache._map.get(k)
+        if n is None:
             return False
-        self._cache.move_to_top(k)
+        up = n.up
+        if up is not None:
+            down = n.down
+            if down is None:
+                cache._bottom = up
+            else:
+                down.up = up
+            up.down = down
+            top = cache._top
+            n.up = None
+            n.down = top
+            top.up = n
+            cache._top = n
         return True
 
     def put(self, k, *args, **kwargs):
@@ -902,13 +1226,36 @@ class LruCache(Cache):
         evicted : any hashable type
             The evicted object or *None* if no contents were evicted.
         """
+        cache = self._cache
         # if content in cache, push it on top, no eviction
-        if k in self._cache:
-            self._cache.move_to_top(k)
+        if k in cache._map:
+            cache.move_to_top(k)
             return None
         # if content not in cache append it on top
-        self._cache.append_top(k)
-        return self._cache.pop_bottom() if len(self._cache) > self._maxlen else None
+        top = cache._top
+        n = LinkedSet._Node(k, None, top)
+        if top is None:
+            cache._bottom = n
+        else:
+            top.up = n
+        cache._top = n
+        cache._map[k] = n
+        if len(cache._map) <= self._maxlen:
+            return None
+        # evict the bottom item, there are at least two items
+        n = cache._bottom
+        up = n.up
+        up.down = None
+        cache._bottom = up
+        del cache._map[n.val]
+        return n.val
+
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        cache = self._cache
+        if k in cache._map or len(cache._map) < self._maxlen:
+            return None
+        return cache._bottom.val
 
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
@@ -917,6 +1264,52 @@ class LruCache(Cache):
         self._cache.remove(k)
         return True
 
+    @inheritdoc(Cache)
+    def process_batch(self, keys):
+        if isinstance(keys, np.ndarray):
+            keys = keys.tolist()
+        # Same as get and put, inlined in a single loop
+        cache = self._cache
+        cmap = cache._map
+        maxlen = self._maxlen
+        Node = LinkedSet._Node
+        hits = []
+        append = hits.append
+        for k in keys:
+            n = cmap.get(k)
+            if n is not None:
+                up = n.up
+                if up is not None:
+                    down = n.down
+                    if down is None:
+                        cache._bottom = up
+                    else:
+                        down.up = up
+                    up.down = down
+                    top = cache._top
+                    n.up = None
+                    n.down = top
+                    top.up = n
+                    cache._top = n
+                append(True)
+                continue
+            top = cache._top
+            n = Node(k, None, top)
+            if top is None:
+                cache._bottom = n
+            else:
+                top.up = n
+            cache._top = n
+            cmap[k] = n
+            if len(cmap) > maxlen:
+                n = cache._bottom
+                up = n.up
+                up.down = None
+                cache._bottom = up
+                del cmap[n.val]
+            append(False)
+        return np.array(hits, dtype=bool)
+
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
@@ -1042,6 +1435,15 @@ class SegmentedLruCache(Cache):
             self._cache.pop(evicted)
             return evicted
 
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        # New items are inserted in the probationary segment, which evicts
+        # its LRU item when full even if other segments are not
+        if k in self._cache or \
+                len(self._segment[-1]) < self._segment_maxlen[-1]:
+            return None
+        return self._segment[-1].bottom
+
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k not in self._cache:
@@ -1086,6 +1488,24 @@ class SegmentedLruCache(Cache):
             s.clear()
 
 
+class _LfuBucket(object):
+    """Bucket of the items of an In-cache LFU cache having the same frequency.
+
+    Buckets form a doubly linked list sorted by increasing frequency. Items of
+    a bucket are kept in a heap of (insertion time, item) pairs. Entries of
+    items that left the bucket are discarded lazily.
+    """
+
+    __slots__ = ('freq', 'size', 'heap', 'prev', 'next')
+
+    def __init__(self, freq, prev=None, next=None):
+        self.freq = freq
+        self.size = 0
+        self.heap = []
+        self.prev = prev
+        self.next = next
+
+
 @register_cache_policy('IN_CACHE_LFU')
 class InCacheLfuCache(Cache):
     """In-cache Least Frequently Used (LFU) cache implementation
@@ -1094,7 +1514,7 @@ class InCacheLfuCache(Cache):
     counters are increased when the associated item is requested. Upon
     insertion of a new item, the cache evicts the one which was requested the
     least times in the past, i.e. the one whose associated value has the
-    smallest value.
+    smallest value. Ties are broken by evicting the item inserted first.
 
     This is an implementation of an In-Cache-LFU, i.e. a cache that keeps
     counters for items only as long as they are in cache and resets the
@@ -1102,15 +1522,21 @@ class InCacheLfuCache(Cache):
     policy in which a counter is maintained also when the content is evicted.
 
     In-cache LFU performs better than LRU under IRM demands.
-    However, its implementation is computationally expensive since it
-    cannot be implemented in such a way that both search and replacement tasks
-    can be executed in constant time. This makes it particularly unfit for
-    large caches and line speed operations.
+
+    Items are grouped in buckets of equal frequency linked in order of
+    frequency, so that the least frequently used items and the bucket an item
+    moves to when requested are found in constant time. Within a bucket,
+    items are kept in a heap ordered by insertion time, which makes lookups
+    and insertions take O(log n) time in the worst case and O(1) time when
+    there are no frequency ties.
     """
 
     @inheritdoc(Cache)
     def __init__(self, maxlen, *args, **kwargs):
+        # Dict mapping each item in cache to its bucket and insertion time
         self._cache = {}
+        # Bucket with the lowest frequency
+        self._head = None
         self.t = 0
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
@@ -1127,7 +1553,13 @@ class InCacheLfuCache(Cache):
 
     @inheritdoc(Cache)
     def dump(self):
-        return sorted(self._cache, key=lambda x: self._cache[x], reverse=True)
+        dump = []
+        bucket = self._head
+        while bucket is not None:
+            dump.extend(k for t, k in sorted(self._items(bucket)))
+            bucket = bucket.next
+        dump.reverse()
+        return dump
 
     @inheritdoc(Cache)
     def has(self, k, *args, **kwargs):
@@ -1135,36 +1567,169 @@ class InCacheLfuCache(Cache):
 
     @inheritdoc(Cache)
     def get(self, k, *args, **kwargs):
-        if self.has(k):
-            freq, t = self._cache[k]
-            self._cache[k] = freq + 1, t
-            return True
-        else:
+        if k not in self._cache:
             return False
+        bucket, t = self._cache[k]
+        next_bucket = bucket.next
+        if next_bucket is None or next_bucket.freq != bucket.freq + 1:
+            next_bucket = _LfuBucket(bucket.freq + 1, bucket, next_bucket)
+            if bucket.next is not None:
+                bucket.next.prev = next_bucket
+            bucket.next = next_bucket
+        heapq.heappush(next_bucket.heap, (t, k))
+        next_bucket.size += 1
+        self._cache[k] = (next_bucket, t)
+        self._leave(bucket)
+        return True
 
     @inheritdoc(Cache)
     def put(self, k, *args, **kwargs):
-        if not self.has(k):
-            self.t += 1
-            self._cache[k] = (1, self.t)
-            if len(self._cache) > self._maxlen:
-                evicted = min(self._cache, key=lambda x: self._cache[x])
-                self._cache.pop(evicted)
-                return evicted
+        if k in self._cache:
+            return None
+        self.t += 1
+        head = self._head
+        if head is None or head.freq != 1:
+            head = _LfuBucket(1, None, head)
+            if self._head is not None:
+                self._head.prev = head
+            self._head = head
+        # The insertion time is the largest in the heap, so this push
+        # appends the entry without moving any other
+        heapq.heappush(head.heap, (self.t, k))
+        head.size += 1
+        self._cache[k] = (head, self.t)
+        if len(self._cache) > self._maxlen:
+            heap = head.heap
+            while True:
+                t, evicted = heapq.heappop(heap)
+                if self._cache.get(evicted) == (head, t):
+                    break
+            del self._cache[evicted]
+            self._leave(head)
+            return evicted
         return None
 
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        if k in self._cache or len(self._cache) < self._maxlen:
+            return None
+        head = self._head
+        if head.freq != 1:
+            # The new item would be the only one with frequency 1
+            return k
+        heap = head.heap
+        while self._cache.get(heap[0][1]) != (head, heap[0][0]):
+            heapq.heappop(heap)
+        return heap[0][1]
+
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
-        if k in self._cache:
-            self._cache.pop(k)
-            return True
-        else:
+        if k not in self._cache:
             return False
+        bucket, _ = self._cache.pop(k)
+        self._leave(bucket)
+        return True
 
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
+        self._head = None
+
+    def _items(self, bucket):
+        """Return the (insertion time, item) pairs of the items of a bucket"""
+        return [(t, k) for t, k in bucket.heap
+                if self._cache.get(k) == (bucket, t)]
+
+    def _leave(self, bucket):
+        """Update a bucket after one of its items left it"""
+        bucket.size -= 1
+        if bucket.size == 0:
+            if bucket.prev is None:
+                self._head = bucket.next
+            else:
+                bucket.prev.next = bucket.next
+            if bucket.next is not None:
+                bucket.next.prev = bucket.prev
+        elif len(bucket.heap) > 2 * bucket.size + 16:
+            # Drop entries of items that left the bucket
+            bucket.heap = self._items(bucket)
+            heapq.heapify(bucket.heap)
+
+
+class _DictLfuCounter(object):
+    """Counters of a Perfect-LFU cache stored in a dictionary mapping each
+    item to its (frequency, time of first request) pair"""
+
+    def __init__(self):
+        self._counter = {}
+
+    def __getitem__(self, k):
+        return self._counter[k]
+
+    def increment(self, k, t):
+        if k in self._counter:
+            freq, t = self._counter[k]
+            self._counter[k] = (freq + 1, t)
+            return freq + 1, t
+        self._counter[k] = (1, t)
+        return 1, t
+
+    def peek(self, k, t):
+        if k in self._counter:
+            freq, t = self._counter[k]
+            return freq + 1, t
+        return 1, t
+
+    def clear(self):
+        self._counter.clear()
+
+
+class _ArrayLfuCounter(object):
+    """Counters of a Perfect-LFU cache stored in arrays indexed by integer
+    item identifiers"""
+
+    def __init__(self, n_contents):
+        self._freq = np.zeros(n_contents + 1, dtype=np.uint32)
+        self._first = np.zeros(n_contents + 1, dtype=np.int64)
 
+    def __getitem__(self, k):
+        return int(self._freq[k]), int(self._first[k])
+
+    def increment(self, k, t):
+        freq = int(self._freq[k]) + 1
+        self._freq[k] = freq
+        if freq == 1:
+            self._first[k] = t
+            return 1, t
+        return freq, int(self._first[k])
+
+    def peek(self, k, t):
+        freq = int(self._freq[k]) + 1
+        return (1, t) if freq == 1 else (freq, int(self._first[k]))
+
+    def clear(self):
+        self._freq[:] = 0
+        self._first[:] = 0
+
+
+class _SketchLfuCounter(object):
+    """Approximate counters of a Perfect-LFU cache stored in a count-min
+    sketch. Times of first request are not recorded."""
+
+    def __init__(self, width, depth, seed):
+        self._sketch = CountMinSketch(width, depth, seed=seed)
+
+    def __getitem__(self, k):
+        return self._sketch.estimate(k), 0
+
+    def increment(self, k, t):
+        return self._sketch.add(k), 0
+
+    def peek(self, k, t):
+        return self._sketch.estimate(k) + 1, 0
+
+    def clear(self):
+        self._sketch.clear()
 
 
 @register_cache_policy('PERFECT_LFU')
@@ -1175,24 +1740,66 @@ class PerfectLfuCache(Cache):
     counters are increased when the associated item is requested. Upon
     insertion of a new item, the cache evicts the one which was requested the
     least times in the past, i.e. the one whose associated value has the
-    smallest value.
+    smallest value. Ties are broken by evicting the item requested for the
+    first time earliest.
 
     This is an implementation of a Perfect-LFU, i.e. a cache that keeps
     counters for every item, even for those not in the cache.
 
     In contrast to LRU, Perfect-LFU has been shown to perform optimally under
-    IRM demands. However, its implementation is computationally expensive since
-    it cannot be implemented in such a way that both search and replacement
-    tasks can be executed in constant time. This makes it particularly unfit
-    for large caches and line speed operations.
+    IRM demands. Items in cache are kept in a heap ordered by frequency, so
+    that an item can be evicted in O(log n) time.
+
+    Since counters are kept for all items ever requested, their memory
+    footprint can be large with large catalogs. If content identifiers are
+    integers, counters can be stored in arrays, which take 12 bytes per
+    content. Alternatively, they can be approximated by a count-min sketch of
+    fixed size, in which case the frequency of an item can be overestimated
+    and ties are broken by evicting the item inserted first.
     """
 
-    @inheritdoc(Cache)
-    def __init__(self, maxlen, *args, **kwargs):
-        # Dict storing counter for all contents, not only those in cache
-        self._counter = {}
-        # Set storing only items currently in cache
-        self._cache = set()
+    def __init__(self, maxlen, counter='DICT', n_contents=None,
+                 sketch_width=2**20, sketch_depth=4, seed=None, *args,
+                 **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        maxlen : int
+            The maximum number of items the cache can store
+        counter : str, optional
+            How frequency counters are stored. If 'DICT', they are stored in
+            a dictionary. If 'ARRAY', they are stored in arrays, which
+            requires content identifiers to be integers between 0 and
+            *n_contents*. If 'SKETCH', counts are estimated by a count-min
+            sketch
+        n_contents : int, optional
+            The largest content identifier. Required if *counter* is 'ARRAY'
+        sketch_width : int, optional
+            The number of counters per row of the count-min sketch
+        sketch_depth : int, optional
+            The number of rows of the count-min sketch
+        seed : any hashable type, optional
+            The seed of the hash functions of the count-min sketch
+        """
+        # Counters for all contents, not only those in cache
+        if counter == 'DICT':
+            self._counter = _DictLfuCounter()
+        elif counter == 'ARRAY':
+            if n_contents is None:
+                raise ValueError("n_contents is required by counter 'ARRAY'")
+            self._counter = _ArrayLfuCounter(n_contents)
+        elif counter == 'SKETCH':
+            self._counter = _SketchLfuCounter(sketch_width, sketch_depth, seed)
+        else:
+            raise ValueError('Unknown counter %s' % counter)
+        # Dict mapping each item in cache to the sequence number of its
+        # current entry in the heap. Other entries of the item are stale and
+        # are discarded lazily
+        self._cache = {}
+        # Heap of (frequency, time of first request, sequence number, item)
+        self._heap = []
+        self._seq = itertools.count()
         self.t = 0
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
@@ -1218,37 +1825,40 @@ class PerfectLfuCache(Cache):
     @inheritdoc(Cache)
     def get(self, k, *args, **kwargs):
         self.t += 1
-        if k in self._counter:
-            freq, t = self._counter[k]
-            self._counter[k] = freq + 1, t
-        else:
-            self._counter[k] = 1, self.t
-        if self.has(k):
+        freq, t = self._counter.increment(k, self.t)
+        if k in self._cache:
+            self._push(k, freq, t)
             return True
         else:
             return False
 
     @inheritdoc(Cache)
     def put(self, k, *args, **kwargs):
-        if not self.has(k):
-            if k in self._counter:
-                freq, t = self._counter[k]
-                self._counter[k] = (freq + 1, t)
-            else:
-                # If I always call a get before a put, this line should never
-                # be executed
-                self._counter[k] = (1, self.t)
-            self._cache.add(k)
+        if k not in self._cache:
+            # If a get is always called before a put, the counter of the item
+            # already exists
+            freq, t = self._counter.increment(k, self.t)
+            self._push(k, freq, t)
             if len(self._cache) > self._maxlen:
-                evicted = min(self._cache, key=lambda x: self._counter[x])
-                self._cache.remove(evicted)
-                return evicted
+                return self._pop()
         return None
 
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        if k in self._cache or len(self._cache) < self._maxlen:
+            return None
+        freq, t = self._counter.peek(k, self.t)
+        lfu_freq, lfu_t, _, lfu = self._peek()
+        # The new entry would have the largest sequence number and is
+        # therefore evicted only if it precedes the LFU entry. With a sketch,
+        # the increment of the new item can also raise the counts of others,
+        # so the victim is only an estimate
+        return k if (freq, t) < (lfu_freq, lfu_t) else lfu
+
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k in self._cache:
-            self._cache.pop(k)
+            del self._cache[k]
             return True
         else:
             return False
@@ -1256,8 +1866,69 @@ class PerfectLfuCache(Cache):
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
+        self._heap = []
         self._counter.clear()
 
+    @inheritdoc(Cache)
+    def process_batch(self, keys):
+        if isinstance(keys, np.ndarray):
+            keys = keys.tolist()
+        # Same as get and put, inlined in a single loop. As in put, the
+        # counter of a missed item is incremented again on insertion
+        cache = self._cache
+        increment = self._counter.increment
+        push = self._push
+        maxlen = self._maxlen
+        t = self.t
+        hits = []
+        append = hits.append
+        for k in keys:
+            t += 1
+            freq, t_first = increment(k, t)
+            if k in cache:
+                push(k, freq, t_first)
+                append(True)
+                continue
+            freq, t_first = increment(k, t)
+            push(k, freq, t_first)
+            if len(cache) > maxlen:
+                self._pop()
+            append(False)
+        self.t = t
+        return np.array(hits, dtype=bool)
+
+    def _push(self, k, freq, t):
+        """Add the current heap entry of an item in cache"""
+        seq = next(self._seq)
+        self._cache[k] = seq
+        heapq.heappush(self._heap, (freq, t, seq, k))
+        if len(self._heap) > 2 * len(self._cache) + 16:
+            self._heap = [e for e in self._heap if self._cache.get(e[3]) == e[2]]
+            heapq.heapify(self._heap)
+
+    def _peek(self):
+        """Return the heap entry of the least frequently used item, after
+        discarding the stale entries preceding it"""
+        while True:
+            freq, t, seq, k = self._heap[0]
+            if self._cache.get(k) != seq:
+                heapq.heappop(self._heap)
+                continue
+            # Approximate counts can grow because of other items
+            current_freq, t = self._counter[k]
+            if current_freq != freq:
+                heapq.heappop(self._heap)
+                self._push(k, current_freq, t)
+                continue
+            return self._heap[0]
+
+    def _pop(self):
+        """Evict the least frequently used item and return it"""
+        k = self._peek()[3]
+        heapq.heappop(self._heap)
+        del self._cache[k]
+        return k
+
 
 @register_cache_policy('FIFO')
 class FifoCache(Cache):
@@ -1336,6 +2007,12 @@ class FifoCache(Cache):
             self._cache.remove(evicted)
         return evicted
 
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        if k in self._cache or len(self._cache) < self._maxlen:
+            return None
+        return self._d[-1]
+
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k in self._cache:
@@ -1345,25 +2022,50 @@ class FifoCache(Cache):
         else:
             return False
 
+    @inheritdoc(Cache)
+    def process_batch(self, keys):
+        if isinstance(keys, np.ndarray):
+            keys = keys.tolist()
+        cache = self._cache
+        d = self._d
+        add = cache.add
+        discard = cache.discard
+        appendleft = d.appendleft
+        pop = d.pop
+        maxlen = self._maxlen
+        hits = []
+        append = hits.append
+        for k in keys:
+            if k in cache:
+                append(True)
+                continue
+            add(k)
+            appendleft(k)
+            if len(cache) > maxlen:
+                discard(pop())
+            append(False)
+        return np.array(hits, dtype=bool)
+
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
         self._d.clear()
 
 
-@register_cache_policy('CLIMB')
-class ClimbCache(Cache):
-    """CLIMB cache implementation
+@register_cache_policy('ODICT_LRU')
+class OrderedDictLruCache(Cache):
+    """Least Recently Used (LRU) cache backed by an ordered dictionary.
 
-    According to this policy, items are organized in a list. When an item in
-    the cache is requested it is moved one position up the list; if already
-    on top, nothing is done. When a new item is inserted, it replaces the one
-    at the bottom of the list.
+    It behaves as :class:`LruCache`, but keeps items in an
+    :class:`collections.OrderedDict`, whose reordering and eviction operations
+    are implemented in C and are therefore faster than those of
+    :class:`LinkedSet`. The least recently used item is at the beginning of
+    the dictionary and the most recently used one at the end.
     """
 
     @inheritdoc(Cache)
     def __init__(self, maxlen, *args, **kwargs):
-        self._cache = LinkedSet()
+        self._cache = OrderedDict()
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
             raise ValueError('maxlen must be positive')
@@ -1379,28 +2081,14 @@ class ClimbCache(Cache):
 
     @inheritdoc(Cache)
     def dump(self):
-        return list(iter(self._cache))
+        return list(reversed(self._cache))
 
+    @inheritdoc(LruCache)
     def position(self, k, *args, **kwargs):
-        """Return the current position of an item in the cache. Position *0*
-        refers to the head of cache, while position *maxlen - 1* refers to the
-        tail of the cache.
-
-        This method does not change the internal state of the cache.
-
-        Parameters
-        ----------
-        k : any hashable type
-            The item looked up in the cache
-
-        Returns
-        -------
-        position : int
-            The current position of the item in the cache
-        """
-        if not k in self._cache:
-            raise ValueError('The item %s is not in the cache' % str(k))
-        return self._cache.index(k)
+        for i, c in enumerate(reversed(self._cache)):
+            if c == k:
+                return i
+        raise ValueError('The item %s is not in the cache' % str(k))
 
     @inheritdoc(Cache)
     def has(self, k, *args, **kwargs):
@@ -1408,23 +2096,142 @@ class ClimbCache(Cache):
 
     @inheritdoc(Cache)
     def get(self, k, *args, **kwargs):
-        # search content over the list
-        # if it has it move it one position up, otherwise return false
-        if k not in self._cache:
+        try:
+            self._cache.move_to_end(k)
+        except KeyError:
             return False
-        self._cache.move_up(k)
         return True
 
+    @inheritdoc(LruCache)
     def put(self, k, *args, **kwargs):
-        """Insert an item in the cache if not already inserted.
+        cache = self._cache
+        if k in cache:
+            cache.move_to_end(k)
+            return None
+        cache[k] = None
+        if len(cache) > self._maxlen:
+            return cache.popitem(last=False)[0]
+        return None
 
-        If the element is already present in the cache, it will pushed one
-        position up.
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        if k in self._cache or len(self._cache) < self._maxlen:
+            return None
+        return next(iter(self._cache))
 
-        Parameters
-        ----------
-        k : any hashable type
-            The item to be inserted
+    @inheritdoc(Cache)
+    def remove(self, k, *args, **kwargs):
+        if k not in self._cache:
+            return False
+        del self._cache[k]
+        return True
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._cache.clear()
+
+
+@register_cache_policy('ODICT_FIFO')
+class OrderedDictFifoCache(OrderedDictLruCache):
+    """First In First Out (FIFO) cache backed by an ordered dictionary.
+
+    It behaves as :class:`FifoCache`, but items are removed in constant time
+    rather than in time linear in the cache size.
+    """
+
+    @inheritdoc(FifoCache)
+    def position(self, k, *args, **kwargs):
+        return super(OrderedDictFifoCache, self).position(k)
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        return k in self._cache
+
+    @inheritdoc(Cache)
+    def put(self, k, *args, **kwargs):
+        cache = self._cache
+        if k in cache:
+            return None
+        cache[k] = None
+        if len(cache) > self._maxlen:
+            return cache.popitem(last=False)[0]
+        return None
+
+
+@register_cache_policy('CLIMB')
+class ClimbCache(Cache):
+    """CLIMB cache implementation
+
+    According to this policy, items are organized in a list. When an item in
+    the cache is requested it is moved one position up the list; if already
+    on top, nothing is done. When a new item is inserted, it replaces the one
+    at the bottom of the list.
+    """
+
+    @inheritdoc(Cache)
+    def __init__(self, maxlen, *args, **kwargs):
+        self._cache = LinkedSet()
+        self._maxlen = int(maxlen)
+        if self._maxlen <= 0:
+            raise ValueError('maxlen must be positive')
+
+    @inheritdoc(Cache)
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    @inheritdoc(Cache)
+    def maxlen(self):
+        return self._maxlen
+
+    @inheritdoc(Cache)
+    def dump(self):
+        return list(iter(self._cache))
+
+    def position(self, k, *args, **kwargs):
+        """Return the current position of an item in the cache. Position *0*
+        refers to the head of cache, while position *maxlen - 1* refers to the
+        tail of the cache.
+
+        This method does not change the internal state of the cache.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item looked up in the cache
+
+        Returns
+        -------
+        position : int
+            The current position of the item in the cache
+        """
+        if not k in self._cache:
+            raise ValueError('The item %s is not in the cache' % str(k))
+        return self._cache.index(k)
+
+    @inheritdoc(Cache)
+    def has(self, k, *args, **kwargs):
+        return k in self._cache
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        # search content over the list
+        # if it has it move it one position up, otherwise return false
+        if k not in self._cache:
+            return False
+        self._cache.move_up(k)
+        return True
+
+    def put(self, k, *args, **kwargs):
+        """Insert an item in the cache if not already inserted.
+
+        If the element is already present in the cache, it will pushed one
+        position up.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to be inserted
 
         Returns
         -------
@@ -1448,6 +2255,12 @@ class ClimbCache(Cache):
         self._cache.append_bottom(k)
         return evicted
 
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        if k in self._cache or len(self._cache) < self._maxlen:
+            return None
+        return self._cache.bottom
+
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k not in self._cache:
@@ -1480,6 +2293,8 @@ class RandEvictionCache(Cache):
             raise ValueError('maxlen must be positive')
         self._cache = set()
         self._a = [None for _ in range(self._maxlen)]
+        # Index of the next item to evict, if drawn in advance by victim
+        self._victim_index = None
 
     @inheritdoc(Cache)
     def __len__(self):
@@ -1506,7 +2321,10 @@ class RandEvictionCache(Cache):
         evicted = None
         if not self.has(k):
             if len(self._cache) == self._maxlen:
-                evicted_index = random.randint(0, self.maxlen - 1)
+                evicted_index = self._victim_index
+                if evicted_index is None:
+                    evicted_index = random.randint(0, self.maxlen - 1)
+                self._victim_index = None
                 evicted = self._a[evicted_index]
                 self._a[evicted_index] = k
                 self._cache.remove(evicted)
@@ -1515,6 +2333,15 @@ class RandEvictionCache(Cache):
             self._cache.add(k)
         return evicted
 
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        if k in self._cache or len(self._cache) < self._maxlen:
+            return None
+        # The index is drawn in advance and used by the next eviction
+        if self._victim_index is None:
+            self._victim_index = random.randint(0, self._maxlen - 1)
+        return self._a[self._victim_index]
+
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k not in self._cache:
@@ -1523,163 +2350,898 @@ class RandEvictionCache(Cache):
         self._a[index] = self._a[len(self._cache) - 1]
         self._a[len(self._cache) - 1] = None
         self._cache.remove(k)
+        self._victim_index = None
         return True
 
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
+        self._victim_index = None
 
 
-def insert_after_k_hits_cache(cache, k=2, memory=None):
-    """Return a cache inserting items only after k requests.
+# Multiplier of the Fibonacci hashing of integer items in array-backed caches
+_HASH_MULTIPLIER = 11400714819323198485
+
+
+class _ArrayListCache(Cache):
+    """Base class of caches of integer items stored in doubly-linked lists
+    backed by arrays.
+
+    Each cached item occupies a slot of a set of arrays storing the item and
+    the slots above and below it in its list. Several lists can share the same
+    slots (e.g. the segments of an SLRU cache). Items are mapped to their slot
+    either by an array indexed by item, if the largest item is known, or by an
+    open-addressing hash table.
+
+    Each item takes 8 bytes, plus 8 bytes for the links, 1 byte for the list
+    and 8 bytes in the hash table or 4 bytes per possible item in the index
+    array, i.e. about an order of magnitude less than a LinkedSet.
+    """
+
+    def __init__(self, maxlen, n_lists=1, n_contents=None):
+        """Constructor
+
+        Parameters
+        ----------
+        maxlen : int
+            The maximum number of items the cache can store
+        n_lists : int, optional
+            The number of lists
+        n_contents : int, optional
+            The largest item. If not None, items must be integers between 0
+            and *n_contents* and are mapped to slots by an array. Otherwise,
+            items can be any 64-bit integer and are mapped to slots by a hash
+            table
+        """
+        self._maxlen = int(maxlen)
+        if self._maxlen <= 0:
+            raise ValueError('maxlen must be positive')
+        self._n_lists = n_lists
+        self._n_contents = n_contents
+        if n_contents is None:
+            self._find = self._hash_find
+            self._index_add = self._hash_add
+            self._index_remove = self._hash_remove
+        else:
+            self._find = self._array_find
+            self._index_add = self._array_add
+            self._index_remove = self._array_remove
+        self._init_arrays()
+
+    def _init_arrays(self):
+        """Allocate all arrays, leaving the cache empty"""
+        # One more slot than items, so that an item can be inserted before
+        # evicting another one
+        size = self._maxlen + 1
+        self._key = array.array('q', bytes(8 * size))
+        self._list = array.array('b', bytes(size))
+        self._up = array.array('i', [-1]) * size
+        # Free slots are linked through the down array
+        self._down = array.array('i', range(1, size + 1))
+        self._down[-1] = -1
+        self._free = 0
+        self._top = [-1] * self._n_lists
+        self._bottom = [-1] * self._n_lists
+        self._list_len = [0] * self._n_lists
+        if self._n_contents is None:
+            table_size = 1
+            while table_size < 2 * size:
+                table_size *= 2
+            self._table = array.array('i', [-1]) * table_size
+            self._mask = table_size - 1
+            self._shift = 64 - table_size.bit_length() + 1
+        else:
+            self._pos = array.array('i', [-1]) * (int(self._n_contents) + 1)
+
+    def _array_find(self, k):
+        """Return the slot of an item or -1 if not in cache"""
+        return self._pos[k] if 0 <= k <= self._n_contents else -1
+
+    def _array_add(self, k, slot):
+        self._pos[k] = slot
+
+    def _array_remove(self, k):
+        self._pos[k] = -1
+
+    def _hash(self, k):
+        return ((k * _HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> self._shift
+
+    def _hash_find(self, k):
+        """Return the slot of an item or -1 if not in cache"""
+        i = ((k * _HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> self._shift
+        slot = self._table[i]
+        if slot < 0 or self._key[slot] == k:
+            return slot
+        table = self._table
+        key = self._key
+        mask = self._mask
+        while True:
+            i = (i + 1) & mask
+            slot = table[i]
+            if slot < 0 or key[slot] == k:
+                return slot
+
+    def _hash_add(self, k, slot):
+        table = self._table
+        mask = self._mask
+        i = self._hash(k)
+        while table[i] >= 0:
+            i = (i + 1) & mask
+        table[i] = slot
+
+    def _hash_remove(self, k):
+        table = self._table
+        key = self._key
+        mask = self._mask
+        i = self._hash(k)
+        while key[table[i]] != k:
+            i = (i + 1) & mask
+        # Shift back the following entries of the probe sequence that would
+        # not be found once entry i is emptied
+        j = i
+        while True:
+            j = (j + 1) & mask
+            slot = table[j]
+            if slot < 0:
+                break
+            h = self._hash(key[slot])
+            if (i <= j and (h <= i or h > j)) or (i > j and h <= i and h > j):
+                table[i] = slot
+                i = j
+        table[i] = -1
+
+    def _insert(self, k, lst, top=True):
+        """Store an item in a free slot at the top or bottom of a list"""
+        slot = self._free
+        self._free = self._down[slot]
+        self._key[slot] = k
+        self._index_add(k, slot)
+        if top:
+            self._link_top(slot, lst)
+        else:
+            self._link_bottom(slot, lst)
+        return slot
+
+    def _delete(self, slot):
+        """Remove the item stored in a slot and free the slot"""
+        self._unlink(slot)
+        self._index_remove(self._key[slot])
+        self._down[slot] = self._free
+        self._free = slot
+        return self._key[slot]
+
+    def _link_top(self, slot, lst):
+        top = self._top[lst]
+        self._list[slot] = lst
+        self._up[slot] = -1
+        self._down[slot] = top
+        if top < 0:
+            self._bottom[lst] = slot
+        else:
+            self._up[top] = slot
+        self._top[lst] = slot
+        self._list_len[lst] += 1
+
+    def _link_bottom(self, slot, lst):
+        bottom = self._bottom[lst]
+        self._list[slot] = lst
+        self._down[slot] = -1
+        self._up[slot] = bottom
+        if bottom < 0:
+            self._top[lst] = slot
+        else:
+            self._down[bottom] = slot
+        self._bottom[lst] = slot
+        self._list_len[lst] += 1
+
+    def _link_above(self, slot, other):
+        """Link a slot just above another one of the same list"""
+        lst = self._list[other]
+        up = self._up[other]
+        self._list[slot] = lst
+        self._up[slot] = up
+        self._down[slot] = other
+        self._up[other] = slot
+        if up < 0:
+            self._top[lst] = slot
+        else:
+            self._down[up] = slot
+        self._list_len[lst] += 1
+
+    def _move_to_top(self, slot):
+        """Move a slot to the top of its list"""
+        lst = self._list[slot]
+        top = self._top[lst]
+        if slot == top:
+            return
+        up_array = self._up
+        down_array = self._down
+        up = up_array[slot]
+        down = down_array[slot]
+        down_array[up] = down
+        if down < 0:
+            self._bottom[lst] = up
+        else:
+            up_array[down] = up
+        up_array[slot] = -1
+        down_array[slot] = top
+        up_array[top] = slot
+        self._top[lst] = slot
+
+    def _unlink(self, slot):
+        lst = self._list[slot]
+        up = self._up[slot]
+        down = self._down[slot]
+        if up < 0:
+            self._top[lst] = down
+        else:
+            self._down[up] = down
+        if down < 0:
+            self._bottom[lst] = up
+        else:
+            self._up[down] = up
+        self._list_len[lst] -= 1
+
+    def _keys(self, lst):
+        """Return the items of a list from top to bottom"""
+        keys = []
+        slot = self._top[lst]
+        while slot >= 0:
+            keys.append(self._key[slot])
+            slot = self._down[slot]
+        return keys
+
+    @inheritdoc(Cache)
+    def __len__(self):
+        return sum(self._list_len)
+
+    @property
+    @inheritdoc(Cache)
+    def maxlen(self):
+        return self._maxlen
+
+    @inheritdoc(Cache)
+    def dump(self):
+        return [k for lst in range(self._n_lists) for k in self._keys(lst)]
 
-    This methods allows to implement a variant of k-LRU and k-RANDOM policies,
-    which insert items in the main cache only at the k-th request. However,
-    proper k-LRU and k-RANDOM policies, keep a separate queue of fixed size
-    for items being hit the same number of times. For example, let's say k=3,
-    then there is a fixed size queue storing all items being hit 1 time and
-    another queue for items being hit 2 times. In this implementation there is
-    a unique FIFO queue keeping all items being hit < k times.
-    The size of this queue is equal to the value of memory parameter. If
-    memory is None, then this queue is infinite.
+    def position(self, k, *args, **kwargs):
+        """Return the current position of an item in the cache. Position *0*
+        refers to the head of cache, while position *maxlen - 1* refers to the
+        tail of the cache.
+
+        This method does not change the internal state of the cache.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item looked up in the cache
+
+        Returns
+        -------
+        position : int
+            The current position of the item in the cache
+        """
+        slot = self._find(k)
+        if slot < 0:
+            raise ValueError('The item %s is not in the cache' % str(k))
+        lst = self._list[slot]
+        return sum(self._list_len[:lst]) + self._keys(lst).index(k)
+
+    @inheritdoc(Cache)
+    def has(self, k, *args, **kwargs):
+        return self._find(k) >= 0
+
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        if self._find(k) >= 0 or self._list_len[0] < self._maxlen:
+            return None
+        return self._key[self._bottom[0]]
+
+    @inheritdoc(Cache)
+    def remove(self, k, *args, **kwargs):
+        slot = self._find(k)
+        if slot < 0:
+            return False
+        self._delete(slot)
+        return True
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._init_arrays()
+
+
+@register_cache_policy('ARRAY_LRU')
+class ArrayLruCache(_ArrayListCache):
+    """Least Recently Used (LRU) cache of integer items backed by arrays.
+
+    It behaves as :class:`LruCache` but uses much less memory. Items must be
+    integers (see :class:`_ArrayListCache`).
+    """
+
+    def __init__(self, maxlen, n_contents=None, *args, **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        maxlen : int
+            The maximum number of items the cache can store
+        n_contents : int, optional
+            The largest item. If provided, items are located with an array of
+            *n_contents* + 1 entries instead of a hash table
+        """
+        super(ArrayLruCache, self).__init__(maxlen, 1, n_contents)
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        slot = self._find(k)
+        if slot < 0:
+            return False
+        self._move_to_top(slot)
+        return True
+
+    @inheritdoc(LruCache)
+    def put(self, k, *args, **kwargs):
+        slot = self._find(k)
+        if slot >= 0:
+            self._move_to_top(slot)
+            return None
+        self._insert(k, 0)
+        if self._list_len[0] > self._maxlen:
+            return self._delete(self._bottom[0])
+        return None
+
+
+@register_cache_policy('ARRAY_FIFO')
+class ArrayFifoCache(_ArrayListCache):
+    """First In First Out (FIFO) cache of integer items backed by arrays.
+
+    It behaves as :class:`FifoCache` but uses much less memory. Items must be
+    integers (see :class:`_ArrayListCache`).
+    """
+
+    @inheritdoc(ArrayLruCache)
+    def __init__(self, maxlen, n_contents=None, *args, **kwargs):
+        super(ArrayFifoCache, self).__init__(maxlen, 1, n_contents)
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        return self._find(k) >= 0
+
+    @inheritdoc(Cache)
+    def put(self, k, *args, **kwargs):
+        if self._find(k) >= 0:
+            return None
+        self._insert(k, 0)
+        if self._list_len[0] > self._maxlen:
+            return self._delete(self._bottom[0])
+        return None
+
+
+@register_cache_policy('ARRAY_SLRU')
+class ArraySegmentedLruCache(_ArrayListCache):
+    """Segmented Least Recently Used (SLRU) cache of integer items backed by
+    arrays.
+
+    It behaves as :class:`SegmentedLruCache` but uses much less memory. Items
+    must be integers (see :class:`_ArrayListCache`).
+    """
+
+    def __init__(self, maxlen, segments=2, alloc=None, n_contents=None,
+                 *args, **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        maxlen : int
+            The maximum number of items the cache can store
+        segments : int
+            The number of segments
+        alloc : list
+            List of floats, summing to 1. Indicates the fraction of overall
+            caching space to be allocated to each segment.
+        n_contents : int, optional
+            The largest item. If provided, items are located with an array of
+            *n_contents* + 1 entries instead of a hash table
+        """
+        if not isinstance(segments, int) or segments <= 0 or segments > maxlen:
+            raise ValueError('segments must be an integer and 0 < segments <= maxlen')
+        if alloc:
+            if len(alloc) != segments:
+                raise ValueError('alloc must be an iterable with as many entries as segments')
+            if np.abs(np.sum(alloc) - 1) > 0.001:
+                raise ValueError('All alloc entries must sum up to 1')
+        else:
+            alloc = [1 / segments for _ in range(segments)]
+        super(ArraySegmentedLruCache, self).__init__(maxlen, segments,
+                                                     n_contents)
+        self._segment_maxlen = apportionment(maxlen, alloc)
+
+    def _promote(self, slot):
+        """Move an item to the top of the segment above its own"""
+        seg = self._list[slot]
+        if seg == 0:
+            self._move_to_top(slot)
+            return
+        self._unlink(slot)
+        self._link_top(slot, seg - 1)
+        if self._list_len[seg - 1] > self._segment_maxlen[seg - 1]:
+            demoted = self._bottom[seg - 1]
+            self._unlink(demoted)
+            self._link_top(demoted, seg)
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        slot = self._find(k)
+        if slot < 0:
+            return False
+        self._promote(slot)
+        return True
+
+    @inheritdoc(SegmentedLruCache)
+    def put(self, k, *args, **kwargs):
+        slot = self._find(k)
+        if slot >= 0:
+            self._promote(slot)
+            return None
+        last = self._n_lists - 1
+        self._insert(k, last)
+        if self._list_len[last] > self._segment_maxlen[last]:
+            return self._delete(self._bottom[last])
+        return None
+
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        last = self._n_lists - 1
+        if self._find(k) >= 0 or \
+                self._list_len[last] < self._segment_maxlen[last]:
+            return None
+        return self._key[self._bottom[last]]
+
+    @inheritdoc(SegmentedLruCache)
+    def dump(self, serialized=True):
+        dump = [self._keys(seg) for seg in range(self._n_lists)]
+        return sum(dump, []) if serialized else dump
+
+
+@register_cache_policy('ARRAY_CLIMB')
+class ArrayClimbCache(_ArrayListCache):
+    """CLIMB cache of integer items backed by arrays.
+
+    It behaves as :class:`ClimbCache` but uses much less memory. Items must be
+    integers (see :class:`_ArrayListCache`).
+    """
+
+    @inheritdoc(ArrayLruCache)
+    def __init__(self, maxlen, n_contents=None, *args, **kwargs):
+        super(ArrayClimbCache, self).__init__(maxlen, 1, n_contents)
+
+    def _move_up(self, slot):
+        """Move an item one position up"""
+        up = self._up[slot]
+        if up >= 0:
+            self._unlink(slot)
+            self._link_above(slot, up)
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        slot = self._find(k)
+        if slot < 0:
+            return False
+        self._move_up(slot)
+        return True
+
+    @inheritdoc(ClimbCache)
+    def put(self, k, *args, **kwargs):
+        slot = self._find(k)
+        if slot >= 0:
+            self._move_up(slot)
+            return None
+        evicted = None
+        if self._list_len[0] == self._maxlen:
+            evicted = self._delete(self._bottom[0])
+        self._insert(k, 0, top=False)
+        return evicted
+
+
+class CacheWrapper(Cache):
+    """Base class of caches wrapping another cache instance.
+
+    A wrapper delegates all operations to the wrapped cache and subclasses
+    override only the operations whose behavior they change. Wrappers can be
+    stacked and, as long as the wrapped cache can be, pickled. Attributes not
+    defined by the wrapper, e.g. *position*, are looked up on the wrapped
+    cache.
+    """
+
+    __slots__ = ('_cache',)
+
+    def __init__(self, cache, *args, **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        cache : Cache
+            The cache instance to wrap
+        """
+        if not isinstance(cache, Cache):
+            raise TypeError('cache must be an instance of Cache or its subclasses')
+        self._cache = cache
+
+    def __getattr__(self, name):
+        # Never delegate special or wrapper attributes: they are looked up
+        # by pickle and copy before _cache is set
+        if name.startswith('__') or name == '_cache':
+            raise AttributeError(name)
+        return getattr(self._cache, name)
+
+    @property
+    def cache(self):
+        """Return the wrapped cache instance"""
+        return self._cache
+
+    @inheritdoc(Cache)
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def maxlen(self):
+        return self._cache.maxlen
+
+    @inheritdoc(Cache)
+    def dump(self):
+        return self._cache.dump()
+
+    @inheritdoc(Cache)
+    def has(self, k, *args, **kwargs):
+        return self._cache.has(k)
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        return self._cache.get(k)
+
+    @inheritdoc(Cache)
+    def put(self, k, *args, **kwargs):
+        return self._cache.put(k)
+
+    @inheritdoc(Cache)
+    def victim(self, k, *args, **kwargs):
+        return self._cache.victim(k)
+
+    @inheritdoc(Cache)
+    def remove(self, k, *args, **kwargs):
+        return self._cache.remove(k)
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._cache.clear()
+
+
+@register_cache_admission('K_HITS')
+class InsertAfterKHitsCache(CacheWrapper):
+    """Cache inserting items only after k requests.
+
+    This class implements a variant of k-LRU and k-RANDOM policies, which
+    insert items in the main cache only at the k-th request. However, proper
+    k-LRU and k-RANDOM policies, keep a separate queue of fixed size for items
+    being hit the same number of times. For example, let's say k=3, then there
+    is a fixed size queue storing all items being hit 1 time and another queue
+    for items being hit 2 times. In this implementation there is a unique FIFO
+    queue keeping all items being hit < k times. The size of this queue is
+    equal to the value of memory parameter. If memory is None, then this queue
+    is infinite.
 
     In the most common case of k=2, this difference of implementation does
     not matter.
+    """
 
-    Parameters
-    ----------
-    cache : Cache
-        The instance of a cache to be applied random insertion
-    k : int, optional
-        The number of hits after which the item is inserted
-    memory : int, optional
-        The size of the metacache just storing the reference to the item and
-        the number of hits, without storing the item itself.
+    __slots__ = ('_k', '_memory', '_metacache_hits', '_metacache_queue')
 
-    Returns
-    -------
-    cache : Cache
-        The modified cache instance
-    """
-    if k < 1:
-        raise ValueError("k must be positive")
-    if k == 1:
-        # This is a corner case, as I always insert at first attempt.
-        return cache
-    hits = {}
-    if memory is not None:
-        queue = LinkedSet()
-    c_put = cache.put
-
-    def put(item, force_insert=False, *args, **kwargs):
-        if force_insert:
-            if item in hits:
-                hits.pop(item)
-                if memory is not None:
-                    queue.remove(item)
-            return c_put(item)
-        if item in hits:
-            hits[item] += 1
-            if hits[item] < k:
+    def __init__(self, cache, k=2, memory=None, *args, **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        cache : Cache
+            The cache instance to wrap
+        k : int, optional
+            The number of hits after which the item is inserted
+        memory : int, optional
+            The size of the metacache just storing the reference to the item
+            and the number of hits, without storing the item itself.
+        """
+        super(InsertAfterKHitsCache, self).__init__(cache)
+        if k < 1:
+            raise ValueError("k must be positive")
+        self._k = k
+        self._memory = memory
+        self._metacache_hits = {}
+        self._metacache_queue = LinkedSet() if memory is not None else None
+
+    def put(self, k, force_insert=False, *args, **kwargs):
+        """Insert an item in the cache if it has been requested k times.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to be inserted
+        force_insert : bool, optional
+            If *True*, insert the item regardless of the number of requests
+
+        Returns
+        -------
+        evicted : any hashable type
+            The evicted object or *None* if no contents were evicted.
+        """
+        hits = self._metacache_hits
+        queue = self._metacache_queue
+        if force_insert or self._k == 1:
+            if k in hits:
+                del hits[k]
+                if queue is not None:
+                    queue.remove(k)
+            return self._cache.put(k)
+        n = hits.get(k)
+        if n is not None:
+            if n + 1 < self._k:
+                hits[k] = n + 1
                 return None
-            else:
-                # I got hit enough times, inserting in cache
-                hits.pop(item)
-                if memory is not None:
-                    queue.remove(item)
-                return c_put(item)
+            # I got hit enough times, inserting in cache
+            del hits[k]
+            if queue is not None:
+                queue.remove(k)
+            return self._cache.put(k)
+        hits[k] = 1
+        if queue is not None:
+            queue.append_top(k)
+            if len(queue) > self._memory:
+                del hits[queue.pop_bottom()]
+        return None
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._cache.clear()
+        self._metacache_hits.clear()
+        if self._metacache_queue is not None:
+            self._metacache_queue.clear()
+
+
+@register_cache_admission('RAND')
+class RandInsertCache(CacheWrapper):
+    """Cache inserting items randomly with a given probability instead of
+    deterministically.
+    """
+
+    __slots__ = ('_p', '_random')
+
+    def __init__(self, cache, p, seed=None, *args, **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        cache : Cache
+            The cache instance to wrap
+        p : float
+            the insert probability
+        seed : any hashable type, optional
+            The seed of the random number generator
+        """
+        super(RandInsertCache, self).__init__(cache)
+        if p < 0 or p > 1:
+            raise ValueError('p must be a value between 0 and 1')
+        self._p = p
+        self._random = random.Random(seed)
+
+    @inheritdoc(Cache)
+    def put(self, k, *args, **kwargs):
+        if self._random.random() < self._p:
+            return self._cache.put(k)
+        return None
+
+
+@register_cache_admission('BLOOM_K_HITS')
+class BloomKHitsCache(CacheWrapper):
+    """Cache inserting items only after k requests, counted by a counting
+    Bloom filter.
+
+    This is a bounded-memory variant of *InsertAfterKHitsCache*: instead of
+    keeping the number of requests of each item not yet inserted, requests
+    are counted approximately by a counting Bloom filter of fixed size, whose
+    counters are periodically halved. Hash collisions can make an item be
+    inserted before its k-th request.
+    """
+
+    __slots__ = ('_k', '_filter')
+
+    def __init__(self, cache, k=2, filter_size=None, n_hashes=4, window=None,
+                 seed=None, *args, **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        cache : Cache
+            The cache instance to wrap
+        k : int, optional
+            The number of hits after which the item is inserted
+        filter_size : int, optional
+            The number of counters of the filter, split evenly among its hash
+            functions. If None, it is eight times the size of the cache
+        n_hashes : int, optional
+            The number of hash functions of the filter
+        window : int, optional
+            The number of insertion attempts of items not in the cache, i.e.
+            of misses, after which the counters of the filter are halved. If
+            None, it is ten times the size of the cache
+        seed : any hashable type, optional
+            The seed used to select the hash functions
+        """
+        super(BloomKHitsCache, self).__init__(cache)
+        if k < 1:
+            raise ValueError("k must be positive")
+        maxlen = max(cache.maxlen, 1)
+        if filter_size is None:
+            filter_size = 8 * maxlen
+        if window is None:
+            window = 10 * maxlen
+        self._k = k
+        self._filter = CountMinSketch(max(filter_size // n_hashes, 1),
+                                      n_hashes, max_count=min(k, 255),
+                                      window=window, seed=seed)
+
+    def put(self, k, force_insert=False, *args, **kwargs):
+        """Insert an item in the cache if it has been requested k times.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to be inserted
+        force_insert : bool, optional
+            If *True*, insert the item regardless of the number of requests
+
+        Returns
+        -------
+        evicted : any hashable type
+            The evicted object or *None* if no contents were evicted.
+        """
+        if force_insert or self._cache.has(k) or self._filter.add(k) >= self._k:
+            return self._cache.put(k)
+        return None
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._cache.clear()
+        self._filter.clear()
+
+
+@register_cache_admission('TINYLFU')
+class TinyLfuCache(CacheWrapper):
+    """Cache admitting items according to the TinyLFU policy.
+
+    The frequency of requests of all items is estimated by a frequency sketch
+    of fixed size, preceded by a doorkeeper Bloom filter absorbing items
+    requested only once. Both are aged every *sample_size* requests. When the
+    cache is full, a new item is admitted only if its estimated frequency is
+    greater than that of the item it would replace.
+
+    Requests are recorded by *get*. The item a new item would replace is
+    looked up with the *victim* method of the wrapped cache, so that a
+    rejected item leaves the wrapped cache unchanged.
+    """
+
+    __slots__ = ('_sketch', '_doorkeeper', '_sample_size', '_n_samples')
+
+    def __init__(self, cache, sample_size=None, sketch_width=None,
+                 sketch_depth=4, doorkeeper_size=None, seed=None, *args,
+                 **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        cache : Cache
+            The cache instance to wrap
+        sample_size : int, optional
+            The number of requests after which frequencies are aged. If None,
+            it is ten times the size of the cache
+        sketch_width : int, optional
+            The number of counters per row of the frequency sketch. If None,
+            it is the size of the cache
+        sketch_depth : int, optional
+            The number of rows of the frequency sketch
+        doorkeeper_size : int, optional
+            The number of bits of the doorkeeper Bloom filter. If None, it is
+            four times the sample size
+        seed : any hashable type, optional
+            The seed used to select the hash functions
+        """
+        super(TinyLfuCache, self).__init__(cache)
+        maxlen = max(cache.maxlen, 1)
+        if sample_size is None:
+            sample_size = 10 * maxlen
+        if sample_size <= 0:
+            raise ValueError('sample_size must be positive')
+        if sketch_width is None:
+            sketch_width = max(maxlen, 16)
+        if doorkeeper_size is None:
+            doorkeeper_size = 4 * sample_size
+        self._sample_size = sample_size
+        self._n_samples = 0
+        self._sketch = CountMinSketch(sketch_width, sketch_depth,
+                                      max_count=15, seed=seed)
+        self._doorkeeper = CountMinSketch(max(doorkeeper_size // 2, 1), 2,
+                                          max_count=1, seed=seed)
+
+    def _record(self, k):
+        """Record a request for an item"""
+        if k in self._doorkeeper:
+            self._sketch.add(k)
         else:
-            hits[item] = 1
-            if memory is not None:
-                queue.append_top(item)
-                if len(queue) > memory:
-                    evicted = queue.pop_bottom()
-                    hits.pop(evicted)
-            return None
+            self._doorkeeper.add(k)
+        self._n_samples += 1
+        if self._n_samples >= self._sample_size:
+            self._sketch.age()
+            self._doorkeeper.clear()
+            self._n_samples = 0
 
-    cache.put = put
-    cache.put.__doc__ = c_put.__doc__
-    cache._metacache_hits = hits
-    if memory is not None:
-        cache._metacache_queue = queue
-    return cache
+    def frequency(self, k):
+        """Return the estimated request frequency of an item
 
+        Parameters
+        ----------
+        k : any hashable type
+            The item
 
-def rand_insert_cache(cache, p, seed=None):
-    """Return a random insertion cache
+        Returns
+        -------
+        freq : int
+            The estimated number of requests of the item in the current
+            sample
+        """
+        return self._sketch.estimate(k) + (k in self._doorkeeper)
 
-    It modifies the instance of a cache object such that items are
-    inserted randomly instead of deterministically.
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        self._record(k)
+        return self._cache.get(k)
+
+    @inheritdoc(Cache)
+    def put(self, k, *args, **kwargs):
+        victim = self._cache.victim(k)
+        if victim is not None and victim != k and \
+                self.frequency(victim) >= self.frequency(k):
+            return None
+        return self._cache.put(k)
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._cache.clear()
+        self._sketch.clear()
+        self._doorkeeper.clear()
+        self._n_samples = 0
 
-    This function modifies the behavior of the *put* method of a given cache
-    instance such that it inserts contents randomly with a given probability
 
-    Parameters
-    ----------
-    cache : Cache
-        The instance of a cache to be applied random insertion
-    p : float
-        the insert probability
-    seed : any hashable type, optional
-        The seed of the random number generator
+class KeyValCache(CacheWrapper):
+    """Cache storing items together with a value instead of just a key.
 
-    Returns
-    -------
-    cache : Cache
-        The modified cache instance
+    This changes the signature and/or return types of methods *get*, *put*,
+    *remove* and *dump*. The new format is documented in the docstrings of
+    these methods.
     """
-    if not isinstance(cache, Cache):
-        raise TypeError('cache must be an instance of Cache or its subclasses')
-    if p < 0 or p > 1:
-        raise ValueError('p must be a value between 0 and 1')
-    cache = copy.deepcopy(cache)
-    random.seed(seed)
-    c_put = cache.put
-    def put(k, *args, **kwargs):
-        if random.random() < p:
-            return c_put(k)
-    cache.put = put
-    cache.put.__doc__ = c_put.__doc__
-    return cache
-
-
-def keyval_cache(cache):
-    """It modifies the instance of a cache object such that items are saved
-    together with a value instead of just a key.
 
-    This modifies the signature and/or return types of methods *get*, *put* and
-    *dump*. The new format is documented in the docstrings of the modified
-    methods of the cache instance.
+    __slots__ = ('_val',)
 
-    This function modifies the contract of methods of Cache objects, which is
-    admittedly a bad software engineering practice . It may also lead to bugs
-    in a key-value cache implementation if the base key-only cache
-    implementation from which it derives has methods calling other methods of
-    the same instance.
+    def __init__(self, cache, *args, **kwargs):
+        """Constructor
 
-    Parameters
-    ----------
-    cache : Cache
-        The instance of a cache to be changed to a key-value cache
+        Parameters
+        ----------
+        cache : Cache
+            The cache instance to wrap. It must be empty
+        """
+        super(KeyValCache, self).__init__(cache)
+        if len(cache) > 0:
+            raise ValueError('the cache must be empty')
+        self._val = {}
 
-    Returns
-    -------
-    cache : Cache
-        The modified cache instance
-    """
-    if not isinstance(cache, Cache):
-        raise TypeError('cache must be an instance of Cache or its subclasses')
-    if len(cache) > 0:
-        raise ValueError('the cache must be empty')
-    cache = copy.deepcopy(cache)
-    cache._val = {}
-    k_put = cache.put
-    k_get = cache.get
-    k_remove = cache.remove
-    k_dump = cache.dump
-    k_clear = cache.clear
-
-    def put(k, v, *args, **kwargs):
+    def put(self, k, v, *args, **kwargs):
         """Insert an item in the cache if not already inserted.
 
         If the element is already present in the cache with the same value, it
@@ -1699,13 +3261,13 @@ def keyval_cache(cache):
             The key, value tuple of the evicted object or *None* if no contents
             were evicted.
         """
-        evicted = k_put(k)
-        cache._val[k] = v
+        evicted = self._cache.put(k)
+        self._val[k] = v
         if evicted is not None:
-            val = cache._val.pop(evicted)
-            return evicted, val
+            return evicted, self._val.pop(evicted)
+        return None
 
-    def get(k, *args, **kwargs):
+    def get(self, k, *args, **kwargs):
         """Retrieve an item from the cache.
 
         Differently from *has(k)*, calling this method may change the internal
@@ -1723,9 +3285,9 @@ def keyval_cache(cache):
             The value of the requested object or *None* if it is not in the
             cache
         """
-        return cache._val[k] if k_get(k) else None
+        return self._val[k] if self._cache.get(k) else None
 
-    def remove(k, *args, **kwargs):
+    def remove(self, k, *args, **kwargs):
         """Remove an item from the cache, if present
 
         Parameters
@@ -1739,9 +3301,9 @@ def keyval_cache(cache):
             The value of the deleted object or *None* if it was not in the
             cache
         """
-        return cache._val.pop(k) if k_remove(k) else None
+        return self._val.pop(k) if self._cache.remove(k) else None
 
-    def dump(*args, **kwargs):
+    def dump(self):
         """Return a dump of all the elements currently in the cache possibly
         sorted according to the eviction policy.
 
@@ -1751,14 +3313,15 @@ def keyval_cache(cache):
             The list of items currently stored in the cache represented as
             key, value pairs
         """
-        dump = k_dump()
-        return [(k, cache._val[k]) for k in dump]
+        val = self._val
+        return [(k, val[k]) for k in self._cache.dump()]
 
-    def clear():
-        k_clear()
-        cache._val.clear()
+    @inheritdoc(Cache)
+    def clear(self):
+        self._cache.clear()
+        self._val.clear()
 
-    def value(k, *args, **kwargs):
+    def value(self, k, *args, **kwargs):
         """Return the value of item k
 
         Differently from *get(k)*, calling this method does not change the
@@ -1775,74 +3338,59 @@ def keyval_cache(cache):
             The value of the requested object or *None* if it is not in the
             cache
         """
-        return cache._val[k] if k in cache._val else None
-
-    cache.put = put
-    cache.get = get
-    cache.remove = remove
-    cache.dump = dump
-    cache.clear = clear
-    cache.clear.__doc__ = k_clear.__doc__
-    cache.value = value
-
-    return cache
-
+        return self._val.get(k)
 
-def ttl_cache(cache, f_time):
-    """Return a TTL cache.
 
-    This function takes as a input a cache policy and returns a new policy
-    where items, when inserted, are (optionally) labelled with their expiration
-    time and are automatically evicted when their validity expires.
+class TtlCache(CacheWrapper):
+    """Cache whose items, when inserted, are (optionally) labelled with their
+    expiration time and are automatically evicted when their validity expires.
 
     The time validity is verified against the return value of the callable
-    argument *f_time*, which is called whenever a purging is executed.
-
-    This implementation can be used with both real time and simulated time.
-
-    Parameters
-    ----------
-    cache : Cache
-        The instance of a cache to be changed to a TTL cache
-    f_time : callable
-        A function that returns the current time (simulated or real). The
-        return type must be a numerical value, e.g. float
-
-    Returns
-    -------
-    cache : Cache
-        The modified cache instance
+    *f_time*, which is called whenever a purging is executed. This
+    implementation can be used with both real time and simulated time.
 
     Notes
     -----
-    The returned TTL cache performs purging operations only when *has*, *get*,
-    *put* and *dump* operations are performed. This ensures correctness when
-    normal caches are used with common routing and caching strategies.
-    However, if other operations like *position* or *len* are executed,
-    results may take into account also expired items. In such cases, it is then
-    advisable to execute a *purge* first.
+    This cache performs purging operations only when *has*, *get*, *put* and
+    *dump* operations are performed. This ensures correctness when normal
+    caches are used with common routing and caching strategies. However, if
+    other operations like *position* or *len* are executed, results may take
+    into account also expired items. In such cases, it is then advisable to
+    execute a *purge* first.
     """
-    if not isinstance(cache, Cache):
-        raise TypeError('cache must be an instance of Cache or its subclasses')
-    if len(cache) > 0:
-        raise ValueError('the cache must be empty')
-    if not hasattr(f_time, '__call__'):
-        raise TypeError('f_time must be callable')
-    cache = copy.deepcopy(cache)
 
-    cache.f_time = f_time
-    cache.expiry = {}
+    __slots__ = ('f_time', 'expiry', '_exp_heap', '_seq')
 
-    cache._exp_list = LinkedSet()
+    def __init__(self, cache, f_time, *args, **kwargs):
+        """Constructor
 
-    c_put = cache.put
-    c_get = cache.get
-    c_has = cache.has
-    c_remove = cache.remove
-    c_dump = cache.dump
-    c_clear = cache.clear
+        Parameters
+        ----------
+        cache : Cache
+            The cache instance to wrap. It must be empty
+        f_time : callable
+            A function that returns the current time (simulated or real). The
+            return type must be a numerical value, e.g. float
+        """
+        super(TtlCache, self).__init__(cache)
+        if len(cache) > 0:
+            raise ValueError('the cache must be empty')
+        if not hasattr(f_time, '__call__'):
+            raise TypeError('f_time must be callable')
+        self.f_time = f_time
+        self.expiry = {}
+        # Heap of (expiration time, sequence number, item). Entries whose
+        # expiration time differs from the one in self.expiry are stale and
+        # are discarded lazily
+        self._exp_heap = []
+        self._seq = 0
+
+    def _remove_expired(self, k):
+        """Remove an expired item"""
+        self.expiry.pop(k)
+        self._cache.remove(k)
 
-    def _purge_till(expiry):
+    def _purge_till(self, expiry):
         """Purge all entries expired before a certain time
 
         Parameters
@@ -1850,25 +3398,25 @@ def ttl_cache(cache, f_time):
         expiry : float
             Cutoff expiration time
         """
-        while cache._exp_list.bottom is not None and \
-              cache.expiry[cache._exp_list.bottom] < expiry:
-            expired = cache._exp_list.pop_bottom()
-            cache.expiry.pop(expired)
-            c_remove(expired)
+        heap = self._exp_heap
+        while heap and heap[0][0] < expiry:
+            exp, _, k = heapq.heappop(heap)
+            if self.expiry.get(k) == exp:
+                self._remove_expired(k)
 
-    def purge():
+    def purge(self):
         """Purge all expired items"""
-        cache._purge_till(cache.f_time())
+        self._purge_till(self.f_time())
 
-    def get(k, *args, **kwargs):
-        if c_get(k):
-            if cache.f_time() < cache.expiry[k]:
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        if self._cache.get(k):
+            if self.f_time() < self.expiry[k]:
                 return True
-            else:
-                remove(k)
+            self._remove_expired(k)
         return False
 
-    def put(k, ttl=None, expires=None, *args, **kwargs):
+    def put(self, k, ttl=None, expires=None, *args, **kwargs):
         """Insert an item in the cache if not already inserted.
 
         If the element is already present in the cache, it will not be inserted
@@ -1890,52 +3438,49 @@ def ttl_cache(cache, f_time):
         evicted : any hashable type
             The evicted object or *None* if no contents were evicted.
         """
-        now = cache.f_time()
+        now = self.f_time()
         if ttl is not None:
             if expires is not None:
                 raise ValueError('Both expires and ttl parameters provided. '
-                             'Only one can be provided.')
+                                 'Only one can be provided.')
             if ttl <= 0:
                 # if TTL is not positive, then do not cache the content at all
                 return None
             expires = now + ttl
-        else:  # case where TTL is None
-            if expires is None:
-                # If both TTL and expire are None, then TTL is infinite
-                expires = np.infty
-            elif expires <= now:
-                return None
+        elif expires is None:
+            # If both TTL and expire are None, then TTL is infinite
+            expires = np.inf
+        elif expires <= now:
+            return None
         # Purge expired items only if cache is full for performance reasons
-        if len(cache) == cache.maxlen:
-            cache._purge_till(now)
-        evicted = c_put(k)
+        if len(self._cache) == self._cache.maxlen:
+            self._purge_till(now)
+        evicted = self._cache.put(k)
+        expiry = self.expiry
         if evicted is not None:
-            cache.expiry.pop(evicted)
-            cache._exp_list.remove(evicted)
-        if k not in cache.expiry or cache.expiry[k] < expires:
-            cache.expiry[k] = expires
-            if k in cache._exp_list:
-                cache._exp_list.remove(k)
-            if len(cache._exp_list) == 0:
-                cache._exp_list.append_top(k)
-            else:
-                for i in cache._exp_list:
-                    if expires >= cache.expiry[i]:
-                        cache._exp_list.insert_above(i, k)
-                        break
-                else:
-                    cache._exp_list.append_bottom(k)
+            expiry.pop(evicted)
+        if k not in expiry or expiry[k] < expires:
+            expiry[k] = expires
+            heap = self._exp_heap
+            heapq.heappush(heap, (expires, self._seq, k))
+            self._seq += 1
+            if len(heap) > 2 * len(expiry) + 16:
+                heap = [e for e in heap if expiry.get(e[2]) == e[0]]
+                heapq.heapify(heap)
+                self._exp_heap = heap
         return evicted
 
-    def has(k, *args, **kwargs):
-        return c_has(k) and cache.f_time() <= cache.expiry[k]
+    @inheritdoc(Cache)
+    def has(self, k, *args, **kwargs):
+        return self._cache.has(k) and self.f_time() <= self.expiry[k]
 
-    def remove(k, *args, **kwargs):
-        c_remove(k)
-        cache.expiry.pop(k)
-        cache._exp_list.remove(k)
+    @inheritdoc(Cache)
+    def remove(self, k, *args, **kwargs):
+        removed = self._cache.remove(k)
+        self.expiry.pop(k, None)
+        return removed
 
-    def dump():
+    def dump(self):
         """Return a dump of all the elements currently in the cache possibly
         sorted according to the eviction policy.
 
@@ -1945,27 +3490,309 @@ def ttl_cache(cache, f_time):
             The list of items currently stored in the cache represented as
             (key, expiration time) pairs
         """
-        cache.purge()
-        dump = c_dump()
-        return [(k, cache.expiry[k]) for k in dump]
+        self.purge()
+        expiry = self.expiry
+        return [(k, expiry[k]) for k in self._cache.dump()]
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._cache.clear()
+        self.expiry.clear()
+        self._exp_heap = []
+
+
+class TtlKeyValCache(TtlCache):
+    """TTL cache storing items together with a value.
+
+    This class combines the behavior of *TtlCache* and *KeyValCache*. Items
+    are inserted with a value and, optionally, an expiration time and are
+    evicted when they expire. Values of expired items are discarded together
+    with the items.
+    """
+
+    __slots__ = ('_val',)
+
+    @inheritdoc(TtlCache)
+    def __init__(self, cache, f_time, *args, **kwargs):
+        super(TtlKeyValCache, self).__init__(cache, f_time)
+        self._val = {}
+
+    def _remove_expired(self, k):
+        """Remove an expired item and its value"""
+        super(TtlKeyValCache, self)._remove_expired(k)
+        self._val.pop(k, None)
+
+    def put(self, k, v, ttl=None, expires=None, *args, **kwargs):
+        """Insert an item in the cache if not already inserted.
+
+        If the element is already present in the cache, its value is updated
+        and its expiration time is extended if the new one is later.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The key of item to be inserted
+        v : any hashable type
+            The value of item to be inserted
+        ttl : float, optional
+            The TTL of the item, i.e. its relative expiration time
+        expires : float, optional
+            The absolute expiration time of the item. It cannot be used in
+            conjunction with ttl. If both ttl and expires are None, then the
+            inserted content has infinite TTL.
+
+        Returns
+        -------
+        evicted : tuple
+            The key, value tuple of the evicted object or *None* if no contents
+            were evicted.
+        """
+        evicted = super(TtlKeyValCache, self).put(k, ttl, expires)
+        if k in self.expiry:
+            self._val[k] = v
+        if evicted is not None:
+            return evicted, self._val.pop(evicted, None)
+        return None
+
+    def get(self, k, *args, **kwargs):
+        """Retrieve an item from the cache.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item looked up in the cache
+
+        Returns
+        -------
+        v : any hashable type
+            The value of the requested object or *None* if it is not in the
+            cache or it expired
+        """
+        return self._val[k] if super(TtlKeyValCache, self).get(k) else None
+
+    def remove(self, k, *args, **kwargs):
+        """Remove an item from the cache, if present
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item looked up in the cache
+
+        Returns
+        -------
+        v : any hashable type
+            The value of the deleted object or *None* if it was not in the
+            cache
+        """
+        if k not in self.expiry:
+            return None
+        super(TtlKeyValCache, self).remove(k)
+        return self._val.pop(k)
+
+    def dump(self):
+        """Return a dump of all the elements currently in the cache possibly
+        sorted according to the eviction policy.
+
+        Returns
+        -------
+        cache_dump : list of tuples
+            The list of items currently stored in the cache represented as
+            (key, value, expiration time) tuples
+        """
+        val = self._val
+        return [(k, val[k], exp)
+                for k, exp in super(TtlKeyValCache, self).dump()]
+
+    @inheritdoc(Cache)
+    def clear(self):
+        super(TtlKeyValCache, self).clear()
+        self._val.clear()
+
+    @inheritdoc(KeyValCache)
+    def value(self, k, *args, **kwargs):
+        return self._val.get(k)
+
+
+def build_cache(maxlen, cache_policy):
+    """Instantiate a cache from a cache policy descriptor.
+
+    Parameters
+    ----------
+    maxlen : int
+        The maximum number of items the cache can store
+    cache_policy : dict or Tree
+        Cache policy descriptor. Its *name* key identifies the replacement
+        policy and its optional *admission* key the admission policy wrapping
+        it. The keyword arguments of the admission policy are given by the
+        optional *admission_args* key and all other keys are passed as
+        keyword arguments to the replacement policy, e.g.
+        {'name': 'SLRU', 'segments': 3, 'admission': 'K_HITS',
+        'admission_args': {'k': 2}}. Other keys accepted only by the
+        admission policy are passed to it, e.g. {'name': 'LRU',
+        'admission': 'K_HITS', 'k': 2}, while those accepted by both
+        policies configure the replacement policy and require the argument
+        of the admission policy to be given in *admission_args*
+
+    Returns
+    -------
+    cache : Cache
+        The cache instance
+    """
+    policy_args = {k: v for k, v in cache_policy.items()
+                   if k not in ('name', 'admission', 'admission_args')}
+    admission = cache_policy.get('admission')
+    admission_args = cache_policy.get('admission_args') or {}
+    if admission is None and admission_args:
+        raise ValueError('admission_args given without admission policy')
+    policy = CACHE_POLICY[cache_policy['name']]
+    if admission is None:
+        return policy(maxlen, **policy_args)
+    wrapper = CACHE_ADMISSION[admission]
+    # Policies ignore unknown keyword arguments, so arguments of the
+    # admission policy given at the top level must be routed to it
+    wrapper_params = _named_parameters(wrapper).intersection(policy_args)
+    policy_params = _named_parameters(policy)
+    ambiguous = wrapper_params.intersection(policy_params).difference(
+                    admission_args)
+    if ambiguous:
+        raise ValueError('arguments %s are accepted by both %s and %s: those '
+                         'of the admission policy must be given in '
+                         'admission_args' % (sorted(ambiguous),
+                                             cache_policy['name'], admission))
+    routed = wrapper_params.difference(policy_params)
+    duplicated = routed.intersection(admission_args)
+    if duplicated:
+        raise ValueError('arguments %s given both in admission_args and at '
+                         'the top level' % sorted(duplicated))
+    admission_args = dict(admission_args,
+                          **{k: policy_args.pop(k) for k in routed})
+    return wrapper(policy(maxlen, **policy_args), **admission_args)
+
+
+def _named_parameters(func):
+    """Return the names of the parameters that can be passed by keyword to a
+    function, excluding variable keyword arguments"""
+    return {name for name, param in inspect.signature(func).parameters.items()
+            if param.kind in (param.POSITIONAL_OR_KEYWORD, param.KEYWORD_ONLY)}
+
+
+def insert_after_k_hits_cache(cache, k=2, memory=None):
+    """Return a cache inserting items only after k requests.
+
+    This function wraps the cache with an *InsertAfterKHitsCache*, so that
+    the cache itself is still updated by the operations on the returned
+    cache.
+
+    Parameters
+    ----------
+    cache : Cache
+        The instance of a cache to be applied k-hits insertion
+    k : int, optional
+        The number of hits after which the item is inserted
+    memory : int, optional
+        The size of the metacache just storing the reference to the item and
+        the number of hits, without storing the item itself.
+
+    Returns
+    -------
+    cache : Cache
+        The wrapped cache instance
+    """
+    if k < 1:
+        raise ValueError("k must be positive")
+    if k == 1:
+        # This is a corner case, as I always insert at first attempt.
+        return cache
+    return InsertAfterKHitsCache(cache, k, memory)
+
+
+def rand_insert_cache(cache, p, seed=None):
+    """Return a random insertion cache
+
+    This function wraps a copy of the cache with a *RandInsertCache*, which
+    inserts contents randomly with a given probability
+
+    Parameters
+    ----------
+    cache : Cache
+        The instance of a cache to be applied random insertion
+    p : float
+        the insert probability
+    seed : any hashable type, optional
+        The seed of the random number generator
+
+    Returns
+    -------
+    cache : Cache
+        The wrapped cache instance
+    """
+    if not isinstance(cache, Cache):
+        raise TypeError('cache must be an instance of Cache or its subclasses')
+    return RandInsertCache(copy.deepcopy(cache), p, seed)
+
+
+def keyval_cache(cache):
+    """Return a cache storing items together with a value instead of just a
+    key.
+
+    This function wraps a copy of the cache with a *KeyValCache*.
+
+    Parameters
+    ----------
+    cache : Cache
+        The instance of a cache to be changed to a key-value cache
+
+    Returns
+    -------
+    cache : Cache
+        The wrapped cache instance
+    """
+    if not isinstance(cache, Cache):
+        raise TypeError('cache must be an instance of Cache or its subclasses')
+    return KeyValCache(copy.deepcopy(cache))
 
-    def clear():
-        c_clear()
-        cache.expiry.clear()
-        cache._exp_list.clear()
 
-    cache._purge_till = _purge_till
+def ttl_cache(cache, f_time):
+    """Return a TTL cache.
+
+    This function wraps a copy of the cache with a *TtlCache*.
+
+    Parameters
+    ----------
+    cache : Cache
+        The instance of a cache to be changed to a TTL cache
+    f_time : callable
+        A function that returns the current time (simulated or real). The
+        return type must be a numerical value, e.g. float
+
+    Returns
+    -------
+    cache : Cache
+        The wrapped cache instance
+    """
+    if not isinstance(cache, Cache):
+        raise TypeError('cache must be an instance of Cache or its subclasses')
+    return TtlCache(copy.deepcopy(cache), f_time)
+
+
+def ttl_keyval_cache(cache, f_time):
+    """Return a TTL cache storing items together with a value.
 
-    cache.get = get
-    cache.put = put
-    cache.has = has
-    cache.remove = remove
-    cache.dump = dump
-    cache.clear = clear
-    cache.purge = purge
-    cache.clear.__doc__ = c_clear.__doc__
+    This function wraps a copy of the cache with a *TtlKeyValCache*.
 
-    return cache
+    Parameters
+    ----------
+    cache : Cache
+        The instance of a cache to be changed to a TTL key-value cache
+    f_time : callable
+        A function that returns the current time (simulated or real). The
+        return type must be a numerical value, e.g. float
 
-def ttl_keyval_cache():
-    pass
+    Returns
+    -------
+    cache : Cache
+        The wrapped cache instance
+    """
+    if not isinstance(cache, Cache):
+        raise TypeError('cache must be an instance of Cache or its subclasses')
+    return TtlKeyValCache(copy.deepcopy(cache), f_time)
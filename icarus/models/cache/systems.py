@@ -358,6 +358,10 @@ class ShardedCache(Cache):
     def put(self, k):
         return self._node[self.f_map(k)].put(k)
 
+    @inheritdoc(Cache)
+    def victim(self, k):
+        return self._node[self.f_map(k)].victim(k)
+
     @inheritdoc(Cache)
     def dump(self, serialized=True):
         dump = list(s.dump() for s in self._node)
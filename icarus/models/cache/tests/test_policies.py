@@ -1,10 +1,16 @@
 from __future__ import division
+import os
+import sys
+import subprocess
 import unittest
 import collections
+import pickle
+import random
 
 import numpy as np
 
 import icarus.models as cache
+from icarus.registry import CACHE_POLICY
 
 class TestLinkedSet(unittest.TestCase):
 
@@ -276,6 +282,80 @@ class TestMinCache(unittest.TestCase):
             self.assertEqual(set(range(min(i + 1, size))), set(c.dump()))
 
 
+class ScanBeladyMinCache(object):
+    """Reference MIN cache looking for the item to evict by scanning the
+    whole cache"""
+
+    def __init__(self, maxlen, trace):
+        self._maxlen = maxlen
+        self._next = collections.defaultdict(collections.deque)
+        for i, k in enumerate(trace):
+            self._next[k].append(i)
+        for k in self._next.values():
+            k.append(float('inf'))
+        self._cache = {}
+
+    def dump(self):
+        return set(self._cache.keys())
+
+    def get(self, k):
+        self._next[k].popleft()
+        return k in self._cache
+
+    def put(self, k):
+        if len(self._cache) < self._maxlen:
+            self._cache[k] = self._next[k]
+            return None
+        next_cache = max(self._cache, key=lambda k: self._cache[k][0])
+        if self._next[k][0] < self._next[next_cache][0]:
+            self._cache.pop(next_cache)
+            self._cache[k] = self._next[k]
+            return next_cache
+        else:
+            return None
+
+
+class TestMinCacheDifferential(unittest.TestCase):
+
+    def check_same_behavior(self, trace, maxlen, ref_trace=None):
+        c = cache.BeladyMinCache(maxlen, trace)
+        ref = ScanBeladyMinCache(maxlen, trace if ref_trace is None
+                                 else ref_trace)
+        for k in (trace if ref_trace is None else ref_trace):
+            hit = ref.get(k)
+            self.assertEqual(hit, c.get(k))
+            if not hit:
+                self.assertEqual(ref.put(k), c.put(k))
+            self.assertEqual(ref.dump(), c.dump())
+
+    def test_list_trace(self):
+        rng = np.random.RandomState(0)
+        for maxlen in (1, 5, 30):
+            self.check_same_behavior((rng.zipf(1.2, 3000) % 200).tolist(),
+                                     maxlen)
+
+    def test_array_trace(self):
+        trace = np.random.RandomState(1).zipf(1.1, 3000) % 300
+        self.check_same_behavior(trace, 20, trace.tolist())
+
+    def test_string_trace(self):
+        trace = ['item-%d' % k for k in
+                 np.random.RandomState(2).zipf(1.2, 2000) % 100]
+        self.check_same_behavior(trace, 10)
+
+    def test_remove(self):
+        trace = [1, 2, 3, 1, 2, 3]
+        c = cache.BeladyMinCache(2, trace)
+        for k in (1, 2):
+            c.get(k)
+            c.put(k)
+        self.assertTrue(c.remove(1))
+        self.assertFalse(c.remove(1))
+        c.get(3)
+        self.assertIsNone(c.put(3))
+        self.assertEqual({2, 3}, c.dump())
+
+
 class TestLruCache(unittest.TestCase):
 
     def test_lru(self):
@@ -565,6 +645,211 @@ class TestClimbCache(unittest.TestCase):
 
 
 
+class TestOrderedDictCaches(unittest.TestCase):
+
+    def check_same_behavior(self, ref, c, trace):
+        for i, k in enumerate(trace):
+            if i % 7 == 0:
+                self.assertEqual(ref.remove(k), c.remove(k))
+            hit = ref.get(k)
+            self.assertEqual(hit, c.get(k))
+            if not hit or i % 3 == 0:
+                self.assertEqual(ref.put(k), c.put(k))
+            self.assertEqual(len(ref), len(c))
+            self.assertEqual(ref.has(k), c.has(k))
+        self.assertEqual(ref.dump(), c.dump())
+        for k in ref.dump():
+            self.assertEqual(ref.position(k), c.position(k))
+        c.clear()
+        self.assertEqual(0, len(c))
+        self.assertEqual([], c.dump())
+
+    def test_lru(self):
+        rng = np.random.RandomState(0)
+        for maxlen in (1, 4, 25):
+            trace = (rng.zipf(1.1, 3000) % 300).tolist()
+            self.check_same_behavior(cache.LruCache(maxlen),
+                                     cache.OrderedDictLruCache(maxlen), trace)
+
+    def test_fifo(self):
+        rng = np.random.RandomState(1)
+        for maxlen in (1, 4, 25):
+            trace = (rng.zipf(1.1, 3000) % 300).tolist()
+            self.check_same_behavior(cache.FifoCache(maxlen),
+                                     cache.OrderedDictFifoCache(maxlen), trace)
+
+
+class TestArrayCaches(unittest.TestCase):
+
+    def check_same_behavior(self, ref, c, trace, remove_every=None):
+        for i, k in enumerate(trace):
+            if remove_every and i % remove_every == 0:
+                self.assertEqual(ref.remove(k), c.remove(k))
+            hit = ref.get(k)
+            self.assertEqual(hit, c.get(k))
+            if not hit or i % 3 == 0:
+                self.assertEqual(ref.put(k), c.put(k))
+            self.assertEqual(len(ref), len(c))
+        self.assertEqual(ref.dump(), c.dump())
+        for k in ref.dump():
+            self.assertEqual(ref.position(k), c.position(k))
+
+    def check_policy(self, ref_cls, array_cls, **kwargs):
+        rng = np.random.RandomState(0)
+        for maxlen in (1, 4, 25):
+            for n_contents in (None, 300):
+                trace = (rng.zipf(1.1, 3000) % 301).tolist()
+                self.check_same_behavior(
+                    ref_cls(maxlen, **kwargs),
+                    array_cls(maxlen, n_contents=n_contents, **kwargs),
+                    trace, remove_every=7)
+
+    def test_lru(self):
+        self.check_policy(cache.LruCache, cache.ArrayLruCache)
+
+    def test_fifo(self):
+        self.check_policy(cache.FifoCache, cache.ArrayFifoCache)
+
+    def test_slru(self):
+        self.check_policy(cache.SegmentedLruCache,
+                          cache.ArraySegmentedLruCache, segments=1)
+        for segments in (2, 3):
+            ref = cache.SegmentedLruCache(12, segments)
+            c = cache.ArraySegmentedLruCache(12, segments)
+            trace = (np.random.RandomState(segments).zipf(1.1, 3000) % 100).tolist()
+            self.check_same_behavior(ref, c, trace, remove_every=11)
+            self.assertEqual(ref.dump(serialized=False), c.dump(serialized=False))
+
+    def test_climb(self):
+        self.check_policy(cache.ClimbCache, cache.ArrayClimbCache)
+
+    def test_large_and_negative_items(self):
+        trace = [2 ** 62, -1, 0, 2 ** 40, -2 ** 62, 2 ** 62, 7 * 2 ** 32] * 5
+        self.check_same_behavior(cache.LruCache(3), cache.ArrayLruCache(3),
+                                 trace)
+
+    def test_hash_collisions(self):
+        c = cache.ArrayLruCache(200)
+        # Multiples of a large power of two have the same low bits
+        items = [i * 2 ** 40 for i in range(200)]
+        for k in items:
+            c.put(k)
+        for k in items[::2]:
+            self.assertTrue(c.remove(k))
+        for k in items[1::2]:
+            self.assertTrue(c.has(k))
+        for k in items[::2]:
+            self.assertFalse(c.has(k))
+
+    def test_clear(self):
+        c = cache.ArrayFifoCache(3, n_contents=10)
+        for k in (1, 2, 3, 4):
+            c.put(k)
+        c.clear()
+        self.assertEqual(0, len(c))
+        self.assertEqual([], c.dump())
+        self.assertFalse(c.has(4))
+        self.assertIsNone(c.put(5))
+        self.assertEqual([5], c.dump())
+
+    def test_unknown_items(self):
+        c = cache.ArrayLruCache(3, n_contents=10)
+        self.assertFalse(c.has(11))
+        self.assertFalse(c.get(-1))
+        self.assertFalse(c.remove(20))
+        self.assertRaises(ValueError, c.position, 3)
+
+    def test_registered(self):
+        for name in ('ARRAY_LRU', 'ARRAY_FIFO', 'ARRAY_SLRU', 'ARRAY_CLIMB'):
+            self.assertIn(name, CACHE_POLICY)
+            c = CACHE_POLICY[name](5, n_contents=100)
+            self.assertEqual(5, c.maxlen)
+
+
+class TestProcessBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.trace = (np.random.RandomState(0).zipf(1.2, 5000) % 200).tolist()
+
+    def assert_same_as_get_put(self, c1, c2, trace):
+        expected = []
+        for k in trace:
+            if c1.get(k):
+                expected.append(True)
+            else:
+                c1.put(k)
+                expected.append(False)
+        hits = c2.process_batch(trace)
+        self.assertEqual(hits.dtype, bool)
+        self.assertEqual(expected, hits.tolist())
+        self.assertEqual(c1.dump(), c2.dump())
+
+    def test_policies(self):
+        for name in ('LRU', 'FIFO', 'PERFECT_LFU', 'IN_CACHE_LFU', 'SLRU',
+                     'CLIMB', 'ODICT_LRU', 'ODICT_FIFO', 'ARRAY_LRU'):
+            self.assert_same_as_get_put(CACHE_POLICY[name](20),
+                                        CACHE_POLICY[name](20), self.trace)
+
+    def test_array_keys(self):
+        self.assert_same_as_get_put(cache.LruCache(20), cache.LruCache(20),
+                                    np.array(self.trace))
+
+    def test_split_batches(self):
+        c1 = cache.PerfectLfuCache(10)
+        c2 = cache.PerfectLfuCache(10)
+        hits = np.concatenate([c2.process_batch(self.trace[:1000]),
+                               c2.process_batch(self.trace[1000:])])
+        self.assertEqual(c1.process_batch(self.trace).tolist(), hits.tolist())
+
+    def test_wrapper(self):
+        self.assert_same_as_get_put(
+            cache.InsertAfterKHitsCache(cache.LruCache(20), k=2),
+            cache.InsertAfterKHitsCache(cache.LruCache(20), k=2), self.trace)
+
+
+class TestVictim(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.trace = (np.random.RandomState(0).zipf(1.2, 3000) % 100).tolist()
+
+    def assert_victim_evicted(self, c, trace):
+        for k in trace:
+            if c.get(k):
+                continue
+            dump = c.dump()
+            victim = c.victim(k)
+            self.assertEqual(dump, c.dump())
+            evicted = c.put(k)
+            if victim == k:
+                self.assertIn(evicted, (None, k))
+                self.assertFalse(c.has(k))
+            else:
+                self.assertEqual(victim, evicted)
+                self.assertTrue(c.has(k))
+
+    def test_policies(self):
+        random.seed(0)
+        for name in ('LRU', 'FIFO', 'PERFECT_LFU', 'IN_CACHE_LFU', 'SLRU',
+                     'CLIMB', 'RAND', 'ODICT_LRU', 'ODICT_FIFO', 'ARRAY_LRU',
+                     'ARRAY_FIFO', 'ARRAY_SLRU', 'ARRAY_CLIMB', 'NULL'):
+            self.assert_victim_evicted(CACHE_POLICY[name](10), self.trace)
+
+    def test_min(self):
+        self.assert_victim_evicted(cache.BeladyMinCache(10, self.trace),
+                                   self.trace)
+
+    def test_not_full(self):
+        c = cache.LruCache(3)
+        c.put(1)
+        self.assertIsNone(c.victim(2))
+        c.put(2)
+        c.put(3)
+        self.assertIsNone(c.victim(3))
+        self.assertEqual(1, c.victim(4))
+
+
 class TestRandCache(unittest.TestCase):
 
     def test_rand(self):
@@ -641,6 +926,119 @@ class TestInCacheLfuCache(unittest.TestCase):
         self.assertEqual(c.dump(), [])
 
 
+class ScanInCacheLfuCache(object):
+    """Reference In-cache LFU cache looking for the item to evict by scanning
+    the whole cache"""
+
+    def __init__(self, maxlen):
+        self._cache = {}
+        self.t = 0
+        self._maxlen = maxlen
+
+    def __len__(self):
+        return len(self._cache)
+
+    def dump(self):
+        return sorted(self._cache, key=lambda x: self._cache[x], reverse=True)
+
+    def has(self, k):
+        return k in self._cache
+
+    def get(self, k):
+        if self.has(k):
+            freq, t = self._cache[k]
+            self._cache[k] = freq + 1, t
+            return True
+        else:
+            return False
+
+    def put(self, k):
+        if not self.has(k):
+            self.t += 1
+            self._cache[k] = (1, self.t)
+            if len(self._cache) > self._maxlen:
+                evicted = min(self._cache, key=lambda x: self._cache[x])
+                self._cache.pop(evicted)
+                return evicted
+        return None
+
+    def remove(self, k):
+        if k in self._cache:
+            self._cache.pop(k)
+            return True
+        else:
+            return False
+
+
+class TestInCacheLfuCacheDifferential(unittest.TestCase):
+
+    def check_same_behavior(self, maxlen, n_items, n_ops, seed):
+        rng = np.random.RandomState(seed)
+        c = cache.InCacheLfuCache(maxlen)
+        ref = ScanInCacheLfuCache(maxlen)
+        ops = rng.choice(['get', 'put', 'remove'], size=n_ops, p=[0.6, 0.35, 0.05])
+        items = rng.zipf(1.2, size=n_ops) % n_items
+        for op, k in zip(ops, items.tolist()):
+            self.assertEqual(getattr(ref, op)(k), getattr(c, op)(k))
+            self.assertEqual(len(ref), len(c))
+        self.assertEqual(ref.dump(), c.dump())
+
+    def test_small_cache(self):
+        for seed in range(10):
+            self.check_same_behavior(5, 20, 2000, seed)
+
+    def test_large_cache(self):
+        self.check_same_behavior(100, 1000, 20000, 0)
+
+    def test_dump(self):
+        rng = np.random.RandomState(1)
+        c = cache.InCacheLfuCache(30)
+        ref = ScanInCacheLfuCache(30)
+        for k in (rng.zipf(1.5, size=3000) % 100).tolist():
+            if not c.get(k):
+                c.put(k)
+            if not ref.get(k):
+                ref.put(k)
+            self.assertEqual(ref.dump(), c.dump())
+
+
+class ScanPerfectLfuCache(object):
+    """Reference Perfect-LFU cache looking for the item to evict by scanning
+    the whole cache"""
+
+    def __init__(self, maxlen):
+        self._counter = {}
+        self._cache = set()
+        self.t = 0
+        self._maxlen = maxlen
+
+    def dump(self):
+        return sorted(self._cache, key=lambda x: self._counter[x], reverse=True)
+
+    def has(self, k):
+        return k in self._cache
+
+    def get(self, k):
+        self.t += 1
+        if k in self._counter:
+            freq, t = self._counter[k]
+            self._counter[k] = freq + 1, t
+        else:
+            self._counter[k] = 1, self.t
+        return self.has(k)
+
+    def put(self, k):
+        if not self.has(k):
+            freq, t = self._counter[k]
+            self._counter[k] = (freq + 1, t)
+            self._cache.add(k)
+            if len(self._cache) > self._maxlen:
+                evicted = min(self._cache, key=lambda x: self._counter[x])
+                self._cache.remove(evicted)
+                return evicted
+        return None
+
+
 class TestPerfectLfuCache(unittest.TestCase):
 
     def test_lfu(self):
@@ -694,6 +1092,58 @@ class TestPerfectLfuCache(unittest.TestCase):
         self.assertEqual(c.dump(), [])
 
 
+
+    def test_lfu_array_counter(self):
+        c = cache.PerfectLfuCache(3, counter='ARRAY', n_contents=5)
+        for k in (1, 2, 3):
+            c.put(k)
+        for k in 5 * [1] + 4 * [2] + 3 * [3] + [5]:
+            c.get(k)
+        # 5 is inserted and immediately evicted
+        self.assertEqual(5, c.put(5))
+        self.assertEqual(c.dump(), [1, 2, 3])
+        for _ in range(5):
+            c.get(5)
+        self.assertEqual(3, c.put(5))
+        self.assertEqual(c.dump(), [5, 1, 2])
+
+    def test_remove(self):
+        c = cache.PerfectLfuCache(2)
+        c.put(1)
+        c.put(2)
+        self.assertTrue(c.remove(1))
+        self.assertFalse(c.remove(1))
+        self.assertEqual(c.dump(), [2])
+        c.get(1)
+        self.assertIsNone(c.put(1))
+        self.assertEqual(c.dump(), [1, 2])
+
+    def test_same_behavior_as_scan(self):
+        rng = np.random.RandomState(0)
+        reqs = (rng.zipf(1.2, size=20000) % 500).tolist()
+        for counter in ('DICT', 'ARRAY'):
+            c = cache.PerfectLfuCache(50, counter=counter, n_contents=500)
+            ref = ScanPerfectLfuCache(50)
+            for k in reqs:
+                self.assertEqual(ref.get(k), c.get(k))
+                if not ref.has(k):
+                    self.assertEqual(ref.put(k), c.put(k))
+            self.assertEqual(ref.dump(), c.dump())
+
+    def test_sketch_counter(self):
+        c = cache.PerfectLfuCache(3, counter='SKETCH', sketch_width=1024,
+                                  seed=1)
+        for k in 5 * ['a'] + 4 * ['b'] + 3 * ['c'] + ['d']:
+            c.get(k)
+            c.put(k)
+        self.assertEqual(c.dump(), ['a', 'b', 'c'])
+
+    def test_unknown_counter(self):
+        self.assertRaises(ValueError, cache.PerfectLfuCache, 3,
+                          counter='LIST')
+        self.assertRaises(ValueError, cache.PerfectLfuCache, 3,
+                          counter='ARRAY')
+
 class TestInsertAfterKHits(unittest.TestCase):
 
     def test_put_get_no_memory(self):
@@ -783,13 +1233,16 @@ class TestInsertAfterKHits(unittest.TestCase):
         self.assertEqual(0, len(c._metacache_queue))
         self.assertEqual(0, len(c._metacache_hits))
 
-    def test_deepcopy(self):
+    def test_in_place(self):
         c = cache.LruCache(10)
         rc = cache.insert_after_k_hits_cache(c, k=3)
         rc.put(1)
         self.assertFalse(c.has(1))
+        rc.put(1)
+        rc.put(1)
+        self.assertTrue(c.has(1))
         c.put(3)
-        self.assertFalse(rc.has(3))
+        self.assertTrue(rc.has(3))
 
     def test_naming(self):
         c = cache.insert_after_k_hits_cache(cache.FifoCache(3), k=3)
@@ -987,29 +1440,29 @@ class TestTtlCache(unittest.TestCase):
         c.put(3)
         curr_time = 1000
         dump = c.dump()
-        self.assertIn((1, np.infty), dump)
-        self.assertIn((2, np.infty), dump)
-        self.assertIn((3, np.infty), dump)
+        self.assertIn((1, np.inf), dump)
+        self.assertIn((2, np.inf), dump)
+        self.assertIn((3, np.inf), dump)
         c.put(1, ttl=100)
         curr_time = 2000
         dump = c.dump()
         self.assertEqual(len(dump), 3)
-        self.assertIn((1, np.infty), dump)
-        self.assertIn((2, np.infty), dump)
-        self.assertIn((3, np.infty), dump)
+        self.assertIn((1, np.inf), dump)
+        self.assertIn((2, np.inf), dump)
+        self.assertIn((3, np.inf), dump)
         c.put(4, ttl=200)
         dump = c.dump()
         self.assertEqual(len(dump), 4)
         self.assertEqual(dump[0], (4, 2200))
-        self.assertIn((1, np.infty), dump)
-        self.assertIn((2, np.infty), dump)
-        self.assertIn((3, np.infty), dump)
+        self.assertIn((1, np.inf), dump)
+        self.assertIn((2, np.inf), dump)
+        self.assertIn((3, np.inf), dump)
         curr_time = 3000
         dump = c.dump()
         self.assertEqual(len(dump), 3)
-        self.assertIn((1, np.infty), dump)
-        self.assertIn((2, np.infty), dump)
-        self.assertIn((3, np.infty), dump)
+        self.assertIn((1, np.inf), dump)
+        self.assertIn((2, np.inf), dump)
+        self.assertIn((3, np.inf), dump)
 
     def test_clear(self):
         curr_time = 1
@@ -1039,3 +1492,320 @@ class TestTtlCache(unittest.TestCase):
         self.assertFalse(c.has(1))
         c.put(3)
         self.assertFalse(ttl_c.has(3))
+
+    def test_heterogeneous_ttl(self):
+        curr_time = 0
+        f_time = lambda: curr_time
+        c = cache.ttl_cache(cache.LruCache(100), f_time)
+        rng = np.random.RandomState(0)
+        ttls = rng.randint(1, 50, size=60).tolist()
+        for k, ttl in enumerate(ttls):
+            c.put(k, ttl=ttl)
+        # Extending the TTL of an item keeps it in cache
+        c.put(0, ttl=100)
+        for curr_time in range(0, 60, 7):
+            dump = c.dump()
+            expected = {k: t for k, t in enumerate(ttls) if t >= curr_time}
+            expected[0] = 100
+            self.assertEqual(expected, dict(dump))
+            for k in range(len(ttls)):
+                self.assertEqual(k in expected, c.has(k))
+
+    def test_eviction_and_remove(self):
+        curr_time = 0
+        f_time = lambda: curr_time
+        c = cache.ttl_cache(cache.FifoCache(2), f_time)
+        c.put(1, ttl=5)
+        c.put(2, ttl=10)
+        self.assertEqual(1, c.put(3, ttl=1))
+        c.remove(2)
+        self.assertEqual([(3, 1)], c.dump())
+        c.put(1, ttl=8)
+        curr_time = 6
+        self.assertEqual([(1, 8)], c.dump())
+        self.assertTrue(c.get(1))
+        curr_time = 8
+        self.assertFalse(c.get(1))
+        self.assertEqual([], c.dump())
+
+
+class TestTtlKeyValCache(unittest.TestCase):
+
+    def test_put_get_expire(self):
+        curr_time = 0
+        f_time = lambda: curr_time
+        c = cache.ttl_keyval_cache(cache.LruCache(2), f_time)
+        self.assertIsNone(c.put(1, 'a', ttl=10))
+        self.assertIsNone(c.put(2, 'b'))
+        self.assertEqual('a', c.get(1))
+        self.assertEqual((2, 'b'), c.put(3, 'c', ttl=5))
+        self.assertEqual([(3, 'c', 5), (1, 'a', 10)], c.dump())
+        curr_time = 7
+        self.assertIsNone(c.get(3))
+        self.assertIsNone(c.value(3))
+        self.assertEqual([(1, 'a', 10)], c.dump())
+        self.assertEqual('a', c.remove(1))
+        self.assertIsNone(c.remove(1))
+        self.assertIsNone(c.put(4, 'd', expires=20))
+        curr_time = 30
+        self.assertEqual([], c.dump())
+        self.assertIsNone(c.value(4))
+        c.put(5, 'e', ttl=1)
+        c.clear()
+        self.assertEqual([], c.dump())
+
+
+class TestCacheWrapper(unittest.TestCase):
+
+    def test_pickle(self):
+        c = cache.InsertAfterKHitsCache(cache.LruCache(3), k=2, memory=4)
+        for k in (1, 2, 1, 3, 3):
+            c.put(k)
+        c2 = pickle.loads(pickle.dumps(c))
+        self.assertEqual(c.dump(), c2.dump())
+        self.assertEqual(c._metacache_hits, c2._metacache_hits)
+        c.put(2)
+        c2.put(2)
+        self.assertEqual(c.dump(), c2.dump())
+
+    def test_pickle_rand_insert(self):
+        c = cache.RandInsertCache(cache.FifoCache(100), 0.5, seed=1)
+        c2 = pickle.loads(pickle.dumps(c))
+        for k in range(50):
+            c.put(k)
+            c2.put(k)
+        self.assertEqual(c.dump(), c2.dump())
+
+    def test_stack(self):
+        c = cache.KeyValCache(cache.InsertAfterKHitsCache(cache.LruCache(2),
+                                                          k=2))
+        self.assertIsNone(c.put(1, 'a'))
+        self.assertIsNone(c.get(1))
+        c.put(1, 'b')
+        self.assertEqual('b', c.get(1))
+        self.assertEqual([(1, 'b')], c.dump())
+        self.assertEqual(2, c.maxlen)
+
+    def test_delegation(self):
+        c = cache.InsertAfterKHitsCache(cache.LruCache(3), k=1)
+        c.put(1)
+        c.put(2)
+        self.assertEqual(1, c.position(1))
+        self.assertTrue(c.do('GET', 2))
+        self.assertRaises(AttributeError, getattr, c, 'nonexistent')
+
+    def test_no_copy(self):
+        lru = cache.LruCache(3)
+        c = cache.InsertAfterKHitsCache(lru, k=1)
+        c.put(1)
+        self.assertTrue(lru.has(1))
+        self.assertIs(lru, c.cache)
+
+    def test_build_cache(self):
+        c = cache.build_cache(3, {'name': 'LRU', 'admission': 'K_HITS',
+                                  'admission_args': {'k': 3, 'memory': 10}})
+        self.assertIsInstance(c, cache.InsertAfterKHitsCache)
+        self.assertIsInstance(c.cache, cache.LruCache)
+        c.put(1)
+        c.put(1)
+        self.assertFalse(c.has(1))
+        c.put(1)
+        self.assertTrue(c.has(1))
+        c = cache.build_cache(3, {'name': 'SLRU', 'segments': 3})
+        self.assertIsInstance(c, cache.SegmentedLruCache)
+        c = cache.build_cache(3, {'name': 'FIFO', 'admission': 'RAND',
+                                  'admission_args': {'p': 0}})
+        c.put(1)
+        self.assertFalse(c.has(1))
+
+    def test_build_cache_args(self):
+        # Arguments with the same name configure either policy, not both
+        c = cache.build_cache(3, {'name': 'PERFECT_LFU', 'counter': 'SKETCH',
+                                  'seed': 1, 'admission': 'TINYLFU',
+                                  'admission_args': {'seed': 2}})
+        self.assertEqual(random.Random(1).randint(1, 2**31 - 2),
+                         c.cache._counter._sketch._hashes[0][0])
+        self.assertEqual(random.Random(2).randint(1, 2**31 - 2),
+                         c._sketch._hashes[0][0])
+        self.assertRaises(ValueError, cache.build_cache, 3,
+                          {'name': 'PERFECT_LFU', 'counter': 'SKETCH',
+                           'seed': 1, 'admission': 'TINYLFU'})
+        # Arguments of the admission policy only can be given at the top
+        # level
+        c = cache.build_cache(3, {'name': 'LRU', 'admission': 'K_HITS',
+                                  'k': 3})
+        self.assertIsInstance(c, cache.InsertAfterKHitsCache)
+        self.assertEqual(3, c._k)
+        c = cache.build_cache(3, {'name': 'LRU', 'admission': 'TINYLFU',
+                                  'seed': 2})
+        self.assertEqual(random.Random(2).randint(1, 2**31 - 2),
+                         c._sketch._hashes[0][0])
+        self.assertRaises(ValueError, cache.build_cache, 3,
+                          {'name': 'LRU', 'admission': 'K_HITS', 'k': 3,
+                           'admission_args': {'k': 2}})
+        self.assertRaises(ValueError, cache.build_cache, 3,
+                          {'name': 'LRU', 'admission_args': {'k': 3}})
+
+
+class TestBloomKHitsCache(unittest.TestCase):
+
+    def test_put_get(self):
+        c = cache.BloomKHitsCache(cache.LruCache(2), k=3, seed=0)
+        for _ in range(2):
+            c.put(1)
+            self.assertFalse(c.get(1))
+        c.put(1)
+        self.assertTrue(c.get(1))
+        c.put(2, force_insert=True)
+        self.assertTrue(c.get(2))
+        c.clear()
+        c.put(1)
+        self.assertFalse(c.has(1))
+
+    def test_fixed_memory(self):
+        c = cache.BloomKHitsCache(cache.LruCache(10), k=2, seed=0)
+        size = sum(len(row) for row in c._filter._table)
+        for k in range(10000):
+            c.put(k)
+        self.assertEqual(size, sum(len(row) for row in c._filter._table))
+        self.assertLessEqual(len(c), 10)
+
+
+class TestTinyLfuCache(unittest.TestCase):
+
+    def test_reject_one_timers(self):
+        c = cache.TinyLfuCache(cache.LruCache(3), sample_size=1000, seed=0)
+        for _ in range(5):
+            for k in (1, 2, 3):
+                if not c.get(k):
+                    c.put(k)
+        for k in range(10, 20):
+            self.assertFalse(c.get(k))
+            self.assertIsNone(c.put(k))
+        self.assertEqual({1, 2, 3}, set(c.dump()))
+
+    def test_admit_popular(self):
+        c = cache.TinyLfuCache(cache.FifoCache(2), sample_size=1000, seed=0)
+        c.get(1)
+        c.put(1)
+        c.get(2)
+        c.put(2)
+        for _ in range(3):
+            c.get(3)
+        self.assertEqual(1, c.put(3))
+        self.assertEqual({2, 3}, set(c.dump()))
+
+    def test_reject_ties(self):
+        c = cache.TinyLfuCache(cache.LruCache(2), sample_size=1000, seed=0)
+        for k in ('a', 'b', 'c'):
+            c.get(k)
+            c.put(k)
+        self.assertEqual(c.frequency('a'), c.frequency('c'))
+        self.assertEqual({'a', 'b'}, set(c.dump()))
+
+    def test_aging(self):
+        c = cache.TinyLfuCache(cache.LruCache(2), sample_size=4, seed=0)
+        for _ in range(3):
+            c.get(1)
+        self.assertEqual(3, c.frequency(1))
+        c.get(2)
+        self.assertEqual(1, c.frequency(1))
+
+    def test_reject_unchanged(self):
+        for name in ('LRU', 'SLRU', 'CLIMB', 'PERFECT_LFU', 'IN_CACHE_LFU'):
+            c = cache.TinyLfuCache(CACHE_POLICY[name](3), sample_size=1000,
+                                   seed=0)
+            for k in 4 * (1, 2, 3, 4):
+                if not c.get(k):
+                    c.put(k)
+            self.assertFalse(c.get(9))
+            self.assertIsNotNone(c.victim(9))
+            dump = c.dump()
+            freqs = [c.frequency(k) for k in dump]
+            c.put(9)
+            self.assertFalse(c.has(9))
+            self.assertEqual(dump, c.dump())
+            self.assertEqual(freqs, [c.frequency(k) for k in dump])
+
+    def test_build_cache_pickle(self):
+        c = cache.build_cache(4, {'name': 'LRU', 'admission': 'TINYLFU',
+                                  'admission_args': {'seed': 1}})
+        self.assertIsInstance(c, cache.TinyLfuCache)
+        for k in (1, 1, 2, 3):
+            if not c.get(k):
+                c.put(k)
+        c2 = pickle.loads(pickle.dumps(c))
+        self.assertEqual(c.dump(), c2.dump())
+        self.assertEqual(c.frequency(1), c2.frequency(1))
+
+
+class TestCountMinSketch(unittest.TestCase):
+
+    def test_estimates(self):
+        sketch = cache.CountMinSketch(64, depth=3, seed=0)
+        counts = collections.Counter((np.random.RandomState(0).zipf(1.3, 2000)
+                                      % 300).tolist())
+        for k, n in counts.items():
+            for _ in range(n):
+                sketch.add(k)
+        for k, n in counts.items():
+            self.assertGreaterEqual(sketch.estimate(k), n)
+        sketch.clear()
+        self.assertEqual(0, sketch.estimate(1))
+
+    def test_exact_without_collisions(self):
+        sketch = cache.CountMinSketch(2**16, seed=0)
+        for i, k in enumerate(['x', 'y', 'z']):
+            for j in range(i + 1):
+                self.assertEqual(j + 1, sketch.add(k))
+        self.assertEqual([1, 2, 3], [sketch.estimate(k) for k in 'xyz'])
+        self.assertRaises(ValueError, cache.CountMinSketch, 0)
+
+    def test_contains(self):
+        sketch = cache.CountMinSketch(256, depth=3, seed=0)
+        for k in range(50):
+            sketch.add(k)
+        for k in range(50):
+            self.assertIn(k, sketch)
+        sketch.clear()
+        self.assertNotIn(1, sketch)
+
+    def test_age(self):
+        sketch = cache.CountMinSketch(2**12, max_count=15, seed=0)
+        for i, k in enumerate(['x', 'y', 'z']):
+            for j in range(2 * (i + 1)):
+                self.assertEqual(j + 1, sketch.add(k))
+        self.assertEqual([2, 4, 6], [sketch.estimate(k) for k in 'xyz'])
+        sketch.age()
+        self.assertEqual([1, 2, 3], [sketch.estimate(k) for k in 'xyz'])
+
+    def test_window(self):
+        sketch = cache.CountMinSketch(256, window=8, seed=0)
+        for _ in range(6):
+            sketch.add('a')
+        self.assertEqual(6, sketch.estimate('a'))
+        sketch.add('b')
+        sketch.add('b')
+        self.assertEqual(3, sketch.estimate('a'))
+        self.assertEqual(1, sketch.estimate('b'))
+        self.assertRaises(ValueError, cache.CountMinSketch, 64, window=0)
+
+    def test_saturation(self):
+        sketch = cache.CountMinSketch(64, max_count=3, seed=0)
+        self.assertEqual([1, 2, 3, 3], [sketch.add('a') for _ in range(4)])
+        self.assertRaises(ValueError, cache.CountMinSketch, 64,
+                          max_count=256)
+
+    def test_stable_hash(self):
+        # String hashes are randomized, so the columns of an item must not
+        # depend on the process
+        code = ('import icarus.models as cache; '
+                'print(cache.CountMinSketch(2**20, seed=0)._indices("x"))')
+        columns = set()
+        for hash_seed in ('1', '2'):
+            env = dict(os.environ, PYTHONHASHSEED=hash_seed)
+            columns.add(subprocess.check_output([sys.executable, '-c', code],
+                                                env=env))
+        self.assertEqual(1, len(columns))
+        sketch = cache.CountMinSketch(2**20, seed=0)
+        self.assertEqual(sketch._indices(3), sketch._indices(np.int64(3)))
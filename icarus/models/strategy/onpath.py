@@ -5,7 +5,7 @@ import random
 import networkx as nx
 
 from icarus.registry import register_strategy
-from icarus.util import inheritdoc, path_links
+from icarus.util import inheritdoc
 
 from .base import Strategy
 
@@ -86,11 +86,11 @@ class Edge(Strategy):
     def process_event(self, time, receiver, content, log):
         # get all required data
         source = self.view.content_source(content)
-        path = self.view.shortest_path(receiver, source)
+        path = self.view.path_info(receiver, source)
         # Route requests to original source and queries caches on the path
         self.controller.start_session(time, receiver, content, log)
         edge_cache = None
-        for u, v in path_links(path):
+        for u, v in path.links:
             self.controller.forward_request_hop(u, v)
             if self.view.has_cache(v):
                 edge_cache = v
@@ -108,7 +108,7 @@ class Edge(Strategy):
             serving_node = v
 
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
+        path = self.view.path_info(receiver, serving_node).reverse
         self.controller.forward_content_path(serving_node, receiver, path)
         if serving_node == source:
             self.controller.put_content(edge_cache)
@@ -131,10 +131,10 @@ class LeaveCopyEverywhere(Strategy):
     def process_event(self, time, receiver, content, log):
         # get all required data
         source = self.view.content_source(content)
-        path = self.view.shortest_path(receiver, source)
+        path = self.view.path_info(receiver, source)
         # Route requests to original source and queries caches on the path
         self.controller.start_session(time, receiver, content, log)
-        for u, v in path_links(path):
+        for u, v in path.links:
             self.controller.forward_request_hop(u, v)
             if self.view.has_cache(v):
                 if self.controller.get_content(v):
@@ -144,12 +144,12 @@ class LeaveCopyEverywhere(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
-        for u, v in path_links(path):
-            self.controller.forward_content_hop(u, v)
-            if self.view.has_cache(v):
+        path = self.view.path_info(receiver, serving_node).reverse
+        self.controller.forward_content_path(serving_node, receiver, path)
+        for i in path.caches:
+            if i > 0:
                 # insert content
-                self.controller.put_content(v)
+                self.controller.put_content(path.nodes[i])
         self.controller.end_session()
 
 
@@ -176,10 +176,10 @@ class LeaveCopyDown(Strategy):
     def process_event(self, time, receiver, content, log):
         # get all required data
         source = self.view.content_source(content)
-        path = self.view.shortest_path(receiver, source)
+        path = self.view.path_info(receiver, source)
         # Route requests to original source and queries caches on the path
         self.controller.start_session(time, receiver, content, log)
-        for u, v in path_links(path):
+        for u, v in path.links:
             self.controller.forward_request_hop(u, v)
             if self.view.has_cache(v):
                 if self.controller.get_content(v):
@@ -190,15 +190,14 @@ class LeaveCopyDown(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
+        path = self.view.path_info(receiver, serving_node).reverse
         # Leave a copy of the content only in the cache one level down the hit
         # caching node
-        copied = False
-        for u, v in path_links(path):
-            self.controller.forward_content_hop(u, v)
-            if not copied and v != receiver and self.view.has_cache(v):
-                self.controller.put_content(v)
-                copied = True
+        self.controller.forward_content_path(serving_node, receiver, path)
+        for i in path.caches:
+            if 0 < i < path.hops:
+                self.controller.put_content(path.nodes[i])
+                break
         self.controller.end_session()
 
 
@@ -236,12 +235,10 @@ class ProbCache(Strategy):
     def process_event(self, time, receiver, content, log):
         # get all required data
         source = self.view.content_source(content)
-        path = self.view.shortest_path(receiver, source)
+        path = self.view.path_info(receiver, source)
         # Route requests to original source and queries caches on the path
         self.controller.start_session(time, receiver, content, log)
-        for hop in range(1, len(path)):
-            u = path[hop - 1]
-            v = path[hop]
+        for u, v in path.links:
             self.controller.forward_request_hop(u, v)
             if self.view.has_cache(v):
                 if self.controller.get_content(v):
@@ -252,14 +249,12 @@ class ProbCache(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
-        c = len([v for v in path if self.view.has_cache(v)])
+        path = self.view.path_info(receiver, serving_node).reverse
+        c = len(path.caches)
         x = 0.0
-        for hop in range(1, len(path)):
-            u = path[hop - 1]
-            v = path[hop]
-            N = sum([self.cache_size[n] for n in path[hop - 1:]
-                     if n in self.cache_size])
+        # Caching space available on the path from the current node onwards
+        N = sum(self.cache_size[n] for n in path.nodes if n in self.cache_size)
+        for u, v in path.links:
             if v in self.cache_size:
                 x += 1
             self.controller.forward_content_hop(u, v)
@@ -269,6 +264,8 @@ class ProbCache(Strategy):
                 prob_cache = float(N) / (self.t_tw * self.cache_size[v]) * (x / c) ** c
                 if random.random() < prob_cache:
                     self.controller.put_content(v)
+            if u in self.cache_size:
+                N -= self.cache_size[u]
         self.controller.end_session()
 
 
@@ -303,10 +300,10 @@ class CacheLessForMore(Strategy):
     def process_event(self, time, receiver, content, log):
         # get all required data
         source = self.view.content_source(content)
-        path = self.view.shortest_path(receiver, source)
+        path = self.view.path_info(receiver, source)
         # Route requests to original source and queries caches on the path
         self.controller.start_session(time, receiver, content, log)
-        for u, v in path_links(path):
+        for u, v in path.links:
             self.controller.forward_request_hop(u, v)
             if self.view.has_cache(v):
                 if self.controller.get_content(v):
@@ -317,22 +314,21 @@ class CacheLessForMore(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
+        path = self.view.path_info(receiver, serving_node).reverse
         # get the cache with maximum betweenness centrality
         # if there are more than one cache with max betw then pick the one
         # closer to the receiver
         max_betw = -1
         designated_cache = None
-        for v in path[1:]:
-            if self.view.has_cache(v):
-                if self.betw[v] >= max_betw:
-                    max_betw = self.betw[v]
-                    designated_cache = v
+        for i in path.caches:
+            v = path.nodes[i]
+            if i > 0 and self.betw[v] >= max_betw:
+                max_betw = self.betw[v]
+                designated_cache = v
         # Forward content
-        for u, v in path_links(path):
-            self.controller.forward_content_hop(u, v)
-            if v == designated_cache:
-                self.controller.put_content(v)
+        self.controller.forward_content_path(serving_node, receiver, path)
+        if designated_cache is not None:
+            self.controller.put_content(designated_cache)
         self.controller.end_session()
 
 
@@ -353,10 +349,10 @@ class RandomBernoulli(Strategy):
     def process_event(self, time, receiver, content, log):
         # get all required data
         source = self.view.content_source(content)
-        path = self.view.shortest_path(receiver, source)
+        path = self.view.path_info(receiver, source)
         # Route requests to original source and queries caches on the path
         self.controller.start_session(time, receiver, content, log)
-        for u, v in path_links(path):
+        for u, v in path.links:
             self.controller.forward_request_hop(u, v)
             if self.view.has_cache(v):
                 if self.controller.get_content(v):
@@ -367,12 +363,11 @@ class RandomBernoulli(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
-        for u, v in path_links(path):
-            self.controller.forward_content_hop(u, v)
-            if v != receiver and self.view.has_cache(v):
-                if random.random() < self.p:
-                    self.controller.put_content(v)
+        path = self.view.path_info(receiver, serving_node).reverse
+        self.controller.forward_content_path(serving_node, receiver, path)
+        for i in path.caches:
+            if 0 < i < path.hops and random.random() < self.p:
+                self.controller.put_content(path.nodes[i])
         self.controller.end_session()
 
 @register_strategy('RAND_CHOICE')
@@ -391,10 +386,10 @@ class RandomChoice(Strategy):
     def process_event(self, time, receiver, content, log):
         # get all required data
         source = self.view.content_source(content)
-        path = self.view.shortest_path(receiver, source)
+        path = self.view.path_info(receiver, source)
         # Route requests to original source and queries caches on the path
         self.controller.start_session(time, receiver, content, log)
-        for u, v in path_links(path):
+        for u, v in path.links:
             self.controller.forward_request_hop(u, v)
             if self.view.has_cache(v):
                 if self.controller.get_content(v):
@@ -405,11 +400,10 @@ class RandomChoice(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
-        caches = [v for v in path[1:-1] if self.view.has_cache(v)]
+        path = self.view.path_info(receiver, serving_node).reverse
+        caches = [path.nodes[i] for i in path.caches if 0 < i < path.hops]
         designated_cache = random.choice(caches) if len(caches) > 0 else None
-        for u, v in path_links(path):
-            self.controller.forward_content_hop(u, v)
-            if v == designated_cache:
-                self.controller.put_content(v)
+        self.controller.forward_content_path(serving_node, receiver, path)
+        if designated_cache is not None:
+            self.controller.put_content(designated_cache)
         self.controller.end_session()
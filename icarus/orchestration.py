@@ -4,6 +4,7 @@ The orchestrator is responsible for scheduling experiments specified in the
 user-provided settings.
 """
 from __future__ import division
+import os
 import time
 import collections
 import multiprocessing as mp
@@ -12,15 +13,26 @@ import copy
 import sys
 import signal
 import traceback
+import tempfile
+import shutil
+import pickle
 
-from icarus.execution import exec_experiment
+import numpy as np
+
+from icarus.execution import exec_experiment, ArrayPathStore
 from icarus.registry import TOPOLOGY_FACTORY, CACHE_PLACEMENT, CONTENT_PLACEMENT, \
-                            CACHE_POLICY, WORKLOAD, DATA_COLLECTOR, STRATEGY
+                            CACHE_POLICY, CACHE_ADMISSION, WORKLOAD, \
+                            DATA_COLLECTOR, STRATEGY
 from icarus.results import ResultSet
-from icarus.util import SequenceNumber, timestr
+from icarus.util import SequenceNumber, Tree, timestr
 
 
-__all__ = ['Orchestrator', 'run_scenario']
+__all__ = [
+    'Orchestrator',
+    'run_scenario',
+    'write_path_tables',
+    'load_path_table'
+           ]
 
 
 logger = logging.getLogger('orchestration')
@@ -72,6 +84,24 @@ class Orchestrator(object):
         """
         # Create queue of experiment configurations
         queue = collections.deque(self.settings.EXPERIMENT_QUEUE)
+        # Compute shortest paths of each topology once and share them with
+        # all experiments through memory-mapped files
+        path_tables = None
+        path_tables_dir = None
+        if 'SHARED_PATH_TABLES' in self.settings and \
+                self.settings.SHARED_PATH_TABLES:
+            path_tables_dir = tempfile.mkdtemp(prefix='icarus-paths-')
+            path_tables = write_path_tables(queue, path_tables_dir)
+            logger.info('Computed shortest paths of %d topologies'
+                        % len(path_tables))
+        try:
+            self._run(queue, path_tables)
+        finally:
+            if path_tables_dir is not None:
+                shutil.rmtree(path_tables_dir, ignore_errors=True)
+
+    def _run(self, queue, path_tables):
+        """Run all experiments of the queue"""
         # Calculate number of experiments and number of processes
         self.n_exp = len(queue) * self.settings.N_REPLICATIONS
         self.n_proc = self.settings.N_PROCESSES \
@@ -98,7 +128,7 @@ class Orchestrator(object):
                 for _ in range(self.settings.N_REPLICATIONS):
                     job_queue.append(self.pool.apply_async(run_scenario,
                             args=(self.settings, experiment,
-                                  self.seq.assign(), self.n_exp),
+                                  self.seq.assign(), self.n_exp, path_tables),
                             **callbacks))
             self.pool.close()
             # This solution is probably not optimal, but at least makes
@@ -123,7 +153,7 @@ class Orchestrator(object):
                 for _ in range(self.settings.N_REPLICATIONS):
                     self.experiment_callback(run_scenario(self.settings,
                                             experiment, self.seq.assign(),
-                                            self.n_exp))
+                                            self.n_exp, path_tables))
                     if self._stop:
                         self.stop()
 
@@ -171,7 +201,93 @@ class Orchestrator(object):
             logger.info('SUMMARY | Completed: %d, Failed: %d, Scheduled: %d, ETA: %s',
                         self.n_success, self.n_fail, n_scheduled, eta)
 
-def run_scenario(settings, params, curr_exp, n_exp):
+def _topology_key(topology_spec):
+    """Return a string uniquely identifying a topology specification"""
+    return repr(sorted(Tree(topology_spec)))
+
+
+def _link_array(topology, nodes):
+    """Return an array of the links of a topology as (u, v, weight) rows,
+    where u and v are indices of nodes in *nodes*"""
+    index = {v: i for i, v in enumerate(nodes)}
+    return np.array([(index[u], index[v], w) for u, v, w
+                     in topology.edges(data='weight', default=1)],
+                    dtype=np.float64).reshape(-1, 3)
+
+
+def write_path_tables(experiments, directory):
+    """Compute the shortest paths of all topologies of a set of experiments
+    and save them in a directory.
+
+    Shortest paths of each distinct topology specification are saved as the
+    predecessor matrix of an :class:`icarus.execution.ArrayPathStore`,
+    together with the node index and the weighted links of the topology,
+    which are used to check that workers build the same topology. Experiments
+    whose *netconf* explicitly requests the 'DICT' path store are skipped.
+
+    Parameters
+    ----------
+    experiments : iterable of Tree
+        The experiment parameters trees
+    directory : str
+        The directory where path tables are saved
+
+    Returns
+    -------
+    path_tables : dict
+        Dictionary mapping the key of each topology specification to the
+        directory storing its path table
+    """
+    path_tables = {}
+    for experiment in experiments:
+        if 'netconf' in experiment and \
+                experiment['netconf'].get('path_store', 'ARRAY') != 'ARRAY':
+            continue
+        topology_spec = copy.deepcopy(experiment['topology'])
+        key = _topology_key(topology_spec)
+        if key in path_tables:
+            continue
+        topology_name = topology_spec.pop('name')
+        topology = TOPOLOGY_FACTORY[topology_name](**topology_spec)
+        store = ArrayPathStore(topology)
+        path = os.path.join(directory, str(len(path_tables)))
+        os.makedirs(path)
+        np.save(os.path.join(path, 'predecessors.npy'), store.predecessors)
+        np.save(os.path.join(path, 'links.npy'), _link_array(topology, store.nodes))
+        with open(os.path.join(path, 'nodes.pickle'), 'wb') as f:
+            pickle.dump(store.nodes, f, protocol=pickle.HIGHEST_PROTOCOL)
+        path_tables[key] = path
+    return path_tables
+
+
+def load_path_table(directory, topology):
+    """Load a path table saved by :func:`write_path_tables`
+
+    Parameters
+    ----------
+    directory : str
+        The directory storing the path table
+    topology : Topology
+        The topology to which the path table refers
+
+    Returns
+    -------
+    predecessors : numpy.memmap
+        The read-only memory-mapped predecessor matrix or None if the saved
+        nodes or links differ from those of the topology, e.g. because the
+        topology factory is not deterministic
+    """
+    with open(os.path.join(directory, 'nodes.pickle'), 'rb') as f:
+        nodes = pickle.load(f)
+    if nodes != list(topology.nodes()):
+        return None
+    links = np.load(os.path.join(directory, 'links.npy'))
+    if not np.array_equal(links, _link_array(topology, nodes)):
+        return None
+    return np.load(os.path.join(directory, 'predecessors.npy'), mmap_mode='r')
+
+
+def run_scenario(settings, params, curr_exp, n_exp, path_tables=None):
     """Run a single scenario experiment
 
     Parameters
@@ -184,6 +300,9 @@ def run_scenario(settings, params, curr_exp, n_exp):
         sequence number of the experiment
     n_exp : int
         Number of scheduled experiments
+    path_tables : dict, optional
+        Dictionary mapping topology specifications to the path tables computed
+        by :func:`write_path_tables`
 
     Returns
     -------
@@ -207,6 +326,7 @@ def run_scenario(settings, params, curr_exp, n_exp):
 
         # Set topology
         topology_spec = tree['topology']
+        topology_key = _topology_key(topology_spec)
         topology_name = topology_spec.pop('name')
         if topology_name not in TOPOLOGY_FACTORY:
             logger.error('No topology factory implementation for %s was found.'
@@ -259,9 +379,35 @@ def run_scenario(settings, params, curr_exp, n_exp):
         if cache_policy['name'] not in CACHE_POLICY:
             logger.error('No implementation of cache policy %s was found.' % cache_policy['name'])
             return None
+        if 'admission' in cache_policy and \
+                cache_policy['admission'] not in CACHE_ADMISSION:
+            logger.error('No implementation of cache admission policy %s was found.'
+                         % cache_policy['admission'])
+            return None
 
         # Configuration parameters of network model
         netconf = tree['netconf']
+        if path_tables and topology_key in path_tables and \
+                netconf.get('path_store', 'ARRAY') == 'ARRAY':
+            predecessors = load_path_table(path_tables[topology_key], topology)
+            if predecessors is not None:
+                netconf['path_store'] = 'ARRAY'
+                netconf['path_predecessors'] = predecessors
+            else:
+                logger.warning('Experiment %d/%d | Topology differs from the '
+                               'one of the shared path table. Computing '
+                               'paths locally', curr_exp, n_exp)
+
+        # Topology changes (e.g. link and node failures) scheduled during
+        # the experiment
+        topology_events = tree['topology_events'] \
+                          if 'topology_events' in tree else None
+
+        # Initialization of caches with their expected steady-state contents
+        warm_start = tree['warm_start'] if 'warm_start' in tree else None
+
+        # Detection of the end of the warmup phase and of the measured phase
+        convergence = tree['convergence'] if 'convergence' in tree else None
 
         # Text description of the scenario run to print on screen
         scenario = tree['desc'] if 'desc' in tree else "Description N/A"
@@ -275,7 +421,11 @@ def run_scenario(settings, params, curr_exp, n_exp):
         collectors = {m: {} for m in metrics}
 
         logger.info('Experiment %d/%d | Start simulation', curr_exp, n_exp)
-        results = exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors)
+        results = exec_experiment(topology, workload, netconf, strategy,
+                                  cache_policy, collectors,
+                                  topology_events=topology_events,
+                                  warm_start=warm_start,
+                                  convergence=convergence)
 
         duration = time.time() - start_time
         logger.info('Experiment %d/%d | End simulation | Duration %s.',
@@ -3,6 +3,9 @@
 # Dictionary storying all cache policy implementations keyed by ID
 CACHE_POLICY = {}
 
+# Dictionary storying all cache admission policy wrappers keyed by ID
+CACHE_ADMISSION = {}
+
 # Dictionary storying all strategy implementations keyed by ID
 STRATEGY = {}
 
@@ -58,6 +61,7 @@ def register_decorator(register):
 
 
 register_cache_policy = register_decorator(CACHE_POLICY)
+register_cache_admission = register_decorator(CACHE_ADMISSION)
 register_strategy = register_decorator(STRATEGY)
 register_topology_factory = register_decorator(TOPOLOGY_FACTORY)
 register_cache_placement = register_decorator(CACHE_PLACEMENT)
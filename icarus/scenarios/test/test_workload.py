@@ -1,6 +1,146 @@
 import unittest
+import shutil
+import tempfile
 
 import icarus.scenarios as workload
+from icarus.scenarios import topology_tree
+from icarus.tools import write_binary_trace
+
+
+class TestEvent(unittest.TestCase):
+
+    def test_access(self):
+        event = workload.Event(3, 'content', True)
+        receiver, content, log = event
+        self.assertEqual((3, 'content', True), (receiver, content, log))
+        self.assertEqual(3, event['receiver'])
+        self.assertEqual('content', event[1])
+        self.assertTrue(event.log)
+        self.assertRaises(KeyError, event.__getitem__, 'size')
+        self.assertEqual({'receiver': 3, 'content': 'content', 'log': True},
+                         dict(**event))
+
+
+class TestStationaryWorkload(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.topology = topology_tree(2, 3)
+        cls.receivers = set(v for v in cls.topology.nodes()
+                            if cls.topology.node[v]['stack'][0] == 'receiver')
+
+    def check_events(self, events, n_contents, n_warmup, n_measured):
+        self.assertEqual(len(events), n_warmup + n_measured)
+        t_prev = 0.0
+        for i, (t, event) in enumerate(events):
+            self.assertGreater(t, t_prev)
+            t_prev = t
+            self.assertIn(event['receiver'], self.receivers)
+            self.assertIn(event['content'], range(1, n_contents + 1))
+            self.assertEqual(event['log'], i >= n_warmup)
+
+    def test_events(self):
+        events = list(workload.StationaryWorkload(self.topology, 20, 0.8,
+                                                  n_warmup=10, n_measured=30))
+        self.check_events(events, 20, 10, 30)
+
+    def test_batch_events(self):
+        events = list(workload.StationaryWorkload(self.topology, 20, 0.8,
+                                                  n_warmup=10, n_measured=30,
+                                                  batch_size=7))
+        self.check_events(events, 20, 10, 30)
+
+    def test_beta(self):
+        for batch_size in (None, 64):
+            w = workload.StationaryWorkload(self.topology, 20, 0.8, beta=1.2,
+                                            n_warmup=10, n_measured=30,
+                                            seed=1, batch_size=batch_size)
+            self.assertEqual(self.receivers, set(w.receivers))
+            events = list(w)
+            self.check_events(events, 20, 10, 30)
+            self.assertEqual(events, list(w))
+
+    def test_batch_seed(self):
+        def events(batch_size):
+            return list(workload.StationaryWorkload(self.topology, 100, 0.8,
+                                                    n_warmup=50, n_measured=200,
+                                                    seed=3, batch_size=batch_size))
+        # The sequence of events only depends on the seed and not on the
+        # size of the blocks
+        self.assertEqual(events(64), events(64))
+        self.assertEqual([e for _, e in events(64)],
+                         [e for _, e in events(1000)])
+        for (t_1, _), (t_2, _) in zip(events(64), events(1000)):
+            self.assertAlmostEqual(t_1, t_2)
+
+    def test_replay(self):
+        for seed in (None, 3):
+            for batch_size in (None, 64):
+                w = workload.StationaryWorkload(self.topology, 100, 0.8,
+                                                n_warmup=50, n_measured=200,
+                                                seed=seed,
+                                                batch_size=batch_size)
+                self.assertEqual(list(w), list(w))
+
+    def test_batch_size_not_positive(self):
+        self.assertRaises(ValueError, workload.StationaryWorkload,
+                          self.topology, 20, 0.8, batch_size=0)
+
+
+class TestBinaryTraceDrivenWorkload(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.topology = topology_tree(2, 3)
+        cls.receivers = set(v for v in cls.topology.nodes()
+                            if cls.topology.node[v]['stack'][0] == 'receiver')
+        cls.trace = ['a', 'b', 'a', 'c', 'd', 'a', 'b', 'e', 'a', 'c']
+
+    def setUp(self):
+        self.trace_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.trace_dir)
+
+    def test_events(self):
+        write_binary_trace(self.trace_dir, self.trace)
+        events = list(workload.BinaryTraceDrivenWorkload(
+                            self.topology, self.trace_dir, 3, 5, batch_size=2))
+        self.assertEqual(len(events), 8)
+        self.assertEqual([e['content'] for _, e in events],
+                         [0, 1, 0, 2, 3, 0, 1, 4])
+        self.assertEqual([e['log'] for _, e in events], 3 * [False] + 5 * [True])
+        t_prev = 0.0
+        for t, event in events:
+            self.assertGreater(t, t_prev)
+            t_prev = t
+            self.assertIn(event['receiver'], self.receivers)
+
+    def test_contents(self):
+        write_binary_trace(self.trace_dir, self.trace)
+        wl = workload.BinaryTraceDrivenWorkload(self.topology, self.trace_dir, 3, 5)
+        self.assertEqual(list(wl.contents), [0, 1, 2, 3, 4])
+
+    def test_timestamps(self):
+        timestamps = [10.0 + i for i in range(len(self.trace))]
+        write_binary_trace(self.trace_dir, zip(timestamps, self.trace),
+                           timestamps=True)
+        events = list(workload.BinaryTraceDrivenWorkload(
+                            self.topology, self.trace_dir, 2, 4, batch_size=3))
+        self.assertEqual([t for t, _ in events], [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+
+    def test_seed(self):
+        write_binary_trace(self.trace_dir, self.trace)
+        def events(batch_size):
+            return list(workload.BinaryTraceDrivenWorkload(
+                        self.topology, self.trace_dir, 2, 8, seed=1,
+                        batch_size=batch_size))
+        self.assertEqual([e for _, e in events(3)], [e for _, e in events(100)])
+
+    def test_not_enough_requests(self):
+        write_binary_trace(self.trace_dir, self.trace)
+        self.assertRaises(ValueError, workload.BinaryTraceDrivenWorkload,
+                          self.topology, self.trace_dir, 5, 6)
 
 
 class TestYCBS(unittest.TestCase):
@@ -6,33 +6,64 @@ initialized, with values taken from the configuration file) and an `__iter__`
 method that is called to return a new event.
 
 Each call to the `__iter__` method must return a 2-tuple in which the first
-element is the timestamp at which the event occurs and the second is a
-dictionary, describing the event, which must contain at least the three
-following attributes:
+element is the timestamp at which the event occurs and the second describes
+the event. The event is either an `Event` tuple or a dictionary, which must
+contain at least the three following attributes:
  * receiver: The name of the node issuing the request
  * content: The name of the content for which the request is issued
  * log: A boolean value indicating whether this request should be logged or not
    for measurement purposes.
+`Event` tuples are handed to strategies without building keyword arguments
+and are therefore faster to process. Dictionaries are still supported for
+compatibility with existing workloads.
 
 Each workload must expose the `contents` attribute which is an iterable of
 all content identifiers. This is needed for content placement.
 """
 import random
 import csv
+import collections
 
+import numpy as np
 import networkx as nx
 
-from icarus.tools import TruncatedZipfDist
+from icarus.tools import TruncatedZipfDist, read_binary_trace
 from icarus.registry import register_workload
 
 __all__ = [
+        'Event',
         'StationaryWorkload',
         'GlobetraffWorkload',
         'TraceDrivenWorkload',
+        'BinaryTraceDrivenWorkload',
         'YCSBWorkload'
            ]
 
 
+class Event(collections.namedtuple('Event', ['receiver', 'content', 'log'])):
+    """Request event generated by a workload.
+
+    It is a (receiver, content, log) tuple whose elements are passed
+    positionally to the *process_event* method of strategies. Its attributes
+    can also be read by key, e.g. *event['content']*, as for events described
+    by dictionaries.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        """Return the names of the attributes of the event"""
+        return self._fields
+
+
 @register_workload('STATIONARY')
 class StationaryWorkload(object):
     """This function generates events on the fly, i.e. instead of creating an
@@ -74,37 +105,69 @@ class StationaryWorkload(object):
         not logged)
     n_measured : int, optional
         The number of logged requests after the warmup
+    seed : int, optional
+        The seed for the random generator. Every iteration over the workload
+        restarts from it and therefore yields the same events
+    batch_size : int, optional
+        If specified, inter-arrival times, receivers and content identifiers
+        are drawn with NumPy in blocks of *batch_size* events rather than one
+        event at a time. This is considerably faster for long workloads.
+        Block generation uses its own random generator, seeded with *seed*,
+        and therefore yields a different (but equally reproducible) sequence
+        of events than the default per-event generation.
 
     Returns
     -------
     events : iterator
         Iterator of events. Each event is a 2-tuple where the first element is
-        the timestamp at which the event occurs and the second element is a
-        dictionary of event attributes.
+        the timestamp at which the event occurs and the second element is an
+        :class:`Event` tuple of event attributes.
     """
     def __init__(self, topology, n_contents, alpha, beta=0, rate=1.0,
-                    n_warmup=10 ** 5, n_measured=4 * 10 ** 5, seed=None, **kwargs):
+                    n_warmup=10 ** 5, n_measured=4 * 10 ** 5, seed=None,
+                    batch_size=None, **kwargs):
         if alpha < 0:
             raise ValueError('alpha must be positive')
         if beta < 0:
             raise ValueError('beta must be positive')
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError('batch_size must be positive')
         self.receivers = [v for v in topology.nodes()
                      if topology.node[v]['stack'][0] == 'receiver']
-        self.zipf = TruncatedZipfDist(alpha, n_contents)
+        # Content identifiers, receivers and inter-arrival times are drawn
+        # from independent random streams derived from the seed
+        self._content_seed, self._receiver_seed, self._t_seed = \
+                np.random.SeedSequence(seed).spawn(3)
+        self.zipf = TruncatedZipfDist(alpha, n_contents, seed=self._content_seed)
         self.n_contents = n_contents
         self.contents = range(1, n_contents + 1)
         self.alpha = alpha
         self.rate = rate
         self.n_warmup = n_warmup
         self.n_measured = n_measured
+        self.batch_size = batch_size
         random.seed(seed)
+        self._random_state = random.getstate()
         self.beta = beta
         if beta != 0:
-            degree = nx.degree(self.topology)
-            self.receivers = sorted(self.receivers, key=lambda x: degree[iter(topology.adj[x]).next()], reverse=True)
-            self.receiver_dist = TruncatedZipfDist(beta, len(self.receivers))
+            degree = nx.degree(topology)
+            self.receivers = sorted(self.receivers, key=lambda x:
+                                    degree[next(iter(topology.adj[x]))],
+                                    reverse=True)
+            self.receiver_dist = TruncatedZipfDist(beta, len(self.receivers),
+                                                   seed=self._receiver_seed)
 
     def __iter__(self):
+        # All random streams restart from the seed, so that iterating again
+        # over the workload yields the same events
+        random.setstate(self._random_state)
+        self.zipf.reseed(self._content_seed)
+        if self.beta != 0:
+            self.receiver_dist.reseed(self._receiver_seed)
+        if self.batch_size is not None:
+            for event in self._iter_batches():
+                yield event
+            return
         req_counter = 0
         t_event = 0.0
         while req_counter < self.n_warmup + self.n_measured:
@@ -115,10 +178,42 @@ class StationaryWorkload(object):
                 receiver = self.receivers[self.receiver_dist.rv() - 1]
             content = int(self.zipf.rv())
             log = (req_counter >= self.n_warmup)
-            event = {'receiver': receiver, 'content': content, 'log': log}
+            event = Event(receiver, content, log)
             yield (t_event, event)
             req_counter += 1
-        raise StopIteration()
+
+    def _iter_batches(self):
+        """Generate events drawing all random values in blocks of
+        *batch_size* events.
+
+        Inter-arrival times, receiver indices and content identifiers of a
+        block are drawn with single vectorized calls and converted to Python
+        objects all at once, so that the per-event work is reduced to creating
+        the event tuple.
+        """
+        # Independent streams for each quantity make the sequence of events
+        # depend only on the seed and not on the size of the blocks
+        t_rng = np.random.default_rng(self._t_seed)
+        receiver_rng = np.random.default_rng(self._receiver_seed)
+        n_requests = self.n_warmup + self.n_measured
+        req_counter = 0
+        t_event = 0.0
+        while req_counter < n_requests:
+            n = min(self.batch_size, n_requests - req_counter)
+            t_events = t_event + np.cumsum(t_rng.exponential(1.0 / self.rate, n))
+            if self.beta == 0:
+                receiver_idx = receiver_rng.integers(len(self.receivers), size=n)
+            else:
+                receiver_idx = self.receiver_dist.rv(n) - 1
+            contents = self.zipf.rv(n)
+            receivers = self.receivers
+            for t, r, content in zip(t_events.tolist(), receiver_idx.tolist(),
+                                     contents.tolist()):
+                log = (req_counter >= self.n_warmup)
+                event = Event(receivers[r], content, log)
+                yield (t, event)
+                req_counter += 1
+            t_event = float(t_events[-1])
 
 
 @register_workload('GLOBETRAFF')
@@ -172,9 +267,9 @@ class GlobetraffWorkload(object):
         self.request_file = reqs_file
         self.beta = beta
         if beta != 0:
-            degree = nx.degree(self.topology)
+            degree = nx.degree(topology)
             self.receivers = sorted(self.receivers, key=lambda x:
-                                    degree[iter(topology.adj[x]).next()],
+                                    degree[next(iter(topology.adj[x]))],
                                     reverse=True)
             self.receiver_dist = TruncatedZipfDist(beta, len(self.receivers))
 
@@ -264,7 +359,7 @@ class TraceDrivenWorkload(object):
         if beta != 0:
             degree = nx.degree(topology)
             self.receivers = sorted(self.receivers, key=lambda x:
-                                    degree[iter(topology.adj[x]).next()],
+                                    degree[next(iter(topology.adj[x]))],
                                     reverse=True)
             self.receiver_dist = TruncatedZipfDist(beta, len(self.receivers))
 
@@ -279,7 +374,7 @@ class TraceDrivenWorkload(object):
                 else:
                     receiver = self.receivers[self.receiver_dist.rv() - 1]
                 log = (req_counter >= self.n_warmup)
-                event = {'receiver': receiver, 'content': content, 'log': log}
+                event = Event(receiver, content, log)
                 yield (t_event, event)
                 req_counter += 1
                 if(req_counter >= self.n_warmup + self.n_measured):
@@ -287,6 +382,122 @@ class TraceDrivenWorkload(object):
             raise ValueError("Trace did not contain enough requests")
 
 
+@register_workload('BINARY_TRACE_DRIVEN')
+class BinaryTraceDrivenWorkload(object):
+    """Replay requests from a trace in binary format.
+
+    The trace is a directory written by :func:`icarus.tools.write_binary_trace`
+    or :func:`icarus.tools.convert_trace`, containing an array of integer
+    content identifiers, an optional array of timestamps and a dictionary of
+    content names. Arrays are memory-mapped and read in blocks, so that no
+    parsing is needed at simulation time and memory usage does not depend on
+    the size of the trace. Content identifiers range from 0 to
+    n_contents - 1.
+
+    If the trace provides timestamps, requests are scheduled at the times
+    of the trace, relative to the first request. Otherwise, requests are
+    scheduled according to a Poisson process of rate *rate*. All requests are
+    mapped to receivers uniformly unless a positive *beta* parameter is
+    specified, in which case receiver rates are assigned as in
+    :class:`TraceDrivenWorkload`.
+
+    Parameters
+    ----------
+    topology : fnss.Topology
+        The topology to which the workload refers
+    trace_dir : str
+        The path to the directory containing the binary trace
+    n_warmup : int
+        The number of warmup requests (i.e. requests executed to fill cache but
+        not logged)
+    n_measured : int
+        The number of logged requests after the warmup
+    n_contents : int, optional
+        The number of content objects. If not specified, it is inferred from
+        the largest content identifier of the trace
+    rate : float, optional
+        The network-wide mean rate of requests per second. It is used only if
+        the trace has no timestamps or *use_timestamps* is False
+    beta : float, optional
+        Spatial skewness of requests rates
+    use_timestamps : bool, optional
+        Whether requests are scheduled at the timestamps of the trace, if
+        available
+    seed : int, optional
+        The seed used to generate request times and receivers
+    batch_size : int, optional
+        The number of requests read from the trace at once
+
+    Returns
+    -------
+    events : iterator
+        Iterator of events. Each event is a 2-tuple where the first element is
+        the timestamp at which the event occurs and the second element is a
+        dictionary of event attributes.
+    """
+
+    def __init__(self, topology, trace_dir, n_warmup, n_measured,
+                 n_contents=None, rate=1.0, beta=0, use_timestamps=True,
+                 seed=None, batch_size=2 ** 16, **kwargs):
+        if beta < 0:
+            raise ValueError('beta must be positive')
+        if batch_size <= 0:
+            raise ValueError('batch_size must be positive')
+        self.requests, self.timestamps = read_binary_trace(trace_dir)
+        if n_warmup + n_measured > len(self.requests):
+            raise ValueError("Trace did not contain enough requests")
+        if not use_timestamps:
+            self.timestamps = None
+        if n_contents is None:
+            n_contents = int(self.requests.max()) + 1
+        self.n_contents = n_contents
+        self.contents = range(n_contents)
+        self.n_warmup = n_warmup
+        self.n_measured = n_measured
+        self.rate = rate
+        self.batch_size = batch_size
+        self.receivers = [v for v in topology.nodes()
+                          if topology.node[v]['stack'][0] == 'receiver']
+        self._receiver_seed, self._t_seed = np.random.SeedSequence(seed).spawn(2)
+        self.beta = beta
+        if beta != 0:
+            degree = nx.degree(topology)
+            self.receivers = sorted(self.receivers, key=lambda x:
+                                    degree[next(iter(topology.adj[x]))],
+                                    reverse=True)
+            self.receiver_dist = TruncatedZipfDist(beta, len(self.receivers),
+                                                   seed=self._receiver_seed)
+
+    def __iter__(self):
+        t_rng = np.random.default_rng(self._t_seed)
+        receiver_rng = np.random.default_rng(self._receiver_seed)
+        if self.beta != 0:
+            self.receiver_dist.reseed(self._receiver_seed)
+        n_requests = self.n_warmup + self.n_measured
+        req_counter = 0
+        t_event = 0.0
+        while req_counter < n_requests:
+            n = min(self.batch_size, n_requests - req_counter)
+            contents = self.requests[req_counter:req_counter + n]
+            if self.timestamps is not None:
+                t_events = self.timestamps[req_counter:req_counter + n] \
+                           - self.timestamps[0]
+            else:
+                t_events = t_event + np.cumsum(t_rng.exponential(1.0 / self.rate, n))
+            if self.beta == 0:
+                receiver_idx = receiver_rng.integers(len(self.receivers), size=n)
+            else:
+                receiver_idx = self.receiver_dist.rv(n) - 1
+            receivers = self.receivers
+            for t, r, content in zip(t_events.tolist(), receiver_idx.tolist(),
+                                     contents.tolist()):
+                log = (req_counter >= self.n_warmup)
+                event = Event(receivers[r], content, log)
+                yield (t, event)
+                req_counter += 1
+            t_event = float(t_events[-1])
+
+
 @register_workload('YCSB')
 class YCSBWorkload(object):
     """Yahoo! Cloud Serving Benchmark (YCSB)
@@ -337,7 +548,7 @@ class YCSBWorkload(object):
         self.workload = workload
         if seed is not None:
             random.seed(seed)
-        self.zipf = TruncatedZipfDist(alpha, n_contents)
+        self.zipf = TruncatedZipfDist(alpha, n_contents, seed=seed)
         self.n_warmup = n_warmup
         self.n_measured = n_measured
 
@@ -0,0 +1,56 @@
+import unittest
+import shutil
+import tempfile
+
+import numpy as np
+
+from icarus.util import Tree
+from icarus.scenarios import topology_tree, topology_path
+from icarus.execution import ArrayPathStore
+import icarus.orchestration as orch
+
+
+class TestPathTables(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    @staticmethod
+    def experiment(topology_spec, netconf=None):
+        experiment = Tree()
+        experiment['topology'] = topology_spec
+        if netconf is not None:
+            experiment['netconf'] = netconf
+        return experiment
+
+    def test_write_load(self):
+        experiments = [self.experiment({'name': 'TREE', 'k': 2, 'h': 3}),
+                       self.experiment({'h': 3, 'k': 2, 'name': 'TREE'}),
+                       self.experiment({'name': 'PATH', 'n': 5})]
+        path_tables = orch.write_path_tables(experiments, self.dir)
+        self.assertEqual(2, len(path_tables))
+        topology = topology_tree(2, 3)
+        key = orch._topology_key(experiments[0]['topology'])
+        predecessors = orch.load_path_table(path_tables[key], topology)
+        self.assertIsInstance(predecessors, np.memmap)
+        self.assertTrue(np.array_equal(ArrayPathStore(topology).predecessors,
+                                       predecessors))
+        # Experiments are not modified
+        self.assertNotIn('netconf', experiments[0])
+
+    def test_load_different_topology(self):
+        experiments = [self.experiment({'name': 'PATH', 'n': 5})]
+        path_tables = orch.write_path_tables(experiments, self.dir)
+        directory = list(path_tables.values())[0]
+        topology = topology_path(5)
+        topology.adj[1][2]['weight'] = 2
+        self.assertIsNone(orch.load_path_table(directory, topology))
+        self.assertIsNone(orch.load_path_table(directory, topology_path(6)))
+
+    def test_dict_path_store(self):
+        experiments = [self.experiment({'name': 'PATH', 'n': 5},
+                                       {'path_store': 'DICT'})]
+        self.assertEqual({}, orch.write_path_tables(experiments, self.dir))
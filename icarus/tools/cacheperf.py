@@ -3,11 +3,16 @@ replacement policies.
 """
 from __future__ import division
 import math
+import numbers
+import heapq
+import zlib
+import collections
 
 import numpy as np
-from scipy.optimize import fsolve
+from scipy.optimize import brentq
 
 from icarus.tools import TruncatedZipfDist, DiscreteDist
+from icarus.registry import CACHE_POLICY
 
 
 __all__ = [
@@ -27,14 +32,115 @@ __all__ = [
        'numeric_per_content_cache_hit_ratio',
        'numeric_cache_hit_ratio',
        'numeric_cache_hit_ratio_2_layers',
-       'trace_driven_cache_hit_ratio'
+       'trace_driven_cache_hit_ratio',
+       'lru_stack_distances',
+       'trace_driven_lru_miss_ratio_curve',
+       'numeric_lru_miss_ratio_curve',
+       'shards_lru_miss_ratio_curve',
+       'shards_miss_ratio_curve',
           ]
 
 
+# Number of requests drawn and served at a time by numeric and trace-driven
+# evaluations, which bounds their memory usage
+_BATCH_SIZE = 2**16
+
+
+def _process_requests(cache, contents):
+    """Serve a batch of requests by a cache, inserting missed items
+
+    Parameters
+    ----------
+    cache : Cache
+        The cache object
+    contents : list or array
+        The requested items
+
+    Returns
+    -------
+    hits : array of bool
+        Array whose i-th element is *True* if the i-th request was a hit
+    """
+    if hasattr(cache, 'process_batch'):
+        return cache.process_batch(contents)
+    hits = np.zeros(len(contents), dtype=bool)
+    for i, content in enumerate(contents):
+        if cache.get(content):
+            hits[i] = True
+        else:
+            cache.put(content)
+    return hits
+
+
+def _draw_batches(z, n):
+    """Draw n random values from a distribution in batches
+
+    Parameters
+    ----------
+    z : DiscreteDist
+        The distribution
+    n : int
+        The number of values to draw
+
+    Returns
+    -------
+    batches : generator of arrays
+        Arrays of at most _BATCH_SIZE values, in order of draw
+    """
+    for start in range(0, n, _BATCH_SIZE):
+        yield z.rv(min(_BATCH_SIZE, n - start))
+
+
+def _solve_characteristic_time(func, cache_size):
+    """Find the root of a monotonic function of the characteristic time
+
+    Parameters
+    ----------
+    func : callable
+        Vectorized function of the characteristic time, changing sign once
+        between 0 and infinity
+    cache_size : int
+        The size of the cache, used as initial guess of the root
+
+    Returns
+    -------
+    t : float
+        The characteristic time, or infinity if func does not change sign
+    """
+    sign = np.sign(func(0.0))
+    hi = float(max(cache_size, 1))
+    # Double the upper bound until the root is bracketed. The loop is bounded
+    # because beyond that point the exponentials underflow
+    for _ in range(1100):
+        if np.sign(func(hi)) != sign:
+            return brentq(func, 0.0, hi, xtol=1e-12 * hi)
+        hi *= 2
+    return np.inf
+
+
+# Order of the Taylor expansion and number of Newton iterations used to derive
+# the characteristic time of each item from the one of the whole population
+_CHE_TAYLOR_ORDER = 12
+_CHE_NEWTON_ITERATIONS = 10
+# Largest value of pdf[j] * |r - T| for which the expansion is trusted
+_CHE_TAYLOR_RADIUS = 1.0
+
+
 def che_characteristic_time(pdf, cache_size, target=None):
     """Return the characteristic time of an item or of all items, as defined by
     Che et al.
 
+    The characteristic time of item i is the root of
+    sum(exp(-pdf[j] * r) for j != i) = N - 1 - cache_size. Instead of solving
+    this equation for each item, which requires O(N^2) operations, the root T
+    of the equation including all items (i.e. the characteristic time
+    returned by *che_characteristic_time_simplified*) is computed once. The
+    sum over all items is then replaced by its Taylor expansion around T,
+    whose coefficients are shared by all items, and the resulting equations
+    are solved for all items at once with Newton's method. The few items for
+    which the expansion is not accurate enough, typically the most popular
+    items of very skewed distributions, are solved exactly.
+
     Parameters
     ----------
     pdf : array-like
@@ -53,14 +159,82 @@ def che_characteristic_time(pdf, cache_size, target=None):
         all items in the population. If a target is specified, then it returns
         the characteristic time of only the specified item.
     """
-    def func_r(r, i):
-        return sum(math.exp(-pdf[j] * r) for j in range(len(pdf)) if j != i) \
-               - len(pdf) + 1 + cache_size
-    items = range(len(pdf)) if target is None else [target - 1]
-    r = [fsolve(func_r, x0=cache_size, args=(i)) for i in items]
+    pdf = np.asarray(pdf, dtype=float)
+    p = pdf if target is None else pdf[[target - 1]]
+    if cache_size >= len(pdf) - 1:
+        # All the other items fit in the cache, so an item is never evicted
+        r = np.full(len(p), np.inf)
+        return r if target is None else r[0]
+    t = che_characteristic_time_simplified(pdf, cache_size)
+    # Coefficients of the Taylor expansion of sum(exp(-pdf * r)) - (N - C)
+    # in powers of delta = r - T, the constant term being 0 by definition of T
+    e = np.exp(-pdf * t)
+    coeffs = np.zeros(_CHE_TAYLOR_ORDER + 1)
+    pk = np.ones(len(pdf))
+    for k in range(1, _CHE_TAYLOR_ORDER + 1):
+        pk *= -pdf / k
+        coeffs[k] = np.dot(pk, e)
+    dcoeffs = coeffs[1:] * np.arange(1, _CHE_TAYLOR_ORDER + 1)
+    # Leaving item i out adds 1 - exp(-p_i * r) to the expansion. Start from
+    # the root of the first order expansion and only iterate over the items
+    # whose root has not converged yet
+    coeffs[0] = 1
+    delta = (np.exp(-p * t) - 1) / coeffs[1]
+    idx = np.arange(len(p))
+    for _ in range(_CHE_NEWTON_ITERATIONS):
+        d, p_i = delta[idx], p[idx]
+        e_i = np.exp(-p_i * (t + d))
+        f = np.polynomial.polynomial.polyval(d, coeffs) - e_i
+        df = np.polynomial.polynomial.polyval(d, dcoeffs) + p_i * e_i
+        step = f / df
+        delta[idx] = d - step
+        idx = idx[~(np.abs(step) <= 1e-15 * t)]
+        if len(idx) == 0:
+            break
+    r = t + delta
+    # The truncation error of the expansion is negligible only if
+    # pdf[j] * |delta| is small for all j. Items whose root has not converged
+    # or lies too far from T are checked against the exact equation and
+    # solved with bracketing if the check fails
+    check = np.union1d(idx, np.where(~(np.max(pdf) * np.abs(delta) <=
+                                       _CHE_TAYLOR_RADIUS))[0])
+    for i in check:
+        if _che_exact_error(pdf, p[i], cache_size, r[i]) > 1e-10:
+            r[i] = _solve_characteristic_time(
+                lambda x: (np.sum(np.exp(-pdf * x)) - np.exp(-p[i] * x)
+                           - (len(pdf) - 1 - cache_size)), cache_size)
     return r if target is None else r[0]
 
 
+def _che_exact_error(pdf, p_i, cache_size, r):
+    """Return the relative error of the characteristic time of an item, as
+    estimated from one Newton step on the exact equation defining it
+
+    Parameters
+    ----------
+    pdf : array
+        The probability density function of an item being requested
+    p_i : float
+        The probability of the item
+    cache_size : int
+        The size of the cache (in number of items)
+    r : float
+        The estimated characteristic time of the item
+
+    Returns
+    -------
+    error : float
+        The estimated relative error of r, infinite if r is not finite
+    """
+    if not np.isfinite(r) or r <= 0:
+        return np.inf
+    e = np.exp(-pdf * r)
+    e_i = np.exp(-p_i * r)
+    f = np.sum(e) - e_i - (len(pdf) - 1 - cache_size)
+    df = p_i * e_i - np.dot(pdf, e)
+    return abs(f / df) / r if df != 0 else np.inf
+
+
 def che_per_content_cache_hit_ratio(pdf, cache_size, target=None):
     """Estimate the cache hit ratio of an item or of all items using the Che's
     approximation.
@@ -83,10 +257,12 @@ def che_per_content_cache_hit_ratio(pdf, cache_size, target=None):
         items in the population. If a target is specified, then it returns
         the cache hit ratio of only the specified item.
     """
-    items = range(len(pdf)) if target is None else [target]
+    pdf = np.asarray(pdf, dtype=float)
+    if target is not None:
+        r = che_characteristic_time(pdf, cache_size, target + 1)
+        return 1 - math.exp(-pdf[target] * r)
     r = che_characteristic_time(pdf, cache_size)
-    hit_ratio = [1 - math.exp(-pdf[i] * r[i]) for i in items]
-    return hit_ratio if target is None else hit_ratio[0]
+    return 1 - np.exp(-pdf * r)
 
 
 def che_cache_hit_ratio(pdf, cache_size):
@@ -106,7 +282,7 @@ def che_cache_hit_ratio(pdf, cache_size):
         The overall cache hit ratio
     """
     ch = che_per_content_cache_hit_ratio(pdf, cache_size)
-    return sum(pdf[i] * ch[i] for i in range(len(pdf)))
+    return float(np.dot(pdf, ch))
 
 
 def che_characteristic_time_simplified(pdf, cache_size):
@@ -128,10 +304,11 @@ def che_characteristic_time_simplified(pdf, cache_size):
     r : float
         The characteristic time.
     """
+    pdf = np.asarray(pdf, dtype=float)
+    n = len(pdf)
     def func_r(r):
-        return sum(math.exp(-pdf[j] * r) for j in range(len(pdf))) \
-               - len(pdf) + cache_size
-    return fsolve(func_r, x0=cache_size)[0]
+        return np.sum(np.exp(-pdf * r)) - n + cache_size
+    return _solve_characteristic_time(func_r, cache_size)
 
 
 def che_per_content_cache_hit_ratio_simplified(pdf, cache_size, target=None):
@@ -157,10 +334,11 @@ def che_per_content_cache_hit_ratio_simplified(pdf, cache_size, target=None):
         items in the population. If a target is specified, then it returns
         the cache hit ratio of only the specified item.
     """
-    items = range(len(pdf)) if target is None else [target]
+    pdf = np.asarray(pdf, dtype=float)
     r = che_characteristic_time_simplified(pdf, cache_size)
-    hit_ratio = [1 - math.exp(-pdf[i] * r) for i in items]
-    return hit_ratio if target is None else hit_ratio[0]
+    if target is not None:
+        return 1 - math.exp(-pdf[target] * r)
+    return 1 - np.exp(-pdf * r)
 
 
 def che_cache_hit_ratio_simplified(pdf, cache_size):
@@ -181,7 +359,7 @@ def che_cache_hit_ratio_simplified(pdf, cache_size):
         The overall cache hit ratio
     """
     ch = che_per_content_cache_hit_ratio_simplified(pdf, cache_size)
-    return sum(pdf[i] * ch[i] for i in range(len(pdf)))
+    return float(np.dot(pdf, ch))
 
 
 def che_p_in_func(pdf, cache_size, policy, **policy_args):
@@ -237,10 +415,11 @@ def che_characteristic_time_generalized(pdf, cache_size, policy, **policy_args):
     performance analysis of caching systems," in Proceedings of the 2014
     IEEE Conference on Computer Communications (INFOCOM'14), April 2014
     """
+    pdf = np.asarray(pdf, dtype=float)
     p_in = che_p_in_func(pdf, cache_size, policy, **policy_args)
     def func_t(t):
         return np.sum(p_in(pdf, t)) - cache_size
-    return fsolve(func_t, x0=cache_size)[0]
+    return _solve_characteristic_time(func_t, cache_size)
 
 
 def che_per_content_cache_hit_ratio_generalized(pdf, cache_size, policy,
@@ -271,6 +450,7 @@ def che_per_content_cache_hit_ratio_generalized(pdf, cache_size, policy,
     performance analysis of caching systems," in Proceedings of the 2014
     IEEE Conference on Computer Communications (INFOCOM'14), April 2014
     """
+    pdf = np.asarray(pdf, dtype=float)
     p_in = che_p_in_func(pdf, cache_size, policy, **policy_args)
     t = che_characteristic_time_generalized(pdf, cache_size, policy, **policy_args)
     return p_in(pdf, t)
@@ -301,7 +481,7 @@ def che_cache_hit_ratio_generalized(pdf, cache_size, policy='LRU', **policy_args
     IEEE Conference on Computer Communications (INFOCOM'14), April 2014
     """
     ch = che_per_content_cache_hit_ratio_generalized(pdf, cache_size, policy, **policy_args)
-    return sum(pdf[i] * ch[i] for i in range(len(pdf)))
+    return float(np.dot(pdf, ch))
 
 
 def laoutaris_characteristic_time(alpha, population, cache_size, order=3):
@@ -576,20 +756,17 @@ def numeric_per_content_cache_hit_ratio(pdf, cache, warmup=None, measure=None,
     if warmup is None: warmup = 10 * len(pdf)
     if measure is None: measure = 30 * len(pdf)
     z = DiscreteDist(pdf, seed)
-    for _ in range(warmup):
-        content = z.rv()
-        if not cache.get(content):
-            cache.put(content)
+    for contents in _draw_batches(z, warmup):
+        _process_requests(cache, contents)
     cache_hits = np.zeros(len(pdf))
     requests = np.zeros(len(pdf))
-    for _ in range(measure):
-        content = z.rv()
-        requests[content - 1] += 1
-        if cache.get(content):
-            cache_hits[content - 1] += 1
-        else:
-            cache.put(content)
-    hit_ratio = np.where(requests > 0, cache_hits / requests, requests)
+    for contents in _draw_batches(z, measure):
+        hits = _process_requests(cache, contents)
+        requests += np.bincount(contents - 1, minlength=len(pdf))
+        cache_hits += np.bincount(contents - 1, weights=hits,
+                                  minlength=len(pdf))
+    hit_ratio = np.where(requests > 0, cache_hits / np.maximum(requests, 1),
+                         requests)
     return hit_ratio if target is None else hit_ratio[target - 1]
 
 
@@ -621,17 +798,11 @@ def numeric_cache_hit_ratio(pdf, cache, warmup=None, measure=None, seed=None):
     if warmup is None: warmup = 10 * len(pdf)
     if measure is None: measure = 30 * len(pdf)
     z = DiscreteDist(pdf, seed)
-    for _ in range(warmup):
-        content = z.rv()
-        if not cache.get(content):
-            cache.put(content)
+    for contents in _draw_batches(z, warmup):
+        _process_requests(cache, contents)
     cache_hits = 0
-    for _ in range(measure):
-        content = z.rv()
-        if cache.get(content):
-            cache_hits += 1
-        else:
-            cache.put(content)
+    for contents in _draw_batches(z, measure):
+        cache_hits += int(np.count_nonzero(_process_requests(cache, contents)))
     return cache_hits / measure
 
 
@@ -667,26 +838,19 @@ def numeric_cache_hit_ratio_2_layers(pdf, l1_cache, l2_cache,
     if warmup is None: warmup = 10 * len(pdf)
     if measure is None: measure = 30 * len(pdf)
     z = DiscreteDist(pdf, seed)
-    for _ in range(warmup):
-        content = z.rv()
-        if not l1_cache.get(content):
-            if not l2_cache.get(content):
-                l2_cache.put(content)
-            l1_cache.put(content)
+    # The layer 2 cache is only subject to the requests missed by the layer 1
+    # cache, which in turn does not depend on the layer 2 cache, so they can
+    # be processed one after the other
+    for contents in _draw_batches(z, warmup):
+        l1 = _process_requests(l1_cache, contents)
+        _process_requests(l2_cache, contents[~l1])
     l1_hits = 0
-    l1_misses = 0
     l2_hits = 0
-    for _ in range(measure):
-        content = z.rv()
-        if l1_cache.get(content):
-            l1_hits += 1
-        else:
-            l1_misses += 1
-            if l2_cache.get(content):
-                l2_hits += 1
-            else:
-                l2_cache.put(content)
-            l1_cache.put(content)
+    for contents in _draw_batches(z, measure):
+        l1 = _process_requests(l1_cache, contents)
+        l2 = _process_requests(l2_cache, contents[~l1])
+        l1_hits += int(np.count_nonzero(l1))
+        l2_hits += int(np.count_nonzero(l2))
     return {
         'l1_hits': l1_hits / measure,
         'l2_hits': l2_hits / measure,
@@ -719,12 +883,497 @@ def trace_driven_cache_hit_ratio(workload, cache, warmup_ratio=0.25):
     n = len(workload)
     cache_hits = 0
     n_warmup = int(warmup_ratio * n)
-    n_req = 0
-    for content in workload:
-        if cache.get(content):
-            if n_req >= n_warmup:
-                cache_hits += 1
-        else:
-            cache.put(content)
-        n_req += 1
+    for start in range(0, n, _BATCH_SIZE):
+        hits = _process_requests(cache, workload[start:start + _BATCH_SIZE])
+        if start + len(hits) > n_warmup:
+            cache_hits += int(np.count_nonzero(hits[max(n_warmup - start, 0):]))
     return cache_hits / (n - n_warmup)
+
+
+def _encode_trace(workload):
+    """Map the items of a trace to integer codes
+
+    Parameters
+    ----------
+    workload : list or array
+        The trace
+
+    Returns
+    -------
+    codes : list of int
+        The code of the item of each request, between 0 and the number of
+        distinct items - 1
+    n_items : int
+        The number of distinct items
+    """
+    if isinstance(workload, np.ndarray) and workload.ndim == 1 \
+            and workload.dtype.kind in 'iub':
+        items, codes = np.unique(workload, return_inverse=True)
+        return codes.ravel().tolist(), len(items)
+    index = {}
+    codes = [index.setdefault(k, len(index)) for k in workload]
+    return codes, len(index)
+
+
+def lru_stack_distances(workload):
+    """Return the LRU stack distance of each request of a trace.
+
+    The stack distance of a request is the position, starting from 1, of the
+    requested item in the stack of items ordered by time of last request,
+    i.e. the number of distinct items requested since the previous request
+    of the same item, including the item itself. A request is a hit in an
+    LRU cache if and only if the cache size is not lower than its stack
+    distance.
+
+    Distances are computed in a single pass over the trace in O(N log N)
+    time, where N is the length of the trace, by counting distinct items
+    with a Fenwick tree over request positions, in which only the position
+    of the last request of each item is marked.
+
+    Parameters
+    ----------
+    workload : list or array
+        List of URLs or content identifiers extracted from a trace
+
+    Returns
+    -------
+    distances : array of int
+        The stack distance of each request or 0 if the item was never
+        requested before
+    """
+    codes, n_items = _encode_trace(workload)
+    n = len(codes)
+    tree = [0] * (n + 1)
+    last = [-1] * n_items
+    distances = [0] * n
+    n_marked = 0
+    for t, k in enumerate(codes):
+        p = last[k]
+        if p >= 0:
+            # Count the marked positions up to p, i.e. the items whose last
+            # request precedes the one of k, plus k itself
+            i = p + 1
+            s = 0
+            while i > 0:
+                s += tree[i]
+                i &= i - 1
+            distances[t] = n_marked - s + 1
+            i = p + 1
+            while i <= n:
+                tree[i] -= 1
+                i += i & -i
+        else:
+            n_marked += 1
+        i = t + 1
+        while i <= n:
+            tree[i] += 1
+            i += i & -i
+        last[k] = t
+    return np.array(distances, dtype=np.int64)
+
+
+def _miss_ratio_curve(distances, max_size):
+    """Return the LRU miss ratio curve from the stack distances of measured
+    requests
+
+    Parameters
+    ----------
+    distances : array of int
+        Stack distances of measured requests, 0 for first requests
+    max_size : int
+        The largest cache size of the curve
+
+    Returns
+    -------
+    miss_ratio : array of float
+        Array whose i-th element is the miss ratio of a cache of size i
+    """
+    if len(distances) == 0:
+        raise ValueError('no request is measured')
+    hist = np.bincount(distances, minlength=max_size + 1)[:max_size + 1]
+    hist[0] = 0
+    return 1 - np.cumsum(hist) / len(distances)
+
+
+def trace_driven_lru_miss_ratio_curve(workload, max_size=None,
+                                      warmup_ratio=0.25):
+    """Compute the miss ratio of LRU caches of all sizes under an arbitrary
+    trace-driven workload.
+
+    All cache sizes are evaluated in a single pass over the trace using
+    stack distances. Results are identical to those of
+    *trace_driven_cache_hit_ratio* applied to an LRU cache of each size.
+
+    Parameters
+    ----------
+    workload : list or array
+        List of URLs or content identifiers extracted from a trace. This list
+        only needs to contains content identifiers and not timestamps
+    max_size : int, optional
+        The largest cache size evaluated. If not specified, it is the largest
+        stack distance of the trace, beyond which the miss ratio only
+        accounts for first requests and does not decrease any further
+    warmup_ratio : float, optional
+        Ratio of requests of the workload used to warm up the cache (i.e. whose
+        cache hit/miss results are discarded)
+
+    Returns
+    -------
+    miss_ratio : array of float
+        Array whose i-th element is the miss ratio of an LRU cache of size i,
+        for i between 0 and *max_size*
+    """
+    if warmup_ratio < 0 or warmup_ratio > 1:
+        raise ValueError("warmup_ratio must be comprised between 0 and 1")
+    distances = lru_stack_distances(workload)
+    if max_size is None:
+        max_size = int(distances.max()) if len(distances) > 0 else 0
+    n_warmup = int(warmup_ratio * len(distances))
+    return _miss_ratio_curve(distances[n_warmup:], max_size)
+
+
+def numeric_lru_miss_ratio_curve(pdf, max_size=None, warmup=None,
+                                 measure=None, seed=None):
+    """Numerically compute the miss ratio of LRU caches of all sizes under IRM
+    stationary demand with a given pdf.
+
+    All cache sizes are evaluated in a single pass over the requests using
+    stack distances. With the same seed, results are identical to those of
+    *numeric_cache_hit_ratio* applied to an LRU cache of each size.
+
+    Parameters
+    ----------
+    pdf : array-like
+        The probability density function of an item being requested
+    max_size : int, optional
+        The largest cache size evaluated. If not specified, it is the content
+        population
+    warmup : int, optional
+        The number of warmup requests to generate. If not specified, it is set
+        to 10 times the content population
+    measure : int, optional
+        The number of measured requests to generate. If not specified, it is
+        set to 30 times the content population
+    seed : int, optional
+        The seed used to generate random numbers
+
+    Returns
+    -------
+    miss_ratio : array of float
+        Array whose i-th element is the miss ratio of an LRU cache of size i,
+        for i between 0 and *max_size*
+    """
+    if warmup is None: warmup = 10 * len(pdf)
+    if measure is None: measure = 30 * len(pdf)
+    if max_size is None: max_size = len(pdf)
+    workload = DiscreteDist(pdf, seed).rv(warmup + measure)
+    distances = lru_stack_distances(workload)
+    return _miss_ratio_curve(distances[warmup:], max_size)
+
+
+# Range of the spatial hashes used to sample items
+_HASH_RANGE = 2**32
+
+# Constants of the SplitMix64 hash function used to sample items
+_SPLITMIX64 = (np.uint64(0x9e3779b97f4a7c15), np.uint64(0xbf58476d1ce4e5b9),
+               np.uint64(0x94d049bb133111eb))
+
+
+def _spatial_hash(items, seed):
+    """Return a hash of each item, uniformly distributed in [0, 2**32) and
+    identical for all requests of the same item
+
+    Parameters
+    ----------
+    items : list or array
+        The items
+    seed : int
+        Seed selecting the hash function
+
+    Returns
+    -------
+    hashes : array of uint64
+        The hash of each item
+    """
+    if isinstance(items, np.ndarray) and items.dtype.kind in 'iub':
+        x = items.astype(np.uint64)
+    else:
+        # Integers are hashed by value as in integer arrays, so that the
+        # sample does not depend on the type of the trace
+        x = np.array([int(k) & 0xFFFFFFFFFFFFFFFF
+                      if isinstance(k, numbers.Integral)
+                      else zlib.crc32(repr(k).encode()) for k in items],
+                     dtype=np.uint64)
+    gamma, m1, m2 = _SPLITMIX64
+    x = x + np.uint64((seed + 1) * int(gamma) % 2**64)
+    x = (x ^ (x >> np.uint64(30))) * m1
+    x = (x ^ (x >> np.uint64(27))) * m2
+    x = x ^ (x >> np.uint64(31))
+    return x >> np.uint64(32)
+
+
+def _shards_sample(workload, rate, seed):
+    """Select the requests of items whose spatial hash is lower than a
+    threshold
+
+    Parameters
+    ----------
+    workload : list or array
+        The trace
+    rate : float
+        The fraction of items sampled
+    seed : int
+        Seed selecting the hash function
+
+    Returns
+    -------
+    samples : generator of tuples
+        Tuples (index of the request, item, hash of the item) of the sampled
+        requests, in order of request
+    """
+    threshold = rate * _HASH_RANGE
+    for start in range(0, len(workload), _BATCH_SIZE):
+        chunk = workload[start:start + _BATCH_SIZE]
+        hashes = _spatial_hash(chunk, seed)
+        idx = np.flatnonzero(hashes < threshold)
+        if isinstance(chunk, np.ndarray):
+            items = chunk[idx].tolist()
+        else:
+            items = [chunk[i] for i in idx.tolist()]
+        for i, k, h in zip((idx + start).tolist(), items,
+                           hashes[idx].tolist()):
+            yield i, k, h
+
+
+class _StackDistanceCounter(object):
+    """Compute the LRU stack distances of a stream of requests, supporting
+    the removal of items.
+
+    Distances are computed with a Fenwick tree over request positions in
+    which only the last request of each item is marked. When all positions
+    are used, positions of tracked items are compacted, so that memory is
+    proportional to the number of items tracked and not to the number of
+    requests.
+    """
+
+    def __init__(self, capacity=1024):
+        self._capacity = capacity
+        self._tree = [0] * (capacity + 1)
+        self._last = {}
+        self._t = 0
+
+    def __len__(self):
+        return len(self._last)
+
+    def __contains__(self, k):
+        return k in self._last
+
+    def _add(self, i, v):
+        tree = self._tree
+        n = self._capacity
+        i += 1
+        while i <= n:
+            tree[i] += v
+            i += i & -i
+
+    def _prefix(self, i):
+        """Return the number of marked positions up to i"""
+        tree = self._tree
+        i += 1
+        s = 0
+        while i > 0:
+            s += tree[i]
+            i &= i - 1
+        return s
+
+    def _compact(self):
+        """Move the last requests of all items to the first positions"""
+        items = sorted(self._last, key=self._last.get)
+        if 2 * len(items) > self._capacity:
+            self._capacity *= 2
+        self._tree = [0] * (self._capacity + 1)
+        self._last = {}
+        for t, k in enumerate(items):
+            self._add(t, 1)
+            self._last[k] = t
+        self._t = len(items)
+
+    def request(self, k):
+        """Record a request and return its stack distance, or 0 if the item
+        is not tracked"""
+        if self._t == self._capacity:
+            self._compact()
+        p = self._last.get(k)
+        if p is None:
+            d = 0
+        else:
+            d = len(self._last) - self._prefix(p) + 1
+            self._add(p, -1)
+        self._add(self._t, 1)
+        self._last[k] = self._t
+        self._t += 1
+        return d
+
+    def remove(self, k):
+        """Stop tracking an item"""
+        p = self._last.pop(k, None)
+        if p is not None:
+            self._add(p, -1)
+
+
+def shards_lru_miss_ratio_curve(workload, rate=0.01, sample_size=None,
+                                max_size=None, warmup_ratio=0.25, seed=None):
+    """Estimate the miss ratio of LRU caches of all sizes under an arbitrary
+    trace-driven workload using SHARDS.
+
+    Stack distances are computed only for the requests of a spatially hashed
+    sample of the items and scaled by the inverse of the sampling rate. With
+    fixed-rate sampling, a fraction *rate* of items is sampled and the
+    number of sampled requests is adjusted to its expected value. With
+    fixed-size sampling, at most *sample_size* items are tracked and the
+    sampling rate is lowered whenever a new item would exceed this bound, so
+    that memory does not depend on the number of items of the trace.
+
+    Parameters
+    ----------
+    workload : list or array
+        List of URLs or content identifiers extracted from a trace
+    rate : float, optional
+        The sampling rate or, if *sample_size* is specified, the initial
+        sampling rate
+    sample_size : int, optional
+        The maximum number of items tracked. If specified, fixed-size
+        sampling is used, otherwise fixed-rate sampling
+    max_size : int, optional
+        The largest cache size evaluated. If not specified, it is the largest
+        estimated stack distance
+    warmup_ratio : float, optional
+        Ratio of requests of the workload used to warm up the cache (i.e. whose
+        cache hit/miss results are discarded)
+    seed : int, optional
+        Seed selecting the hash function used to sample items
+
+    Returns
+    -------
+    miss_ratio : array of float
+        Array whose i-th element is the estimated miss ratio of an LRU cache
+        of size i, for i between 0 and *max_size*
+
+    References
+    ----------
+    C. Waldspurger, N. Park, A. Garthwaite, and I. Ahmad, "Efficient MRC
+    Construction with SHARDS," in Proceedings of the 13th USENIX Conference
+    on File and Storage Technologies (FAST'15), February 2015
+    """
+    if not 0 < rate <= 1:
+        raise ValueError('rate must be comprised between 0 and 1')
+    if warmup_ratio < 0 or warmup_ratio > 1:
+        raise ValueError("warmup_ratio must be comprised between 0 and 1")
+    if sample_size is not None and sample_size <= 0:
+        raise ValueError('sample_size must be positive')
+    seed = 0 if seed is None else seed
+    n_warmup = int(warmup_ratio * len(workload))
+    counter = _StackDistanceCounter()
+    # Weighted histogram of the cache sizes needed for a hit, where 0 stands
+    # for requests missing in caches of any size
+    hist = collections.defaultdict(float)
+    threshold = rate * _HASH_RANGE
+    heap = []
+    for i, k, h in _shards_sample(workload, rate, seed):
+        if sample_size is not None:
+            if h >= threshold:
+                continue
+            if k not in counter:
+                heapq.heappush(heap, (-h, k))
+                if len(counter) >= sample_size:
+                    # Lower the rate, dropping the item with largest hash
+                    h_max, evicted = heapq.heappop(heap)
+                    threshold = -h_max
+                    if evicted == k:
+                        continue
+                    counter.remove(evicted)
+        d = counter.request(k)
+        if i >= n_warmup:
+            r = threshold / _HASH_RANGE
+            # Each of the other d - 1 items tracked stands for 1 / r items
+            hist[int(math.ceil((d - 1) / r)) + 1 if d > 0 else 0] += 1 / r
+    total = sum(hist.values())
+    if max_size is None:
+        max_size = max(hist) if hist else 0
+    mrc_hist = np.zeros(max_size + 1)
+    for size, w in hist.items():
+        if 0 < size <= max_size:
+            mrc_hist[size] += w
+    n_measured = len(workload) - n_warmup
+    if max_size > 0:
+        # Requests are weighted by the inverse of the sampling rate, so their
+        # expected total weight is the number of measured requests. As in
+        # SHARDS-adj, the difference is attributed to the smallest size
+        mrc_hist[1] += n_measured - total
+        total = n_measured
+    if total <= 0:
+        return np.ones(max_size + 1)
+    return np.clip(1 - np.cumsum(mrc_hist) / total, 0, 1)
+
+
+def shards_miss_ratio_curve(workload, cache_sizes, policy='LRU', rate=0.01,
+                            warmup_ratio=0.25, seed=None, **policy_args):
+    """Estimate the miss ratio of caches of various sizes under an arbitrary
+    trace-driven workload by simulating scaled-down caches on a spatially
+    hashed sample of the items.
+
+    Each cache of size *c* is simulated as a cache of size *c* times *rate*
+    subject only to the requests of a fraction *rate* of the items. Unlike
+    *shards_lru_miss_ratio_curve*, this works for any replacement policy but
+    requires one simulation per cache size.
+
+    Parameters
+    ----------
+    workload : list or array
+        List of URLs or content identifiers extracted from a trace
+    cache_sizes : iterable of int
+        The cache sizes evaluated
+    policy : str, optional
+        The name of the replacement policy, as registered in CACHE_POLICY
+    rate : float, optional
+        The sampling rate
+    warmup_ratio : float, optional
+        Ratio of requests of the workload used to warm up the cache (i.e. whose
+        cache hit/miss results are discarded)
+    seed : int, optional
+        Seed selecting the hash function used to sample items
+    **policy_args
+        Keyword arguments passed to the constructor of the cache
+
+    Returns
+    -------
+    miss_ratio : array of float
+        Array whose i-th element is the estimated miss ratio of a cache of
+        the i-th size
+    """
+    if not 0 < rate <= 1:
+        raise ValueError('rate must be comprised between 0 and 1')
+    if warmup_ratio < 0 or warmup_ratio > 1:
+        raise ValueError("warmup_ratio must be comprised between 0 and 1")
+    seed = 0 if seed is None else seed
+    n_warmup = int(warmup_ratio * len(workload))
+    indices = []
+    sample = []
+    for i, k, _ in _shards_sample(workload, rate, seed):
+        indices.append(i)
+        sample.append(k)
+    n_sample_warmup = int(np.searchsorted(indices, n_warmup))
+    # As in SHARDS-adj, misses are divided by the expected number of sampled
+    # requests rather than by the actual one, which can differ much from it
+    # when very popular items happen to be sampled or not
+    n_expected = rate * (len(workload) - n_warmup)
+    miss_ratio = []
+    for size in cache_sizes:
+        cache = CACHE_POLICY[policy](max(1, int(round(size * rate))),
+                                     **policy_args)
+        hits = _process_requests(cache, sample)
+        n_misses = len(hits) - n_sample_warmup \
+                   - np.count_nonzero(hits[n_sample_warmup:])
+        miss_ratio.append(min(n_misses / n_expected, 1.0)
+                          if n_expected > 0 else 1.0)
+    return np.array(miss_ratio)
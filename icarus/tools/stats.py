@@ -3,7 +3,6 @@
 from __future__ import division
 
 import math
-import random
 import collections
 
 import numpy as np
@@ -15,6 +14,8 @@ __all__ = [
        'TruncatedZipfDist',
        'means_confidence_interval',
        'proportions_confidence_interval',
+       'batch_means_confidence_interval',
+       'mser',
        'cdf',
        'pdf',
            ]
@@ -25,8 +26,23 @@ class DiscreteDist(object):
 
     The support must be a finite discrete set of contiguous integers
     {1, ..., N}. This definition of discrete distribution.
+
+    Random values are drawn using Walker's alias method, in the formulation
+    proposed by Vose, which samples in constant time regardless of the
+    cardinality of the support. Each instance draws random numbers from its
+    own random generator and does not affect the state of the global random
+    number generators of the *random* and *numpy.random* modules.
+
+    References
+    ----------
+    M. D. Vose, A linear algorithm for generating random numbers with a given
+    distribution, IEEE Transactions on Software Engineering, 17(9), 1991
     """
 
+    # Number of random values drawn at once to serve calls to rv() without
+    # arguments
+    _buffer_size = 1024
+
     def __init__(self, pdf, seed=None):
         """
         Constructor
@@ -35,16 +51,28 @@ class DiscreteDist(object):
         ----------
         pdf : array-like
             The probability density function
-        seed : any hashable type (optional)
+        seed : int, numpy.random.SeedSequence or numpy.random.Generator, optional
             The seed to be used for random number generation
         """
-        if np.abs(sum(pdf) - 1.0) > 0.001:
+        pdf = np.asarray(pdf, dtype=float)
+        if np.abs(np.sum(pdf) - 1.0) > 0.001:
             raise ValueError('The sum of pdf values must be equal to 1')
-        random.seed(seed)
-        self._pdf = np.asarray(pdf)
-        self._cdf = np.cumsum(self._pdf)
-        # set last element of the CDF to 1.0 to avoid rounding errors
-        self._cdf[-1] = 1.0
+        self._pdf = pdf
+        self._cdf = None
+        self._prob, self._alias = _alias_table(pdf)
+        self._rng = np.random.default_rng(seed)
+        self._buffer = []
+
+    def reseed(self, seed=None):
+        """Restart the generation of random values from a new seed
+
+        Parameters
+        ----------
+        seed : int, numpy.random.SeedSequence or numpy.random.Generator, optional
+            The seed to be used for random number generation
+        """
+        self._rng = np.random.default_rng(seed)
+        self._buffer = []
 
     def __len__(self):
         """Return the cardinality of the support
@@ -79,15 +107,105 @@ class DiscreteDist(object):
         cdf : Numpy array
             Array representing cdf
         """
+        # The CDF is not needed for sampling, so it is computed only on demand
+        if self._cdf is None:
+            self._cdf = np.cumsum(self._pdf)
+            # set last element of the CDF to 1.0 to avoid rounding errors
+            self._cdf[-1] = 1.0
         return self._cdf
 
-    def rv(self):
+    def rv(self, n=None):
         """Get rand value from the distribution
+
+        Parameters
+        ----------
+        n : int, optional
+            The number of random values to draw
+
+        Returns
+        -------
+        rv : int or array of int
+            If n is None, a single random value, otherwise an array of n
+            random values
         """
-        rv = random.random()
-        # This operation performs binary search over the CDF to return the
-        # random value. Worst case time complexity is O(log2(n))
-        return int(np.searchsorted(self._cdf, rv) + 1)
+        if n is None:
+            # Values are drawn in blocks and returned one at a time, so that
+            # the cost of a NumPy call is amortized over many draws
+            if not self._buffer:
+                self._buffer = self.rv(self._buffer_size).tolist()
+                self._buffer.reverse()
+            return self._buffer.pop()
+        # A single uniform variable selects both the column of the alias table
+        # (integer part) and whether to return the column or its alias
+        # (fractional part). This guarantees that the sequence of values drawn
+        # depends only on the seed and not on how many are drawn at a time
+        u = self._rng.random(n) * len(self._pdf)
+        i = u.astype(np.int64)
+        np.minimum(i, len(self._pdf) - 1, out=i)
+        rv = np.where(u - i < self._prob[i], i, self._alias[i])
+        rv += 1
+        return rv
+
+
+def _alias_table(pdf):
+    """Build the alias table of a discrete distribution.
+
+    Parameters
+    ----------
+    pdf : array
+        The probability density function
+
+    Returns
+    -------
+    prob : array of float
+        Probability of returning the value of each column of the table rather
+        than its alias
+    alias : array of int
+        Alias of each column of the table
+
+    Notes
+    -----
+    This function implements the construction algorithm of Vose without any
+    Python-level loop. In Vose's algorithm, each column whose scaled
+    probability is less than 1 (small) takes as alias the first column with
+    scaled probability greater or equal than 1 (large) which still has excess
+    probability to give. When the excess of a large column is exhausted, it
+    becomes small and takes the next large column as alias. Since large
+    columns are consumed in order, the large column serving each small one can
+    be found by comparing the cumulative deficit of small columns with the
+    cumulative excess of large ones.
+    """
+    n = len(pdf)
+    q = pdf * n
+    prob = np.ones(n)
+    alias = np.arange(n, dtype=np.int32 if n < 2 ** 31 else np.int64)
+    small = np.flatnonzero(q < 1.0)
+    large = np.flatnonzero(q >= 1.0)
+    if len(small) == 0 or len(large) == 0:
+        return prob, alias
+    deficit = 1.0 - q[small]
+    deficit_end = np.cumsum(deficit)
+    deficit_start = deficit_end - deficit
+    excess_end = np.cumsum(q[large] - 1.0)
+    # Each small column is served by the first large column whose cumulative
+    # excess exceeds the cumulative deficit of all previous small columns
+    served_by = np.searchsorted(excess_end, deficit_start, side='right')
+    np.minimum(served_by, len(large) - 1, out=served_by)
+    prob[small] = q[small]
+    alias[small] = large[served_by]
+    # Cumulative deficit of all small columns served by each large column or
+    # by any of the previous ones
+    n_served = np.searchsorted(deficit_start, excess_end, side='left')
+    deficit_served = np.where(n_served > 0, deficit_end[n_served - 1], 0.0)
+    # A large column whose excess is exhausted becomes small and takes the
+    # next large column as alias. The last large column can never be
+    # exhausted, unless because of rounding errors
+    large_prob = 1.0 + excess_end - deficit_served
+    large_prob[-1] = 1.0
+    exhausted = np.flatnonzero(large_prob < 1.0)
+    prob[large[exhausted]] = np.maximum(large_prob[exhausted], 0.0)
+    alias[large[exhausted]] = large[exhausted + 1]
+    return prob, alias
 
 
 class TruncatedZipfDist(DiscreteDist):
@@ -104,7 +222,7 @@ class TruncatedZipfDist(DiscreteDist):
             The value of the alpha parameter (it must be positive)
         n : int
             The size of population
-        seed : any hashable type, optional
+        seed : int, numpy.random.SeedSequence or numpy.random.Generator, optional
             The seed to be used for random number generation
         """
         # Validate parameters
@@ -184,6 +302,95 @@ def proportions_confidence_interval(data, confidence):
     return p, err * math.sqrt(p * (1 - p) / n)
 
 
+def batch_means_confidence_interval(data, n_batches=20, confidence=0.95):
+    """Computes the confidence interval of the mean of a sequence of
+    correlated samples, e.g. the output of a simulation, with the method of
+    batch means.
+
+    The sequence is split into *n_batches* batches of equal length, discarding
+    the first samples if its length is not a multiple of *n_batches*. If
+    batches are long enough, their means are approximately independent and
+    normally distributed, so that the confidence interval is computed from
+    the Student's t distribution.
+
+    Parameters
+    ----------
+    data : array-like
+        The sequence of samples
+    n_batches : int, optional
+        The number of batches
+    confidence : float, optional
+        The confidence level. It must be a value in the interval (0, 1)
+
+    Returns
+    -------
+    mean : float
+        The mean of the batch means
+    err : float
+        The half-width of the confidence interval
+    """
+    if confidence <= 0 or confidence >= 1:
+        raise ValueError('The confidence parameter must be greater than 0 and '
+                         'smaller than 1')
+    if n_batches < 2:
+        raise ValueError('n_batches must be at least 2')
+    data = np.asarray(data, dtype=float)
+    batch_size = len(data) // n_batches
+    if batch_size == 0:
+        raise ValueError('There must be at least one sample per batch')
+    means = data[len(data) - n_batches * batch_size:] \
+            .reshape(n_batches, batch_size).mean(axis=1)
+    err = ss.t.ppf((1 + confidence) / 2, n_batches - 1)
+    return means.mean(), err * means.std(ddof=1) / math.sqrt(n_batches)
+
+
+def mser(data, batch_size=5):
+    """Computes the truncation point of the initial transient of a sequence
+    of samples, e.g. the output of a simulation, with the Marginal Standard
+    Error Rule (MSER).
+
+    Samples are averaged in batches of *batch_size* samples (MSER-5 if
+    *batch_size* is 5) and the number d of batches to discard is the one
+    minimizing the squared standard error of the mean of the remaining n - d
+    batches, i.e. sum((y_i - mean(y[d:]))**2 for i >= d) / (n - d)**2. The
+    truncation point is usually considered reliable only if it is within the
+    first half of the sequence.
+
+    Parameters
+    ----------
+    data : array-like
+        The sequence of samples
+    batch_size : int, optional
+        The number of samples per batch. Samples at the end of the sequence not
+        filling a whole batch are ignored
+
+    Returns
+    -------
+    d : int
+        The number of initial samples to discard. It is a multiple of
+        *batch_size*
+
+    References
+    ----------
+    [1] K. P. White, M. J. Cobb and S. C. Spratt, A comparison of five steady-
+        state truncation heuristics for simulation, in Proc. of WSC 2000
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be positive')
+    data = np.asarray(data, dtype=float)
+    n = len(data) // batch_size
+    if n < 2:
+        raise ValueError('There must be at least two batches')
+    y = data[:n * batch_size].reshape(n, batch_size).mean(axis=1)
+    # Sums of the batch means and of their squares from each batch to the
+    # last one. The last batch is never the only one left
+    s1 = np.cumsum(y[::-1])[::-1][:-1]
+    s2 = np.cumsum(y[::-1] ** 2)[::-1][:-1]
+    k = np.arange(n, 1, -1)
+    stat = (s2 - s1 ** 2 / k) / k ** 2
+    return int(np.argmin(stat)) * batch_size
+
+
 def cdf(data):
     """Return the empirical CDF of a set of 1D data
 
@@ -1,6 +1,7 @@
 import unittest
 
 import numpy as np
+from scipy.optimize import brentq
 
 import icarus.tools.cacheperf as cacheperf
 import icarus.models as cache
@@ -45,6 +46,157 @@ class TestNumericCacheHitRatio(unittest.TestCase):
         self.assertLess(np.abs(h - r), 0.01)
 
 
+class TestTraceDrivenCacheHitRatio(unittest.TestCase):
+
+    def setUp(self):
+        self.batch_size = cacheperf._BATCH_SIZE
+        cacheperf._BATCH_SIZE = 64
+
+    def tearDown(self):
+        cacheperf._BATCH_SIZE = self.batch_size
+
+    def test_same_as_get_put(self):
+        trace = np.random.RandomState(0).zipf(1.2, 1000) % 100
+        c = cache.LruCache(10)
+        hits = 0
+        for i, k in enumerate(trace.tolist()):
+            if c.get(k):
+                hits += i >= 250
+            else:
+                c.put(k)
+        for workload in (trace, trace.tolist()):
+            h = cacheperf.trace_driven_cache_hit_ratio(workload,
+                                                       cache.LruCache(10))
+            self.assertAlmostEqual(hits / 750, h)
+
+    def test_numeric_2_layers(self):
+        pdf = stats.TruncatedZipfDist(0.8, 100).pdf
+        h = cacheperf.numeric_cache_hit_ratio_2_layers(
+                pdf, cache.LruCache(5), cache.LruCache(10), seed=1)
+        h1 = cacheperf.numeric_cache_hit_ratio(pdf, cache.LruCache(5),
+                                               seed=1)
+        self.assertAlmostEqual(h1, h['l1_hits'])
+        self.assertAlmostEqual(h['total_hits'], h['l1_hits'] + h['l2_hits'])
+
+
+class TestLruMissRatioCurve(unittest.TestCase):
+
+    def test_stack_distances(self):
+        d = cacheperf.lru_stack_distances(['a', 'b', 'a', 'c', 'b', 'b', 'a'])
+        self.assertEqual([0, 0, 2, 0, 3, 1, 3], d.tolist())
+        d = cacheperf.lru_stack_distances(np.array([5, 5, 7, 5]))
+        self.assertEqual([0, 1, 0, 2], d.tolist())
+        self.assertEqual([], cacheperf.lru_stack_distances([]).tolist())
+
+    def test_trace_driven(self):
+        trace = np.random.RandomState(0).zipf(1.1, 3000) % 300
+        mrc = cacheperf.trace_driven_lru_miss_ratio_curve(trace, max_size=40)
+        self.assertEqual(41, len(mrc))
+        self.assertEqual(1, mrc[0])
+        for size in (1, 5, 17, 40):
+            h = cacheperf.trace_driven_cache_hit_ratio(trace,
+                                                       cache.LruCache(size))
+            self.assertAlmostEqual(1 - h, mrc[size])
+        self.assertTrue(np.all(np.diff(mrc) <= 0))
+
+    def test_trace_driven_default_max_size(self):
+        trace = [1, 2, 3, 1, 2, 1, 4]
+        mrc = cacheperf.trace_driven_lru_miss_ratio_curve(trace,
+                                                          warmup_ratio=0)
+        self.assertEqual(4, len(mrc))
+        self.assertAlmostEqual(4 / 7, mrc[-1])
+
+    def test_trace_driven_no_measured_requests(self):
+        self.assertRaises(ValueError,
+                          cacheperf.trace_driven_lru_miss_ratio_curve,
+                          [1, 2, 1], warmup_ratio=1)
+        self.assertRaises(ValueError,
+                          cacheperf.trace_driven_lru_miss_ratio_curve, [])
+
+    def test_numeric(self):
+        pdf = stats.TruncatedZipfDist(0.8, 100).pdf
+        mrc = cacheperf.numeric_lru_miss_ratio_curve(pdf, seed=2)
+        self.assertEqual(101, len(mrc))
+        for size in (1, 10, 50):
+            h = cacheperf.numeric_cache_hit_ratio(pdf, cache.LruCache(size),
+                                                  seed=2)
+            self.assertAlmostEqual(1 - h, mrc[size])
+        self.assertTrue(np.all(np.diff(mrc) <= 0))
+
+
+class TestShardsMissRatioCurve(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pdf = stats.TruncatedZipfDist(0.8, 5000).pdf
+        cls.trace = stats.DiscreteDist(pdf, seed=0).rv(100000)
+        cls.exact = cacheperf.trace_driven_lru_miss_ratio_curve(
+                        cls.trace, max_size=1000)
+
+    def test_full_rate_is_exact(self):
+        mrc = cacheperf.shards_lru_miss_ratio_curve(self.trace, rate=1,
+                                                    max_size=1000)
+        np.testing.assert_allclose(self.exact, mrc, atol=1e-9)
+
+    def test_fixed_rate(self):
+        errors = []
+        for seed in range(3):
+            mrc = cacheperf.shards_lru_miss_ratio_curve(
+                      self.trace, rate=0.1, max_size=1000, seed=seed)
+            self.assertEqual(1001, len(mrc))
+            errors.append(np.abs(mrc - self.exact)[1:].mean())
+        self.assertLess(max(errors), 0.07)
+        self.assertLess(np.mean(errors), 0.04)
+
+    def test_fixed_size(self):
+        mrc = cacheperf.shards_lru_miss_ratio_curve(
+                  self.trace, rate=0.5, sample_size=500, max_size=1000,
+                  seed=0)
+        self.assertLess(np.abs(mrc - self.exact)[1:].mean(), 0.02)
+        # With a bound never reached, it is the same as fixed-rate sampling
+        np.testing.assert_allclose(
+            cacheperf.shards_lru_miss_ratio_curve(
+                self.trace, rate=0.1, max_size=1000, seed=0),
+            cacheperf.shards_lru_miss_ratio_curve(
+                self.trace, rate=0.1, sample_size=5000, max_size=1000,
+                seed=0))
+
+    def test_string_items(self):
+        trace = ['item-%d' % i for i in self.trace[:20000].tolist()]
+        mrc = cacheperf.shards_lru_miss_ratio_curve(trace, rate=1,
+                                                    max_size=100)
+        exact = cacheperf.trace_driven_lru_miss_ratio_curve(trace,
+                                                            max_size=100)
+        np.testing.assert_allclose(exact, mrc, atol=1e-9)
+
+    def test_list_items(self):
+        trace = self.trace[:20000]
+        for rate in (0.1, 0.5):
+            np.testing.assert_array_equal(
+                cacheperf.shards_lru_miss_ratio_curve(trace, rate=rate,
+                                                      max_size=100),
+                cacheperf.shards_lru_miss_ratio_curve(trace.tolist(),
+                                                      rate=rate, max_size=100))
+
+    def test_mini_simulations(self):
+        sizes = [200, 500, 1000]
+        for policy in ('LRU', 'FIFO'):
+            mrc = cacheperf.shards_miss_ratio_curve(self.trace, sizes,
+                                                    policy=policy, rate=0.1,
+                                                    seed=0)
+            for size, m in zip(sizes, mrc):
+                c = cache.FifoCache(size) if policy == 'FIFO' \
+                    else cache.LruCache(size)
+                h = cacheperf.trace_driven_cache_hit_ratio(self.trace, c)
+                self.assertLess(abs(1 - h - m), 0.03)
+
+    def test_invalid_params(self):
+        self.assertRaises(ValueError, cacheperf.shards_lru_miss_ratio_curve,
+                          self.trace, rate=0)
+        self.assertRaises(ValueError, cacheperf.shards_lru_miss_ratio_curve,
+                          self.trace, sample_size=0)
+
+
 class TestLaoutarisPerContentCacheHitRatio(unittest.TestCase):
 
     def test_3rd_order_positive_disc(self):
@@ -97,6 +249,55 @@ class TestCheApproximation(unittest.TestCase):
             self.assertGreaterEqual(h, 0)
             self.assertLessEqual(h, 1)
 
+    def test_che_characteristic_time_exact(self):
+        # Compare against the root of the equation of each item solved
+        # independently
+        # The last two cases are skewed enough for the Taylor expansion to
+        # fail on the most popular items
+        cases = [(stats.TruncatedZipfDist(alpha=0.8, n=100).pdf, 40),
+                 (stats.TruncatedZipfDist(alpha=1.5, n=300).pdf, 2),
+                 (stats.TruncatedZipfDist(alpha=3, n=100).pdf, 1),
+                 (np.random.RandomState(0).dirichlet(0.05 * np.ones(50)), 5)]
+        for pdf, cache_size in cases:
+            n = len(pdf)
+            T = cacheperf.che_characteristic_time(pdf, cache_size)
+            for i in range(n):
+                others = np.delete(pdf, i)
+                func = lambda r: np.sum(np.exp(-others * r)) - n + 1 + cache_size
+                t = brentq(func, 0, 1e12)
+                self.assertAlmostEqual(1, T[i] / t, places=8)
+                if i == 2:
+                    self.assertEqual(T[i], cacheperf.che_characteristic_time(
+                                                pdf, cache_size, target=i + 1))
+
+    def test_che_characteristic_time_large_cache(self):
+        T = cacheperf.che_characteristic_time(self.pdf, len(self.pdf) - 1)
+        self.assertTrue(np.all(np.isinf(T)))
+        h = cacheperf.che_cache_hit_ratio(self.pdf, len(self.pdf) - 1)
+        self.assertAlmostEqual(1, h)
+
+    def test_che_per_content_cache_hit_ratio_target(self):
+        H = cacheperf.che_per_content_cache_hit_ratio(self.pdf, self.cache_size)
+        h = cacheperf.che_per_content_cache_hit_ratio(self.pdf, self.cache_size, target=5)
+        self.assertAlmostEqual(H[5], h)
+
+    def test_che_cache_hit_ratio_large_population(self):
+        pdf = stats.TruncatedZipfDist(alpha=0.8, n=10 ** 6).pdf
+        h = cacheperf.che_cache_hit_ratio(pdf, 10 ** 4)
+        h_simplified = cacheperf.che_cache_hit_ratio_simplified(pdf, 10 ** 4)
+        h_lru = cacheperf.che_cache_hit_ratio_generalized(pdf, 10 ** 4, 'LRU')
+        self.assertAlmostEqual(h, h_simplified, places=4)
+        self.assertAlmostEqual(h_lru, h_simplified)
+
+    def test_che_cache_hit_ratio_generalized(self):
+        for policy, args in [('LRU', {}), ('q-LRU', {'q': 0.5}), ('FIFO', {})]:
+            t = cacheperf.che_characteristic_time_generalized(
+                        self.pdf, self.cache_size, policy, **args)
+            H = cacheperf.che_per_content_cache_hit_ratio_generalized(
+                        self.pdf, self.cache_size, policy, **args)
+            self.assertAlmostEqual(self.cache_size, np.sum(H))
+            self.assertGreaterEqual(t, 0)
+
 
 class TestLaoutarisCacheHitRatio(unittest.TestCase):
 
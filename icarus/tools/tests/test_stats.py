@@ -1,5 +1,6 @@
 import unittest
 import collections
+import random
 
 import numpy as np
 
@@ -14,6 +15,56 @@ class TestMeansConfidenceInterval(unittest.TestCase):
         self.assertEqual(0, err)
 
 
+class TestBatchMeansConfidenceInterval(unittest.TestCase):
+
+    def test_all_equal(self):
+        mean, err = stats.batch_means_confidence_interval(np.ones(100), 10)
+        self.assertEqual(1, mean)
+        self.assertEqual(0, err)
+
+    def test_coverage(self):
+        rng = np.random.RandomState(0)
+        covered = 0
+        for _ in range(200):
+            mean, err = stats.batch_means_confidence_interval(
+                            rng.normal(5, 1, 1000), 20, 0.9)
+            covered += abs(mean - 5) <= err
+        self.assertGreater(covered, 160)
+        self.assertLess(covered, 195)
+
+    def test_discard_first_samples(self):
+        mean, _ = stats.batch_means_confidence_interval([100, 1, 2, 3, 4], 2)
+        self.assertEqual(2.5, mean)
+
+    def test_invalid_params(self):
+        self.assertRaises(ValueError, stats.batch_means_confidence_interval,
+                          [1, 2, 3], 4)
+        self.assertRaises(ValueError, stats.batch_means_confidence_interval,
+                          [1, 2, 3], 1)
+        self.assertRaises(ValueError, stats.batch_means_confidence_interval,
+                          [1, 2, 3], 2, 1.5)
+
+
+class TestMser(unittest.TestCase):
+
+    def test_stationary(self):
+        data = np.random.RandomState(0).normal(0, 1, 1000)
+        self.assertLess(stats.mser(data), 500)
+
+    def test_transient(self):
+        rng = np.random.RandomState(0)
+        data = np.concatenate([np.linspace(10, 0, 200),
+                               rng.normal(0, 1, 2000)])
+        d = stats.mser(data)
+        self.assertEqual(0, d % 5)
+        self.assertGreaterEqual(d, 150)
+        self.assertLess(d, 300)
+
+    def test_invalid_params(self):
+        self.assertRaises(ValueError, stats.mser, [1, 2, 3])
+        self.assertRaises(ValueError, stats.mser, [1, 2, 3], 0)
+
+
 class TestDiscreteDist(unittest.TestCase):
 
     def test_pdf_incorrect_sum(self):
@@ -24,6 +75,54 @@ class TestDiscreteDist(unittest.TestCase):
         pdf_2 = stats.DiscreteDist(pdf_1).pdf
         self.assertTrue(all(pdf_1[i] == pdf_2[i] for i in range(len(pdf_1))))
 
+    def test_alias_table(self):
+        pdfs = [[1.0], [0.5, 0.5], [0.0, 0.7, 0.3], [0.1, 0.2, 0.3, 0.4],
+                stats.TruncatedZipfDist(alpha=1.2, n=500).pdf,
+                np.random.RandomState(0).dirichlet(0.1 * np.ones(300))]
+        for pdf in pdfs:
+            d = stats.DiscreteDist(pdf)
+            n = len(pdf)
+            prob, alias = d._prob, d._alias
+            self.assertTrue(np.all(prob >= 0) and np.all(prob <= 1))
+            # The probability of each value is the probability of selecting
+            # its column plus that of selecting columns aliasing it
+            pdf_alias = (prob + np.bincount(alias, weights=1 - prob,
+                                            minlength=n)) / n
+            np.testing.assert_allclose(pdf_alias, pdf, atol=1e-12)
+
+    def test_rv(self):
+        d = stats.DiscreteDist([0.1, 0.2, 0.3, 0.4], seed=1)
+        rv = d.rv(100000)
+        self.assertEqual(rv.shape, (100000,))
+        self.assertEqual(rv.min(), 1)
+        self.assertEqual(rv.max(), 4)
+        freqs = np.bincount(rv, minlength=5)[1:] / len(rv)
+        np.testing.assert_allclose(freqs, [0.1, 0.2, 0.3, 0.4], atol=0.01)
+        self.assertIn(d.rv(), range(1, 5))
+
+    def test_rv_zero_prob(self):
+        d = stats.DiscreteDist([0.5, 0, 0.5, 0], seed=1)
+        self.assertFalse(set(d.rv(10000)) - set([1, 3]))
+
+    def test_seed(self):
+        pdf = stats.TruncatedZipfDist(alpha=0.8, n=100).pdf
+        rv_1 = [stats.DiscreteDist(pdf, seed=1).rv() for _ in range(10)]
+        d_2 = stats.DiscreteDist(pdf, seed=1)
+        rv_2 = [d_2.rv() for _ in range(2000)]
+        d_3 = stats.DiscreteDist(pdf, seed=1)
+        rv_3 = np.concatenate([d_3.rv(500), d_3.rv(1), d_3.rv(1499)])
+        self.assertEqual(len(set(rv_1)), 1)
+        self.assertEqual(rv_2, rv_3.tolist())
+
+    def test_global_random_state(self):
+        random.seed(1)
+        np.random.seed(1)
+        expected = random.random(), np.random.random()
+        random.seed(1)
+        np.random.seed(1)
+        stats.DiscreteDist([0.4, 0.6], seed=2).rv(10)
+        self.assertEqual(expected, (random.random(), np.random.random()))
+
 class TestTruncatedZipfDist(unittest.TestCase):
 
     def test_pdf_sum(self):
@@ -1,6 +1,9 @@
 import unittest
 
+import os
 import random
+import shutil
+import tempfile
 
 import numpy as np
 
@@ -60,3 +63,71 @@ class TestZipfFit(unittest.TestCase):
         self.assertLessEqual(p, p_max)
 
 
+class TestBinaryTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.trace_dir = os.path.join(self.tmp_dir, 'trace')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_write_read(self):
+        trace = ['a', 'b', 'a', 'c', 'b', 'a']
+        stats = traces.write_binary_trace(self.trace_dir, trace, chunk_size=4)
+        self.assertEqual(stats, {'n_requests': 6, 'n_contents': 3})
+        requests, timestamps = traces.read_binary_trace(self.trace_dir)
+        self.assertIsInstance(requests, np.memmap)
+        self.assertEqual(requests.dtype, np.int32)
+        self.assertEqual(requests.tolist(), [0, 1, 0, 2, 1, 0])
+        self.assertIsNone(timestamps)
+        contents = traces.read_binary_trace_contents(self.trace_dir)
+        self.assertEqual(contents, ['a', 'b', 'c'])
+        self.assertEqual([contents[i] for i in requests], trace)
+
+    def test_write_read_timestamps(self):
+        trace = [(0.5, 'a'), (1.5, 'b'), (2.0, 'a')]
+        traces.write_binary_trace(self.trace_dir, trace, timestamps=True,
+                                  dtype='int64', chunk_size=2)
+        requests, timestamps = traces.read_binary_trace(self.trace_dir,
+                                                        mmap=False)
+        self.assertEqual(requests.dtype, np.int64)
+        self.assertEqual(requests.tolist(), [0, 1, 0])
+        self.assertEqual(timestamps.dtype, np.float64)
+        self.assertEqual(timestamps.tolist(), [0.5, 1.5, 2.0])
+
+    def test_empty_trace(self):
+        traces.write_binary_trace(self.trace_dir, [])
+        requests, _ = traces.read_binary_trace(self.trace_dir)
+        self.assertEqual(len(requests), 0)
+
+    def test_invalid_dtype(self):
+        self.assertRaises(ValueError, traces.write_binary_trace,
+                          self.trace_dir, ['a'], dtype='float64')
+
+    def test_convert_url_list(self):
+        path = os.path.join(self.tmp_dir, 'urls.txt')
+        with open(path, 'w') as f:
+            f.write('http://a\nhttp://b\nhttp://a\n')
+        traces.convert_trace(path, self.trace_dir, 'url_list')
+        requests, timestamps = traces.read_binary_trace(self.trace_dir)
+        self.assertEqual(requests.tolist(), [0, 1, 0])
+        self.assertIsNone(timestamps)
+        self.assertEqual(traces.read_binary_trace_contents(self.trace_dir),
+                         ['http://a', 'http://b'])
+
+    def test_convert_wikibench(self):
+        path = os.path.join(self.tmp_dir, 'wikibench.txt')
+        with open(path, 'w') as f:
+            f.write('1 1190146243.324 http://a -\n'
+                    '2 1190146243.500 http://b -\n'
+                    '3 1190146244.000 http://a -\n')
+        traces.convert_trace(path, self.trace_dir, 'wikibench')
+        requests, timestamps = traces.read_binary_trace(self.trace_dir)
+        self.assertEqual(requests.tolist(), [0, 1, 0])
+        self.assertEqual(timestamps.tolist(),
+                         [1190146243.324, 1190146243.5, 1190146244.0])
+
+    def test_convert_unknown_format(self):
+        self.assertRaises(ValueError, traces.convert_trace, 'path',
+                          self.trace_dir, 'unknown')
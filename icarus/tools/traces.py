@@ -1,7 +1,10 @@
 """Functions for importing and analyzing traffic traces"""
 from __future__ import division
 
+import os
+import io
 import math
+import shutil
 import collections
 import time
 import dateutil
@@ -22,7 +25,11 @@ __all__ = [
        'parse_wikibench',
        'parse_squid',
        'parse_youtube_umass',
-       'parse_common_log_format'
+       'parse_common_log_format',
+       'write_binary_trace',
+       'read_binary_trace',
+       'read_binary_trace_contents',
+       'convert_trace'
            ]
 
 
@@ -170,7 +177,6 @@ def parse_url_list(path):
     with open(path) as f:
         for line in f:
             yield line
-    raise StopIteration()
 
 
 def parse_wikibench(path):
@@ -195,7 +201,6 @@ def parse_wikibench(path):
                 timestamp=entry[1],
                 url=entry[2]
                       )
-    raise StopIteration()
 
 
 def parse_squid(path):
@@ -250,7 +255,6 @@ def parse_squid(path):
                 hostname=hostname,
                 content_type=content_type
                       )
-    raise StopIteration()
 
 
 def parse_youtube_umass(path):
@@ -304,7 +308,6 @@ def parse_youtube_umass(path):
                 video_id=video_id,
                 content_server_addr=content_server_addr,
                       )
-    raise StopIteration()
 
 
 def parse_common_log_format(path):
@@ -347,4 +350,203 @@ def parse_common_log_format(path):
                 bytes=n_bytes
                         )
             yield t, event
-    raise StopIteration()
+
+
+_REQUESTS_FILE = 'requests.npy'
+_TIMESTAMPS_FILE = 'timestamps.npy'
+_CONTENTS_FILE = 'contents.txt'
+
+
+def write_binary_trace(path, trace, timestamps=False, dtype='int32',
+                       chunk_size=2 ** 20):
+    """Write a request trace in binary format
+
+    A binary trace is a directory containing:
+     * *requests.npy*: a one-dimensional array of integer content identifiers,
+       one per request
+     * *timestamps.npy* (optional): a one-dimensional array of float64
+       timestamps, one per request
+     * *contents.txt*: the dictionary of content names, where the content
+       name in line *i* (counting from 0) is mapped to content identifier *i*
+
+    Arrays are saved in the standard NumPy *.npy* format so that they can be
+    memory-mapped by :func:`read_binary_trace` without any parsing.
+    Content identifiers are assigned in order of first appearance in the
+    trace and are therefore in the range 0 to n_contents - 1.
+
+    Parameters
+    ----------
+    path : str
+        The path of the directory where the trace is written. It is created if
+        it does not exist
+    trace : iterable
+        An iterable of content names or, if *timestamps* is True, of
+        (timestamp, content name) 2-tuples
+    timestamps : bool, optional
+        Whether the trace provides timestamps
+    dtype : str, optional
+        The data type of content identifiers, either 'int32' or 'int64'
+    chunk_size : int, optional
+        The number of requests buffered in memory before writing them to disk
+
+    Returns
+    -------
+    stats : dict
+        Number of requests and contents of the trace
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.dtype('int32'), np.dtype('int64')):
+        raise ValueError('dtype must be either int32 or int64')
+    max_id = np.iinfo(dtype).max
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    reqs_path = os.path.join(path, _REQUESTS_FILE)
+    ts_path = os.path.join(path, _TIMESTAMPS_FILE)
+    # Arrays are first written to raw files because the size of the array
+    # in the header of .npy files is not known until the end of the trace
+    reqs_raw = open(reqs_path + '.tmp', 'wb')
+    ts_raw = open(ts_path + '.tmp', 'wb') if timestamps else None
+    contents_f = io.open(os.path.join(path, _CONTENTS_FILE), 'w',
+                         encoding='utf-8')
+    content_ids = {}
+    n_requests = 0
+    try:
+        ids = []
+        times = []
+        for entry in trace:
+            if timestamps:
+                t, content = entry
+                times.append(t)
+            else:
+                content = entry
+            content_id = content_ids.get(content)
+            if content_id is None:
+                content_id = len(content_ids)
+                if content_id > max_id:
+                    raise ValueError('The number of contents exceeds the '
+                                     'range of dtype %s' % dtype.name)
+                name = u'%s' % content
+                if u'\n' in name:
+                    raise ValueError('Content names cannot contain newlines')
+                content_ids[content] = content_id
+                contents_f.write(name + u'\n')
+            ids.append(content_id)
+            if len(ids) == chunk_size:
+                n_requests += len(ids)
+                np.asarray(ids, dtype=dtype).tofile(reqs_raw)
+                ids = []
+                if timestamps:
+                    np.asarray(times, dtype=np.float64).tofile(ts_raw)
+                    times = []
+        n_requests += len(ids)
+        np.asarray(ids, dtype=dtype).tofile(reqs_raw)
+        if timestamps:
+            np.asarray(times, dtype=np.float64).tofile(ts_raw)
+    finally:
+        reqs_raw.close()
+        contents_f.close()
+        if timestamps:
+            ts_raw.close()
+    _raw_to_npy(reqs_path + '.tmp', reqs_path, dtype, n_requests)
+    if timestamps:
+        _raw_to_npy(ts_path + '.tmp', ts_path, np.dtype(np.float64), n_requests)
+    elif os.path.exists(ts_path):
+        # Remove stale timestamps of a trace previously written in path
+        os.remove(ts_path)
+    return dict(n_requests=n_requests, n_contents=len(content_ids))
+
+
+def _raw_to_npy(raw_path, path, dtype, n):
+    """Prepend a .npy header to a raw one-dimensional array file"""
+    header = {'descr': np.lib.format.dtype_to_descr(dtype),
+              'fortran_order': False,
+              'shape': (n,)}
+    with open(path, 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, header)
+        with open(raw_path, 'rb') as raw:
+            shutil.copyfileobj(raw, f, 16 * 1024 * 1024)
+    os.remove(raw_path)
+
+
+def read_binary_trace(path, mmap=True):
+    """Read a trace written by :func:`write_binary_trace`
+
+    Parameters
+    ----------
+    path : str
+        The path of the directory containing the trace
+    mmap : bool, optional
+        If True, arrays are memory-mapped rather than loaded in memory
+
+    Returns
+    -------
+    requests : array
+        The array of content identifiers requested
+    timestamps : array
+        The array of request timestamps or None if the trace has no timestamps
+    """
+    mmap_mode = 'r' if mmap else None
+    requests = np.load(os.path.join(path, _REQUESTS_FILE), mmap_mode=mmap_mode)
+    ts_path = os.path.join(path, _TIMESTAMPS_FILE)
+    timestamps = np.load(ts_path, mmap_mode=mmap_mode) \
+                 if os.path.exists(ts_path) else None
+    return requests, timestamps
+
+
+def read_binary_trace_contents(path):
+    """Read the content names of a trace written by :func:`write_binary_trace`
+
+    Parameters
+    ----------
+    path : str
+        The path of the directory containing the trace
+
+    Returns
+    -------
+    contents : list of str
+        The content names, where the name at index *i* is the one of content
+        identifier *i*
+    """
+    with io.open(os.path.join(path, _CONTENTS_FILE), 'r', encoding='utf-8') as f:
+        return [line.rstrip(u'\n') for line in f]
+
+
+def convert_trace(path, out_path, trace_format='url_list', dtype='int32'):
+    """Convert a text trace into the binary format read by
+    :func:`read_binary_trace`
+
+    Parameters
+    ----------
+    path : str
+        The path to the trace file to convert
+    out_path : str
+        The path of the directory where the binary trace is written
+    trace_format : str, optional
+        The format of the trace file. It can be 'url_list', 'wikibench',
+        'squid', 'youtube_umass' or 'common_log_format'. Timestamps are stored
+        for all formats except 'url_list'
+    dtype : str, optional
+        The data type of content identifiers, either 'int32' or 'int64'
+
+    Returns
+    -------
+    stats : dict
+        Number of requests and contents of the trace
+    """
+    if trace_format == 'url_list':
+        trace = (url.strip() for url in parse_url_list(path))
+    elif trace_format == 'wikibench':
+        trace = ((float(e['timestamp']), e['url'].strip())
+                 for e in parse_wikibench(path))
+    elif trace_format == 'squid':
+        trace = ((float(e['time']), e['url']) for e in parse_squid(path))
+    elif trace_format == 'youtube_umass':
+        trace = ((float(e['time']), e['video_id'])
+                 for e in parse_youtube_umass(path))
+    elif trace_format == 'common_log_format':
+        trace = ((t, e['request']) for t, e in parse_common_log_format(path))
+    else:
+        raise ValueError('Unknown trace format %s' % trace_format)
+    return write_binary_trace(out_path, trace,
+                              timestamps=(trace_format != 'url_list'),
+                              dtype=dtype)
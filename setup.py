@@ -8,7 +8,7 @@ from setuptools import find_packages, setup
 # Packages required to run Icarus
 requires = [
     'networkx (>=2.0)',
-    'numpy (>=1.4)',
+    'numpy (>=1.17)',
     'scipy (>=0.16)',
     'fnss (>=0.8.2)',
     'matplotlib (>=1.5.3)',
@@ -48,10 +48,7 @@ if __name__ == "__main__":
              'License :: OSI Approved :: BSD License',
              'Natural Language :: English',
              'Operating System :: OS Independent',
-             'Programming Language :: Python :: 2',
-             'Programming Language :: Python :: 2.7',
              'Programming Language :: Python :: 3',
-             'Programming Language :: Python :: 3.4',
              'Programming Language :: Python :: 3.5',
              'Programming Language :: Python :: 3.6',
              'Topic :: Scientific/Engineering',
@@ -59,7 +56,7 @@ if __name__ == "__main__":
         entry_points={'console_scripts': {"{0} = {0}.main:main".format('icarus')}},
         description=release.description_short,
         long_description=release.description_long,
-        python_requires='>=2.7.9, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*',
+        python_requires='>=3.5',
         install_requires=requires,
         keywords=[
             'caching',